@@ -3,12 +3,14 @@ Service 1A Configuration Settings
 PDF Outline Extraction Service
 """
 
+import json
 import os
+import socket
 from typing import Optional
 from pathlib import Path
 
 class Settings:
-    def _init_(self):
+    def __init__(self):
         # Service identification
         self.service: str = os.getenv('SERVICE', '1A')
         self.round: str = os.getenv('ROUND', 'round1a')
@@ -17,6 +19,25 @@ class Settings:
         self.input_dir: str = '/app/input'
         self.output_dir: str = '/app/output'
         self.logs_dir: str = '/app/logs'
+        self.cache_dir: str = os.getenv('OUTLINE_CACHE_DIR', '/app/cache')
+        
+        # Run mode: 'batch' processes the input directory once, 'watch' keeps polling it,
+        # 'serve' answers HTTP requests
+        self.run_mode: str = os.getenv('RUN_MODE', 'batch').lower()
+        self.watch_interval_seconds: float = float(os.getenv('WATCH_INTERVAL_SECONDS', '2'))
+        
+        # Multi-node batch over shared volumes: 'hash' takes the files hashing to SHARD_INDEX of
+        # SHARD_COUNT, 'claim' lets any number of replicas claim files through lease files
+        self.shard_mode: str = os.getenv('SHARD_MODE', 'off').lower()
+        self.shard_index: int = int(os.getenv('SHARD_INDEX', '0'))
+        self.shard_count: int = int(os.getenv('SHARD_COUNT', '1'))
+        self.node_id: str = os.getenv('NODE_ID', '') or f'{socket.gethostname()}-{os.getpid()}'
+        self.claim_lease_seconds: float = float(os.getenv('CLAIM_LEASE_SECONDS', '60'))  # Claims not renewed for this long are taken over
+        
+        # HTTP service (RUN_MODE=serve)
+        self.server_host: str = os.getenv('SERVER_HOST', '0.0.0.0')
+        self.server_port: int = int(os.getenv('SERVER_PORT', '8080'))
+        self.server_queue_size: int = int(os.getenv('SERVER_QUEUE_SIZE', '32'))  # Requests waiting beyond the busy workers
         
         # Logging
         self.log_level: str = os.getenv('LOG_LEVEL', 'INFO')
@@ -26,19 +47,55 @@ class Settings:
         self.supported_formats: list = ['.pdf']
         
         # Performance settings for Service 1A
-        self.max_memory_mb: int = 512  # Lighter for Service 1A
+        self.max_memory_mb: int = int(os.getenv('MAX_MEMORY_MB', '512'))  # Enforced by the memory governor (0 = off)
         self.timeout_seconds: int = 10  # Max 10 seconds per PDF (hackathon req)
-        self.max_concurrent_pdfs: int = 1  # Process one at a time
+        self.max_concurrent_pdfs: int = int(os.getenv('MAX_CONCURRENT_PDFS', '1'))  # 1 = serial, 0 = one worker per CPU
+        self.page_split_threshold: int = int(os.getenv('PAGE_SPLIT_THRESHOLD', '300'))  # Split larger PDFs across processes (0 = never)
+        self.page_split_workers: int = int(os.getenv('PAGE_SPLIT_WORKERS', '0'))  # 0 = one per CPU
+        
+        # Time budget per document (0 disables either): parsing stops early and a partial
+        # outline is returned to finish within the deadline; the hard timeout abandons the file
+        self.extraction_deadline_seconds: float = float(os.getenv('EXTRACTION_DEADLINE_SECONDS', str(self.timeout_seconds * 0.8)))
+        self.estimated_ms_per_page: float = float(os.getenv('ESTIMATED_MS_PER_PAGE', '0'))  # Calibrated cost that caps hopeless documents up front (0 = off)
+        self.hard_timeout_seconds: float = float(os.getenv('HARD_TIMEOUT_SECONDS', str(self.timeout_seconds * 3)))
+        self.input_buffer_max_mb: float = float(os.getenv('INPUT_BUFFER_MAX_MB', '64'))  # Larger inputs are memory-mapped and parsed from the file
         
         # Output format settings
-        self.output_format: str = 'json'
+        self.output_format: str = os.getenv('OUTPUT_FORMAT', 'json').lower()  # 'json' (file per PDF), 'ndjson' or 'sqlite'
+        self.output_sink_path: str = os.getenv('OUTPUT_SINK_PATH', '')  # ndjson/sqlite target; '-' streams ndjson to stdout
+        self.output_batch_size: int = int(os.getenv('OUTPUT_BATCH_SIZE', '100'))  # Records per ndjson write / sqlite transaction
         self.include_page_numbers: bool = True
         self.include_text_snippets: bool = False  # Keep outline lightweight
+        self.include_output_metadata: bool = os.getenv('OUTPUT_METADATA', 'false').lower() == 'true'  # Timing and counts in each JSON
+        
+        # Instrumentation: one JSON line per processed file with stage times, counts and peak RSS
+        self.enable_metrics: bool = os.getenv('METRICS', 'true').lower() == 'true'
+        
+        # Profiling: cProfile dump per document slower than profile_min_seconds
+        self.enable_profiling: bool = os.getenv('PROFILE', 'false').lower() == 'true'
+        self.profile_min_seconds: float = float(os.getenv('PROFILE_MIN_SECONDS', '0'))
         
         # PDF Processing Options
-        self.extract_bookmarks: bool = True
+        self.extract_bookmarks: bool = os.getenv('EXTRACT_BOOKMARKS', 'true').lower() == 'true'  # Use the PDF's own TOC when it is good enough
         self.extract_headings: bool = True
         self.heading_detection_method: str = 'font_analysis'  # or 'regex_patterns'
+        self.pdf_extraction_mode: str = os.getenv('PDF_EXTRACTION_MODE', 'full').lower()  # 'full' or 'lean' (text only, may join lines)
+        self.remove_running_headers: bool = os.getenv('REMOVE_RUNNING_HEADERS', 'true').lower() == 'true'  # Drop text repeated at the same height on most pages
+        self.pdf_clip_margin: float = float(os.getenv('PDF_CLIP_MARGIN', '0'))  # Fraction of page height ignored at top and bottom
+        
+        # Heading scoring (weights by factor name, see heading_detector.DEFAULT_SCORE_WEIGHTS)
+        self.heading_score_threshold: float = float(os.getenv('HEADING_SCORE_THRESHOLD', '0.4'))
+        self.heading_score_weights: dict = json.loads(os.getenv('HEADING_SCORE_WEIGHTS', '{}'))  # Overrides, e.g. {"bold": 0.3}
+        self.heading_font_ratio_tiers: tuple = tuple(
+            float(ratio) for ratio in os.getenv('HEADING_FONT_RATIO_TIERS', '1.4,1.2,1.1').split(',')
+        )
+        
+        # Outline cache (content hash + detector config -> outline JSON)
+        self.enable_outline_cache: bool = os.getenv('OUTLINE_CACHE', 'true').lower() == 'true'
+        self.outline_cache_max_mb: int = int(os.getenv('OUTLINE_CACHE_MAX_MB', '256'))
+        # Page cache (page fingerprint + parser config -> parsed lines), so a revised PDF only re-parses changed pages
+        self.enable_page_cache: bool = os.getenv('PAGE_CACHE', 'false').lower() == 'true'
+        self.page_cache_max_mb: int = int(os.getenv('PAGE_CACHE_MAX_MB', '512'))
         
         # Validation settings
         self.validate_output_schema: bool = True
@@ -60,16 +117,68 @@ class Settings:
         """Get logs directory as Path object"""
         return Path(self.logs_dir)
     
+    def get_cache_path(self) -> Path:
+        """Get outline cache directory as Path object"""
+        return Path(self.cache_dir)
+    
+    def get_page_cache_path(self) -> Path:
+        """SQLite file of the per-page cache, next to the outline cache"""
+        return self.get_cache_path() / 'pages.sqlite'
+    
+    def get_metrics_path(self) -> Path:
+        """JSON-lines file receiving per-file processing metrics"""
+        return self.get_logs_path() / 'metrics.jsonl'
+    
+    def get_process_memory_limit_mb(self, worker_count: Optional[int] = None, baseline_mb: float = 0.0) -> float:
+        """Growth one extracting process may use above its idle baseline_mb.
+        
+        What max_memory_mb leaves after the baseline is shared equally; the
+        parent counts when workers run. Forked workers share their baseline
+        with the parent (copy-on-write), so it is only subtracted once.
+        """
+        workers = self.get_worker_count() if worker_count is None else worker_count
+        return max(self.max_memory_mb - baseline_mb, 0) / (workers + 1 if workers > 1 else 1)
+    
+    def get_output_sink_path(self) -> str:
+        """Target of the ndjson or sqlite sink, by default a single file in the output directory"""
+        if self.output_sink_path:
+            return self.output_sink_path
+        suffix = 'sqlite' if self.output_format == 'sqlite' else 'ndjson'
+        if self.shard_mode != 'off':
+            # One file per node: replicas never write to the same file
+            return str(self.get_output_path() / f'outlines-{self.node_id}.{suffix}')
+        return str(self.get_output_path() / f'outlines.{suffix}')
+    
+    def get_profiles_path(self) -> Path:
+        """Directory receiving per-document cProfile dumps"""
+        return self.get_logs_path() / 'profiles'
+    
+    def get_shard_state_path(self) -> Path:
+        """Claims, completion records and the merged summary shared by all nodes of a sharded batch"""
+        return self.get_logs_path() / 'shard'
+    
+    def get_watch_manifest_path(self) -> Path:
+        """Manifest of PDFs already handled in watch mode"""
+        return self.get_logs_path() / 'watch_manifest.json'
+    
     def validate_directories(self) -> bool:
         """Ensure required directories exist"""
         try:
             self.get_input_path().mkdir(parents=True, exist_ok=True)
             self.get_output_path().mkdir(parents=True, exist_ok=True)
             self.get_logs_path().mkdir(parents=True, exist_ok=True)
+            if self.enable_outline_cache or self.enable_page_cache:
+                self.get_cache_path().mkdir(parents=True, exist_ok=True)
             return True
         except Exception:
             return False
     
+    def get_worker_count(self) -> int:
+        """Resolve max_concurrent_pdfs to a concrete number of worker processes"""
+        if self.max_concurrent_pdfs <= 0:
+            return os.cpu_count() or 1
+        return self.max_concurrent_pdfs
+    
     def get_output_filename(self, pdf_filename: str) -> str:
         """Generate output filename for a PDF"""
         pdf_name = Path(pdf_filename).stem
@@ -3,9 +3,9 @@ Service 1A: PDF Outline Extraction
 Adobe Hackathon 2025 - Challenge 1A Compliant
 """
 
+import logging
 import sys
 import os
-import time
 from pathlib import Path
 
 # Add the app directory to Python path
@@ -13,15 +13,26 @@ app_dir = Path(__file__).parent
 sys.path.insert(0, str(app_dir))
 
 from config.settings import Settings
-from services.round1a.outline_extractor import OutlineExtractor
+from services.round1a.batch_runner import check_memory_budget, create_output_sink, iter_batch_results, write_result
+from services.round1a.directory_watcher import DirectoryWatcher
 from utils.logger import setup_logger
 from utils.file_handler import FileHandler
+from utils.instrumentation import MetricsWriter
 from utils.json_validator import JSONValidator
+from utils.profiling import write_profile_summary
 
 def main():
     """Main application entry point for Service 1A - PDF Outline Extraction"""
     logger = setup_logger()
+    if '--profile' in sys.argv[1:]:
+        # Through the environment so pool workers building their own Settings see it too
+        os.environ['PROFILE'] = 'true'
     settings = Settings()
+    if settings.output_format == 'ndjson' and settings.get_output_sink_path() == '-':
+        # stdout carries the outlines, so the console log moves to stderr
+        for handler in logger.handlers:
+            if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+                handler.setStream(sys.stderr)
     file_handler = FileHandler()
     validator = JSONValidator()
     
@@ -37,7 +48,29 @@ def main():
             sys.exit(1)
         
         logger.info("Initializing PDF Outline Extraction")
-        outline_extractor = OutlineExtractor()
+        
+        if settings.run_mode == 'watch':
+            DirectoryWatcher(settings, logger).run()
+            return
+        
+        if settings.run_mode == 'serve':
+            # Imported lazily so batch runs do not pay for the web stack
+            from services.round1a.outline_service import run_server
+            run_server(settings, logger)
+            return
+        
+        if settings.shard_mode != 'off':
+            # Several replicas share the input directory
+            from services.round1a.sharded_batch import ShardedBatch
+            sharded_batch = ShardedBatch(settings, logger)
+            if '--shard-summary' in sys.argv[1:]:
+                # Merge what the nodes recorded so far without processing anything
+                sharded_batch.log_summary(sharded_batch.write_summary())
+                return
+            exit_code = sharded_batch.run()
+            if exit_code:
+                sys.exit(exit_code)
+            return
         
         # Get directories from settings
         input_dir = settings.get_input_path()
@@ -56,62 +89,58 @@ def main():
         
         logger.info(f"Found {len(pdf_files)} PDF file(s) to process")
         
+        worker_count = settings.get_worker_count()
+        if worker_count > 1:
+            logger.info(f"Parallel batch mode: {worker_count} worker processes")
+        check_memory_budget(settings, min(worker_count, len(pdf_files)), logger)
+        
+        # Per-file stage timings, counts and peak RSS as JSON lines
+        metrics_writer = MetricsWriter(settings.get_metrics_path()) if settings.enable_metrics else None
+        output_sink = create_output_sink(settings, file_handler)
+        if settings.output_format != 'json':
+            logger.info(f"Output sink: {settings.output_format} -> {settings.get_output_sink_path()}")
+        
         # Process each PDF with timing and validation
         successful_count = 0
         failed_count = 0
+        cache_hits = 0
+        cache_misses = 0
+        over_budget = []
+        partial = []
+        profile_paths = []
+        # PDF name -> (is_valid, errors), checked in memory before each write
+        validation_results = {}
         
-        for i, pdf_file in enumerate(pdf_files, 1):
-            start_time = time.time()
-            
-            try:
+        with output_sink:
+            for i, result in enumerate(iter_batch_results(pdf_files, worker_count, settings), 1):
+                pdf_file = Path(result['pdf_path'])
                 logger.info(f"Processing {i}/{len(pdf_files)}: {pdf_file.name}")
                 
-                # Validate PDF file before processing
-                is_valid, error_msg = file_handler.validate_pdf_file(pdf_file)
-                if not is_valid:
-                    logger.error(f"Invalid PDF {pdf_file.name}: {error_msg}")
-                    failed_count += 1
-                    continue
-                
-                # Extract outline
-                outline_data = outline_extractor.extract_outline(str(pdf_file))
+                if result['cache_status'] == 'hit':
+                    cache_hits += 1
+                elif result['cache_status'] == 'miss':
+                    cache_misses += 1
                 
-                # Generate output filename using settings
-                output_filename = settings.get_output_filename(pdf_file.name)
-                output_file = output_dir / output_filename
+                if result['processing_time'] > settings.timeout_seconds:
+                    over_budget.append(pdf_file.name)
+                if result['outline'] and result['outline'].get('metadata', {}).get('partial'):
+                    partial.append(pdf_file.name)
+                if result.get('profile_path'):
+                    profile_paths.append(result['profile_path'])
                 
-                # Save JSON output using FileHandler
-                if file_handler.save_json(outline_data, output_file):
-                    processing_time = time.time() - start_time
-                    
-                    # Validate output format
-                    is_valid, validation_errors = validator.validate_output_file(output_file)
-                    if not is_valid:
-                        logger.warning(f"Output validation issues for {pdf_file.name}: {validation_errors}")
-                    
-                    # Check timing compliance (≤10 seconds requirement)
-                    if processing_time > settings.timeout_seconds:
-                        logger.warning(f"Processing time {processing_time:.2f}s exceeds {settings.timeout_seconds}s limit")
-                    
-                    logger.info(f"✅ Successfully processed {pdf_file.name} -> {output_file.name}")
-                    logger.info(f"   Extracted {len(outline_data.get('outline', []))} headings in {processing_time:.2f}s")
+                if write_result(result, settings, output_sink, validator, logger, metrics_writer=metrics_writer):
                     successful_count += 1
-                else:
-                    logger.error(f"Failed to save output for {pdf_file.name}")
-                    failed_count += 1
+                    validation_results[pdf_file.name] = result['validation']
+                    continue
                 
-            except Exception as e:
-                processing_time = time.time() - start_time
-                logger.error(f"❌ Error processing {pdf_file.name}: {str(e)}")
-                logger.error(f"   Processing failed after {processing_time:.2f}s")
                 failed_count += 1
                 
                 # Continue processing other files if configured to do so
-                if settings.continue_on_error:
-                    logger.info("Continuing with next PDF...")
-                    continue
-                else:
-                    raise
+                if result['status'] == 'error':
+                    if settings.continue_on_error:
+                        logger.info("Continuing with next PDF...")
+                    else:
+                        raise RuntimeError(f"Stopping batch after failure on {pdf_file.name}")
         
         # Final summary
         logger.info("=" * 50)
@@ -119,15 +148,28 @@ def main():
         logger.info(f"✅ Successful: {successful_count} PDFs")
         if failed_count > 0:
             logger.warning(f"❌ Failed: {failed_count} PDFs")
-        logger.info(f"📁 Output directory: {output_dir.absolute()}")
-        
-        # Optional: Validate all output files
-        if successful_count > 0:
-            logger.info("Validating all output files...")
-            validation_results = validator.validate_batch_outputs(output_dir)
-            
-            valid_files = sum(1 for result in validation_results.values() if result[0])
+        if settings.enable_outline_cache:
+            logger.info(f"💾 Outline cache: {cache_hits} hits, {cache_misses} misses")
+        if over_budget:
+            logger.warning(f"⏱ Over the {settings.timeout_seconds}s budget: {', '.join(over_budget)}")
+        if partial:
+            logger.warning(f"✂ Partial outlines (time budget): {', '.join(partial)}")
+        if metrics_writer is not None:
+            logger.info(f"📈 Metrics: {metrics_writer.metrics_path.absolute()}")
+        if settings.enable_profiling:
+            log_profile_summary(profile_paths, settings, logger)
+        if settings.output_format == 'json':
+            logger.info(f"📁 Output directory: {output_dir.absolute()}")
+        else:
+            logger.info(f"📁 Output: {settings.get_output_sink_path()} ({settings.output_format})")
+        
+        # Only this run's outputs; files left over from earlier runs are not re-read
+        if validation_results:
+            invalid_files = [name for name, (is_valid, _) in validation_results.items() if not is_valid]
+            valid_files = len(validation_results) - len(invalid_files)
             logger.info(f"📋 Validation: {valid_files}/{len(validation_results)} files passed validation")
+            if invalid_files:
+                logger.warning(f"📋 Failed validation: {', '.join(invalid_files)}")
         
         # Exit with appropriate code
         if failed_count > 0 and successful_count == 0:
@@ -145,5 +187,19 @@ def main():
         logger.error(traceback.format_exc())
         sys.exit(1)
 
+def log_profile_summary(profile_paths, settings, logger, top_lines: int = 10):
+    """Merge this run's profile dumps into summary.txt and log the heaviest functions"""
+    summary_path = settings.get_profiles_path() / 'summary.txt'
+    summary = write_profile_summary(profile_paths, summary_path)
+    if summary is None:
+        logger.info(f"🔬 Profiling: no document reached {settings.profile_min_seconds}s")
+        return
+
+    logger.info(f"🔬 Profiling: {len(profile_paths)} dump(s), top functions by cumulative time:")
+    table = summary[summary.find('ncalls'):].splitlines() if 'ncalls' in summary else []
+    for line in table[:top_lines + 1]:
+        logger.info(f"   {line}")
+    logger.info(f"🔬 Profile summary: {summary_path.absolute()}")
+
 if __name__ == "__main__":
     main()
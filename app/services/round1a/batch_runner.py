@@ -0,0 +1,385 @@
+"""
+Batch execution helpers for Round 1A - shared by batch and watch modes
+"""
+
+import logging
+import signal
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+from config.settings import Settings
+from services.round1a.outline_extractor import OutlineExtractor
+from utils.deadline import hard_timeout
+from utils.file_handler import FileHandler
+from utils.instrumentation import MetricsWriter, slowest_stage
+from utils.json_validator import JSONValidator
+from utils.memory_governor import process_memory_bytes
+from utils.outline_cache import OutlineCache
+from utils.page_cache import PageCache
+from utils.output_sinks import JsonFileSink, NdjsonSink, OutputSink, SqliteSink
+from utils.pdf_source import PDFSource
+from utils.profiling import DocumentProfiler
+
+# Growth below which a process cannot parse typical documents without hitting its memory budget
+MIN_DOCUMENT_GROWTH_MB = 16
+
+def create_outline_extractor(settings: Settings, worker_count: int = 1) -> OutlineExtractor:
+    """Build an OutlineExtractor, with the on-disk outline and page caches and profiler when enabled.
+    
+    Its memory budget is this process's share when worker_count processes extract in parallel.
+    """
+    outline_cache = None
+    if settings.enable_outline_cache:
+        outline_cache = OutlineCache(settings.get_cache_path(), settings.outline_cache_max_mb * 1024 * 1024)
+    page_cache = None
+    if settings.enable_page_cache:
+        page_cache = PageCache(settings.get_page_cache_path(), settings.page_cache_max_mb * 1024 * 1024)
+    profiler = None
+    if settings.enable_profiling:
+        profiler = DocumentProfiler(settings.get_profiles_path(), settings.profile_min_seconds)
+    outline_extractor = OutlineExtractor(outline_cache=outline_cache, profiler=profiler, page_cache=page_cache)
+    outline_extractor.calibrate_memory(worker_count)
+    return outline_extractor
+
+def check_memory_budget(settings: Settings, worker_count: int, logger: Optional[logging.Logger] = None) -> bool:
+    """Warn when max_memory_mb leaves worker_count processes too little room; False then.
+    
+    The parent has loaded the same modules as a warm worker, so its
+    footprint stands in for the baseline each worker is calibrated to.
+    """
+    if settings.max_memory_mb <= 0:
+        return True
+    logger = logger or logging.getLogger(__name__)
+    processes = worker_count + 1 if worker_count > 1 else 1
+    baseline_mb = process_memory_bytes() / 2**20
+    growth_mb = settings.get_process_memory_limit_mb(worker_count, baseline_mb)
+    if growth_mb >= MIN_DOCUMENT_GROWTH_MB:
+        return True
+    logger.warning(f"MAX_MEMORY_MB={settings.max_memory_mb} split over {processes} process(es) is "
+                   f"{settings.max_memory_mb / processes:.0f} MB each against a {baseline_mb:.0f} MB idle footprint: "
+                   f"documents may only grow {growth_mb:.1f} MB, so larger ones drop to low-memory mode or fail. "
+                   f"Lower MAX_CONCURRENT_PDFS or raise MAX_MEMORY_MB")
+    return False
+
+def create_output_sink(settings: Settings, file_handler: Optional[FileHandler] = None) -> OutputSink:
+    """Build the sink named by settings.output_format: 'json', 'ndjson' or 'sqlite'"""
+    if settings.output_format == 'json':
+        return JsonFileSink(settings.get_output_path(), file_handler, settings.get_output_filename)
+    if settings.output_format == 'ndjson':
+        return NdjsonSink(settings.get_output_sink_path(), settings.output_batch_size)
+    if settings.output_format == 'sqlite':
+        return SqliteSink(settings.get_output_sink_path(), settings.output_batch_size)
+    raise ValueError(f"Unknown OUTPUT_FORMAT '{settings.output_format}' (expected json, ndjson or sqlite)")
+
+def needs_content_hash(settings: Settings) -> bool:
+    """Whether results should carry the PDF's SHA-256 for the configured output sink"""
+    return settings.output_format != 'json'
+
+# Extra wait, beyond the worker's own hard timeout, before the parent kills the workers
+HARD_TIMEOUT_GRACE_SECONDS = 5.0
+
+# Per-process state, built once by the pool initializer and reused for every PDF
+_worker_extractor = None
+_worker_hard_timeout = 0.0
+_worker_hash_content = False
+
+def _init_worker(worker_count: int = 1):
+    """Pool initializer: keep one warm OutlineExtractor per worker process, budgeted as one of worker_count"""
+    global _worker_extractor, _worker_hard_timeout, _worker_hash_content
+    
+    # Shutdown is driven by the parent: ignore Ctrl-C and keep the default
+    # SIGTERM even if the parent installed its own handlers before we forked
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    
+    settings = Settings()
+    _worker_extractor = create_outline_extractor(settings, worker_count)
+    # Files already run in parallel here; splitting pages as well would oversubscribe the CPUs
+    _worker_extractor.pdf_parser.split_threshold = 0
+    _worker_hard_timeout = settings.hard_timeout_seconds
+    _worker_hash_content = needs_content_hash(settings)
+
+def _process_in_worker(pdf_path: str) -> Dict:
+    """Pool task: extract one PDF with the worker's warm extractor"""
+    return process_single_pdf(_worker_extractor, pdf_path, _worker_hard_timeout, _worker_hash_content)
+
+def _process_bytes_in_worker(data: bytes, filename: str) -> Dict:
+    """Pool task: extract an in-memory PDF with the worker's warm extractor"""
+    return process_pdf_bytes(_worker_extractor, data, filename, _worker_hard_timeout)
+
+def _extract_item_in_worker(pdf: Union[str, bytes], name: str, hard_timeout_seconds: float) -> Dict:
+    """Pool task for extract_many: a path, or PDF bytes named name, with a per-item hard timeout"""
+    source = pdf if isinstance(pdf, str) else PDFSource.from_bytes(pdf, name)
+    return process_single_pdf(_worker_extractor, source, hard_timeout_seconds)
+
+def create_worker_pool(worker_count: int) -> ProcessPoolExecutor:
+    """Start long-lived worker processes that each hold a warm OutlineExtractor"""
+    # A dead worker (crash, OOM kill, Ctrl-C) surfaces as an error on its
+    # futures instead of hanging the caller, unlike multiprocessing.Pool
+    return ProcessPoolExecutor(max_workers=worker_count, initializer=_init_worker, initargs=(worker_count,))
+
+class WorkerPool:
+    """Warm worker pool for batch and watch mode that can replace its workers.
+
+    A document that hangs inside a MuPDF call never reaches the worker's
+    own hard timeout, and ProcessPoolExecutor cannot stop a single task, so
+    restart() kills every worker and starts fresh ones. A worker that dies
+    (crash, OOM kill) breaks the executor; the next submit replaces it.
+    """
+    
+    def __init__(self, worker_count: int):
+        self.worker_count = worker_count
+        self.executor = create_worker_pool(worker_count)
+    
+    def submit(self, pdf_path: str) -> Future:
+        return self.submit_task(_process_in_worker, pdf_path)
+    
+    def submit_task(self, function, *args) -> Future:
+        """Submit function(*args) to a worker, restarting the pool first if a dead worker broke it"""
+        try:
+            return self.executor.submit(function, *args)
+        except BrokenProcessPool:
+            self.restart()
+            return self.executor.submit(function, *args)
+    
+    def restart(self):
+        # The runaway task cannot be told apart from its neighbours, so every worker goes
+        for process in list((self.executor._processes or {}).values()):
+            process.kill()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = create_worker_pool(self.worker_count)
+    
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+    
+    def __enter__(self) -> 'WorkerPool':
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.shutdown(wait=True)
+
+def process_single_pdf(outline_extractor: OutlineExtractor, pdf: Union[str, PDFSource],
+                       hard_timeout_seconds: float = 0.0, hash_content: bool = False) -> Dict:
+    """Validate and extract one PDF, capturing failures (including the hard timeout) instead of raising.
+    
+    A path is read once into a PDFSource shared by validation, hashing and
+    parsing; hash_content fills result['content_hash'] even without the cache.
+    """
+    start_time = time.time()
+    result = {'pdf_path': pdf.name if isinstance(pdf, PDFSource) else pdf, 'status': 'ok', 'outline': None,
+              'error': None, 'cache_status': None, 'content_hash': None, 'metrics': None, 'profile_path': None}
+    
+    source = None
+    try:
+        # Validate PDF file before processing
+        try:
+            source = pdf if isinstance(pdf, PDFSource) else outline_extractor.open_source(pdf)
+            is_valid, error_msg = source.validate()
+        except OSError as e:
+            is_valid, error_msg = False, f"Cannot read PDF {Path(pdf).name}: {e.strerror or str(e)}"
+        if not is_valid:
+            result['status'] = 'invalid'
+            result['error'] = error_msg
+        else:
+            try:
+                with hard_timeout(hard_timeout_seconds):
+                    result['outline'] = outline_extractor.extract_outline(source)
+                result['cache_status'] = outline_extractor.last_cache_status
+                result['content_hash'] = outline_extractor.last_content_hash
+                if hash_content and result['content_hash'] is None:
+                    result['content_hash'] = source.sha256()
+            finally:
+                result['metrics'] = outline_extractor.last_metrics
+                result['profile_path'] = outline_extractor.last_profile_path
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    finally:
+        if source is not None and source is not pdf:
+            source.close()
+    
+    result['processing_time'] = time.time() - start_time
+    return result
+
+def process_pdf_bytes(outline_extractor: OutlineExtractor, data: bytes, filename: str,
+                      hard_timeout_seconds: float = 0.0) -> Dict:
+    """Extract a PDF received in memory, without staging it on disk; filename only feeds the title fallback"""
+    pdf_name = Path(filename).name or 'document.pdf'
+    return process_single_pdf(outline_extractor, PDFSource.from_bytes(data, pdf_name), hard_timeout_seconds)
+
+def iter_batch_results(pdf_files: List[Path], worker_count: int, settings: Settings) -> Iterator[Dict]:
+    """Yield extraction results in input order, serially or from a process pool"""
+    pdf_paths = [str(pdf_file) for pdf_file in pdf_files]
+    
+    if worker_count <= 1 or len(pdf_paths) <= 1:
+        outline_extractor = create_outline_extractor(settings)
+        for pdf_path in pdf_paths:
+            yield process_single_pdf(outline_extractor, pdf_path, settings.hard_timeout_seconds,
+                                     needs_content_hash(settings))
+        return
+    
+    with WorkerPool(min(worker_count, len(pdf_paths))) as pool:
+        yield from iter_pool_results(pool, pdf_files, settings.hard_timeout_seconds)
+
+def iter_pool_results(pool: WorkerPool, pdf_files: List[Path], hard_timeout_seconds: float = 0.0) -> Iterator[Dict]:
+    """Yield results in input order from an already running worker pool.
+
+    Workers enforce hard_timeout_seconds themselves. As a backstop, a file
+    with no result HARD_TIMEOUT_GRACE_SECONDS after that, counted from when
+    collection reaches it, gets the pool restarted; later files that had not
+    finished are submitted again. When a worker dies, only the file it was
+    running is reported as failed; see _rerun_after_crash.
+    """
+    pdf_paths = [str(pdf_file) for pdf_file in pdf_files]
+    futures = [pool.submit(pdf_path) for pdf_path in pdf_paths]
+    wait_limit = hard_timeout_seconds + HARD_TIMEOUT_GRACE_SECONDS if hard_timeout_seconds > 0 else None
+    resolved: Dict[int, Dict] = {}  # Results of files rerun after a worker crash
+    
+    try:
+        # Collecting in submission order keeps input order while workers run ahead
+        for position, pdf_path in enumerate(pdf_paths):
+            if position in resolved:
+                yield resolved.pop(position)
+                continue
+            try:
+                yield futures[position].result(timeout=wait_limit)
+            except FutureTimeout:
+                yield _failed_result(pdf_path, f'Hard timeout: no result after {wait_limit:g}s, '
+                                               f'worker processes restarted', wait_limit)
+                finished = [_succeeded(future) for future in futures]
+                pool.restart()
+                for later in range(position + 1, len(pdf_paths)):
+                    if not finished[later]:
+                        futures[later] = pool.submit(pdf_paths[later])
+            except BrokenProcessPool:
+                _rerun_after_crash(pool, pdf_paths, futures, position, wait_limit, resolved)
+                yield resolved.pop(position)
+    finally:
+        # Stopping early (continue_on_error off, shutdown) drops the queued files
+        for future in futures:
+            future.cancel()
+
+def _rerun_after_crash(pool: WorkerPool, pdf_paths: List[str], futures: List[Future], position: int,
+                       wait_limit: Optional[float], resolved: Dict[int, Dict]):
+    """Recover from a dead worker: find the file that killed it and resubmit the others.
+    
+    Workers take files in submission order, so the dead one was running one
+    of the first worker_count + 1 unfinished files (one more sits in the
+    call queue). Those are run again one at a time, so a crash can only be
+    theirs; the rest of the unfinished files go back to the pool in
+    parallel. The rerun results are added to resolved by position.
+    """
+    pool.restart()
+    unfinished = [later for later in range(position, len(pdf_paths))
+                  if later not in resolved and not _succeeded(futures[later])]
+    suspects = unfinished[:pool.worker_count + 1]
+    
+    for suspect in suspects:
+        start_time = time.time()
+        try:
+            resolved[suspect] = pool.submit(pdf_paths[suspect]).result(timeout=wait_limit)
+        except FutureTimeout:
+            resolved[suspect] = _failed_result(pdf_paths[suspect], f'Hard timeout: no result after {wait_limit:g}s, '
+                                                                   f'worker processes restarted', wait_limit)
+            pool.restart()
+        except BrokenProcessPool as e:
+            resolved[suspect] = _failed_result(pdf_paths[suspect],
+                                               f'Worker process failed: {str(e) or type(e).__name__}',
+                                               time.time() - start_time)
+            pool.restart()
+    
+    for later in unfinished[len(suspects):]:
+        futures[later] = pool.submit(pdf_paths[later])
+
+def _succeeded(future: Future) -> bool:
+    return future.done() and not future.cancelled() and future.exception() is None
+
+def _failed_result(pdf_path: str, error: str, processing_time: float) -> Dict:
+    return {'pdf_path': pdf_path, 'status': 'error', 'outline': None, 'cache_status': None, 'metrics': None,
+            'error': error, 'processing_time': processing_time}
+
+def write_result(result: Dict, settings: Settings, output_sink: OutputSink, validator: JSONValidator,
+                 logger: logging.Logger, metrics_writer: Optional[MetricsWriter] = None) -> bool:
+    """Log a processing result, validate and hand its outline to the sink; returns True when it was accepted.
+    
+    Sets result['validation'] to (is_valid, errors) and result['output_file'] to where the outline went.
+    """
+    metrics = result.get('metrics') or {'stages_ms': {}, 'counts': {}, 'peak_rss_mb': None, 'stage_rss_mb': {}}
+    metrics = dict(metrics, stages_ms=dict(metrics['stages_ms']))
+    success = _save_result(result, settings, output_sink, validator, logger, metrics)
+    
+    if metrics_writer is not None:
+        outline_data = result['outline'] or {}
+        metrics_writer.write({
+            'timestamp': round(time.time(), 3),
+            'file': Path(result['pdf_path']).name,
+            'status': result['status'] if success or result['status'] != 'ok' else 'write_failed',
+            'processing_time': round(result['processing_time'], 4),
+            'over_budget': result['processing_time'] > settings.timeout_seconds,
+            'cache_status': result['cache_status'],
+            'extraction_method': outline_data.get('metadata', {}).get('extraction_method'),
+            'partial': bool(outline_data.get('metadata', {}).get('partial')),
+            'error': result['error'],
+            **metrics
+        })
+    return success
+
+def _save_result(result: Dict, settings: Settings, output_sink: OutputSink, validator: JSONValidator,
+                 logger: logging.Logger, metrics: Dict) -> bool:
+    pdf_file = Path(result['pdf_path'])
+    processing_time = result['processing_time']
+    
+    if result['status'] == 'invalid':
+        logger.error(f"Invalid PDF {pdf_file.name}: {result['error']}")
+        return False
+    
+    if result['status'] == 'error':
+        logger.error(f"❌ Error processing {pdf_file.name}: {result['error']}")
+        logger.error(f"   Processing failed after {processing_time:.2f}s")
+        return False
+    
+    outline_data = result['outline']
+    if settings.include_output_metadata:
+        metadata = dict(outline_data.get('metadata', {}), pdf_filename=pdf_file.name,
+                        processing_time=round(processing_time, 4), stages_ms=dict(metrics['stages_ms']),
+                        peak_rss_mb=metrics['peak_rss_mb'])
+        if 'pages' in metrics['counts']:
+            metadata['total_pages'] = metrics['counts']['pages']
+        outline_data = dict(outline_data, metadata=metadata)
+    
+    content_hash = result.get('content_hash')
+    if output_sink.needs_content_hash and content_hash is None:
+        content_hash = OutlineCache.hash_file(pdf_file)
+    
+    # Validate the outline in memory; it is still written so the batch has an output per PDF
+    stage_start = time.perf_counter()
+    is_valid, validation_errors = validator.validate_outline_output(outline_data)
+    metrics['stages_ms']['validate_output'] = round((time.perf_counter() - stage_start) * 1000, 3)
+    result['validation'] = (is_valid, validation_errors)
+    if not is_valid:
+        logger.warning(f"Output validation issues for {pdf_file.name}: {validation_errors}")
+    
+    stage_start = time.perf_counter()
+    try:
+        output_location = output_sink.write(pdf_file.name, outline_data, content_hash)
+    except Exception as e:
+        logger.error(f"Output sink error for {pdf_file.name}: {str(e)}")
+        output_location = None
+    metrics['stages_ms']['write_json'] = round((time.perf_counter() - stage_start) * 1000, 3)
+    if output_location is None:
+        logger.error(f"Failed to save output for {pdf_file.name}")
+        return False
+    result['output_file'] = output_location
+    
+    # Check timing compliance (≤10 seconds requirement)
+    if processing_time > settings.timeout_seconds:
+        logger.warning(f"Processing time {processing_time:.2f}s exceeds {settings.timeout_seconds}s limit "
+                       f"(slowest stage: {slowest_stage(metrics)})")
+    
+    logger.info(f"✅ Successfully processed {pdf_file.name} -> {Path(output_location).name}")
+    cache_note = " (cache hit)" if result['cache_status'] == 'hit' else ""
+    logger.info(f"   Extracted {len(outline_data.get('outline', []))} headings in {processing_time:.2f}s{cache_note}")
+    return True
@@ -0,0 +1,140 @@
+"""
+Compact columnar storage for text blocks
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class TextBlockStore:
+    """Column-oriented replacement for a list of text block dicts.
+
+    Numeric attributes live in typed arrays (bbox flattened to four values
+    per block), font names are interned into ``font_names`` and referenced by
+    id, and all text shares one UTF-8 buffer addressed by ``text_offsets``.
+    ``features`` and ``numbering_depth`` (-1 when the text is not numbered)
+    carry HeadingDetector text features for candidate stores.
+    """
+
+    def __init__(self):
+        self.font_size = array('d')
+        self.font_flags = array('i')
+        self.font_id = array('i')
+        self.page = array('i')
+        self.bbox = array('d')
+        self.features = array('B')
+        self.numbering_depth = array('b')
+        self.font_names: List[str] = []
+        self.text_offsets = array('q', [0])
+        self._text = bytearray()
+        self._font_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.font_size)
+
+    def append(self, text: str, font_size: float, font_flags: int, font_name: str,
+               bbox: Tuple[float, float, float, float], page: int, features: int = 0,
+               numbering_depth: Optional[int] = None):
+        """Add one block to the end of the store"""
+        font_id = self._font_index.get(font_name)
+        if font_id is None:
+            font_id = len(self.font_names)
+            self._font_index[font_name] = font_id
+            self.font_names.append(font_name)
+
+        self._text += text.encode('utf-8')
+        self.text_offsets.append(len(self._text))
+        self.font_size.append(font_size)
+        self.font_flags.append(font_flags)
+        self.font_id.append(font_id)
+        self.page.append(page)
+        self.bbox.extend(bbox)
+        self.features.append(features)
+        # Depths past 3 all map to H4, so clamping keeps the column one byte wide
+        self.numbering_depth.append(-1 if numbering_depth is None else min(numbering_depth, 127))
+
+    def append_block(self, block: Dict, features: int = 0):
+        """Add a block given in the PDFParser dict layout"""
+        self.append(block['text'], block['font_size'], block['font_flags'],
+                    block['font_name'], block['bbox'], block['page'], features)
+
+    def text(self, index: int) -> str:
+        """Text of a block"""
+        return self._text[self.text_offsets[index]:self.text_offsets[index + 1]].decode('utf-8')
+
+    def get_bbox(self, index: int) -> Tuple[float, float, float, float]:
+        """Bounding box of a block"""
+        start = index * 4
+        return tuple(self.bbox[start:start + 4])
+
+    def get_numbering_depth(self, index: int) -> Optional[int]:
+        """Numbering depth recorded for a candidate, or None"""
+        depth = self.numbering_depth[index]
+        return None if depth < 0 else depth
+
+    def block(self, index: int) -> Dict:
+        """Materialize one block in the PDFParser dict layout"""
+        return {
+            'text': self.text(index),
+            'font_size': self.font_size[index],
+            'font_flags': self.font_flags[index],
+            'font_name': self.font_names[self.font_id[index]],
+            'bbox': self.get_bbox(index),
+            'page': self.page[index]
+        }
+
+    def take(self, indices: Iterable[int]) -> 'TextBlockStore':
+        """New store with the given blocks, in the order given"""
+        selected = TextBlockStore()
+        for index in indices:
+            selected.append(self.text(index), self.font_size[index], self.font_flags[index],
+                            self.font_names[self.font_id[index]], self.get_bbox(index), self.page[index],
+                            self.features[index], self.get_numbering_depth(index))
+        return selected
+
+    def keep(self, indices: Iterable[int]):
+        """Keep only the given blocks, in ascending order, compacting the columns in place.
+
+        Unlike take, no second copy of the surviving blocks is built, so
+        pruning a large store does not double its memory on the way.
+        """
+        bbox = self.bbox
+        offsets = self.text_offsets
+        count = 0
+        text_end = 0
+        for index in indices:
+            index = int(index)
+            start, end = offsets[index], offsets[index + 1]
+            if index != count:
+                self._text[text_end:text_end + end - start] = self._text[start:end]
+                for column in (self.font_size, self.font_flags, self.font_id, self.page,
+                               self.features, self.numbering_depth):
+                    column[count] = column[index]
+                bbox[count * 4:count * 4 + 4] = bbox[index * 4:index * 4 + 4]
+            text_end += end - start
+            count += 1
+            offsets[count] = text_end
+
+        del self._text[text_end:]
+        del offsets[count + 1:]
+        for column in (self.font_size, self.font_flags, self.font_id, self.page,
+                       self.features, self.numbering_depth):
+            del column[count:]
+        del bbox[count * 4:]
+
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(len(self)):
+            yield self.block(index)
+
+    def rows(self) -> Iterator[Tuple]:
+        """Yield (text, font_size, font_flags, font_name, bbox, page) without building dicts"""
+        for index in range(len(self)):
+            yield (self.text(index), self.font_size[index], self.font_flags[index],
+                   self.font_names[self.font_id[index]], self.get_bbox(index), self.page[index])
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and text buffer"""
+        columns = (self.font_size, self.font_flags, self.font_id, self.page,
+                   self.bbox, self.features, self.numbering_depth, self.text_offsets)
+        total = sum(column.itemsize * len(column) for column in columns)
+        return total + len(self._text) + sum(len(name) for name in self.font_names)
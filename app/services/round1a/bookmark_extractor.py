@@ -0,0 +1,64 @@
+"""
+Embedded bookmark (PDF outline) fast path for Round 1A
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+# Bump whenever the quality check or level mapping changes, so cached outlines are invalidated
+BOOKMARK_VERSION = '1'
+
+class BookmarkExtractor:
+    """Turn a PDF's own table of contents into outline entries.
+
+    The table of contents is trusted only when it looks like a real outline:
+    enough entries, nearly all of them with text and an in-range page, and
+    pages that mostly run in reading order. Anything less is rejected so the
+    heuristic pipeline runs instead.
+    """
+
+    def __init__(self, max_level: int = 6, min_entries: int = 2, min_valid_ratio: float = 0.8,
+                 min_ordered_ratio: float = 0.8):
+        self.logger = logging.getLogger(__name__)
+        self.max_level = max_level
+        self.min_entries = min_entries
+        self.min_valid_ratio = min_valid_ratio
+        self.min_ordered_ratio = min_ordered_ratio
+
+    def get_config(self) -> Dict:
+        """Everything that influences bookmark outputs, for cache fingerprints"""
+        return {
+            'version': BOOKMARK_VERSION,
+            'max_level': self.max_level,
+            'min_entries': self.min_entries,
+            'min_valid_ratio': self.min_valid_ratio,
+            'min_ordered_ratio': self.min_ordered_ratio
+        }
+
+    def build_outline(self, toc: List[list], page_count: int) -> Optional[List[Dict]]:
+        """Map get_toc() entries to {level, text, page}, or None when the TOC fails the quality check"""
+        if len(toc) < self.min_entries:
+            return None
+
+        outline = []
+        for entry in toc:
+            level, title, page = entry[0], entry[1], entry[2]
+            text = ' '.join(str(title).split())
+            # Entries pointing outside the document (external links, broken targets) use page <= 0
+            if text and 1 <= page <= page_count:
+                outline.append({
+                    'level': f'H{min(max(level, 1), self.max_level)}',
+                    'text': text,
+                    'page': page
+                })
+
+        if len(outline) < self.min_entries or len(outline) < len(toc) * self.min_valid_ratio:
+            self.logger.debug(f'Bookmarks rejected: {len(outline)}/{len(toc)} usable entries')
+            return None
+
+        ordered = sum(1 for previous, current in zip(outline, outline[1:]) if current['page'] >= previous['page'])
+        if ordered < (len(outline) - 1) * self.min_ordered_ratio:
+            self.logger.debug(f'Bookmarks rejected: only {ordered}/{len(outline) - 1} entries in page order')
+            return None
+
+        return outline
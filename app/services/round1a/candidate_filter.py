@@ -0,0 +1,146 @@
+"""
+Cheap candidate pre-filter between PDFParser and HeadingDetector
+"""
+
+import logging
+import math
+import re
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+from services.round1a.block_store import TextBlockStore
+from services.round1a.heading_detector import (
+    FEATURE_BOLD, FEATURE_COLON, FEATURE_KEYWORD, FEATURE_LEFT_MARGIN, FEATURE_LENGTH, FEATURE_PATTERN,
+    HeadingDetector
+)
+
+# Text features the pre-filter cannot see without running the matcher; assumed present
+ASSUMED_TEXT_FEATURES = FEATURE_PATTERN | FEATURE_KEYWORD | FEATURE_COLON
+
+DIGITS = re.compile(r'\d+')
+
+def running_key(text: str, top: float, y_band: float) -> Tuple[str, int]:
+    """(normalized text, y-band) a running header or footer keeps from page to page"""
+    # Digits are masked so "Page 3 of 12" and "Page 4 of 12" share a key
+    return DIGITS.sub('#', ' '.join(text.lower().split())), int(top // y_band)
+
+def numeric_features(text: str, font_flags: int, x0: float) -> int:
+    """Feature bits of the numeric bound: the text features assumed, the rest exact"""
+    features = ASSUMED_TEXT_FEATURES
+    if font_flags & 2**4:
+        features |= FEATURE_BOLD
+    if 3 <= len(text) <= 100:
+        features |= FEATURE_LENGTH
+    if x0 < 100:
+        features |= FEATURE_LEFT_MARGIN
+    return features
+
+class CandidateFilter:
+    """Drop lines that can never become headings before any text matching runs.
+
+    Lines are stored by collect_lines while pages stream in, each with the
+    numeric feature bits it can be judged by without the matcher. Once the
+    body text size is known, filter makes two passes:
+
+    * numeric bound - font ratio, bold flag, left edge and length give an
+      upper bound on the heading score by assuming every text feature
+      matches; lines whose bound is below the threshold are dropped. The
+      bound goes through HeadingDetector.score_features_batch, so it never
+      prunes a line the full scoring would keep.
+    * running headers and footers - text that repeats at the same height
+      (normalized text, y-band) on enough pages is page furniture, not
+      structure, and is removed. Lines with a leading section number are
+      never treated as running lines.
+    """
+
+    def __init__(self, heading_detector: HeadingDetector, remove_running: bool = True,
+                 y_band: float = 10.0, min_repeat_pages: int = 3, min_repeat_ratio: float = 0.5):
+        self.logger = logging.getLogger(__name__)
+        self.heading_detector = heading_detector
+        self.remove_running = remove_running
+        self.y_band = y_band
+        self.min_repeat_pages = min_repeat_pages
+        self.min_repeat_ratio = min_repeat_ratio
+
+    def get_config(self) -> Dict:
+        """Everything that influences filter output, for cache fingerprints"""
+        # The numeric bound is output-neutral; only running line removal changes results
+        if not self.remove_running:
+            return {'remove_running': False}
+        return {
+            'remove_running': True,
+            'y_band': self.y_band,
+            'min_repeat_pages': self.min_repeat_pages,
+            'min_repeat_ratio': self.min_repeat_ratio
+        }
+
+    def collect_lines(self, text_blocks: Iterable[Dict]) -> TextBlockStore:
+        """Store the stripped lines of streamed blocks, with their numeric feature bits"""
+        lines = TextBlockStore()
+        for block in text_blocks:
+            text = block['text'].strip()
+            # Same minimum length HeadingDetector.collect_candidates applies
+            if len(text) < 2:
+                continue
+            bbox = block['bbox']
+            lines.append(text, block['font_size'], block['font_flags'], block['font_name'], bbox, block['page'],
+                         numeric_features(text, block['font_flags'], bbox[0]))
+        return lines
+
+    def filter(self, lines: TextBlockStore, doc_stats: Dict, page_count: int) -> Tuple[TextBlockStore, Dict]:
+        """Prune the lines of collect_lines in place; returns them and a report of what was pruned"""
+        line_count = len(lines)
+        keep = self._numeric_survivors(lines, doc_stats)
+        survivor_count = int(np.count_nonzero(keep))
+
+        running_count = 0
+        if self.remove_running:
+            running = self._running_lines(lines, keep, page_count)
+            running_count = int(np.count_nonzero(running))
+            keep &= ~running
+
+        if survivor_count - running_count < line_count:
+            lines.keep(np.flatnonzero(keep))
+        report = {
+            'lines': line_count,
+            'pruned_numeric': line_count - survivor_count,
+            'pruned_running': running_count,
+            'kept': len(lines)
+        }
+        return lines, report
+
+    def _numeric_survivors(self, lines: TextBlockStore, doc_stats: Dict) -> np.ndarray:
+        """Mask of the lines whose best possible score still reaches the threshold"""
+        body_text_size = doc_stats.get('body_text_size', doc_stats['avg_font_size'])
+        font_ratios = np.frombuffer(lines.font_size, dtype=np.float64) / body_text_size
+        bounds = self.heading_detector.score_features_batch(font_ratios, np.frombuffer(lines.features, dtype=np.uint8))
+        return bounds >= self.heading_detector.score_threshold
+
+    def _running_lines(self, lines: TextBlockStore, survivors: np.ndarray, page_count: int) -> np.ndarray:
+        """Mask of the survivors whose (normalized text, y-band) pair repeats across enough pages"""
+        running = np.zeros(len(lines), dtype=bool)
+        min_pages = self._min_repeat_pages(page_count)
+        indices = np.flatnonzero(survivors)
+        if page_count < min_pages or len(indices) == 0:
+            return running
+
+        # One hashed key per line keeps this compact on long documents
+        keys = np.fromiter((hash(running_key(lines.text(index), lines.bbox[index * 4 + 1], self.y_band))
+                            for index in indices), dtype=np.int64, count=len(indices))
+        pages = np.frombuffer(lines.page, dtype=np.int32)[indices].astype(np.int64)
+
+        # Distinct (key, page) pairs, then pages per key
+        pairs = np.unique(np.stack([keys, pages], axis=1), axis=0)
+        unique_keys, page_counts = np.unique(pairs[:, 0], return_counts=True)
+        repeated = unique_keys[page_counts >= min_pages]
+
+        # Section numbers are structure, even when "N. Chapter N" sits at the same height on every page
+        text_matcher = self.heading_detector.text_matcher
+        for index in indices[np.isin(keys, repeated)]:
+            if text_matcher.numbering_depth(lines.text(index)) is None:
+                running[index] = True
+        return running
+
+    def _min_repeat_pages(self, page_count: int) -> int:
+        return max(self.min_repeat_pages, math.ceil(page_count * self.min_repeat_ratio))
@@ -0,0 +1,184 @@
+"""
+Watch mode for Round 1A - process PDFs as they land in the input directory
+"""
+
+import json
+import logging
+import os
+import signal
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config.settings import Settings
+from services.round1a.batch_runner import (
+    WorkerPool, check_memory_budget, create_outline_extractor, create_output_sink, iter_pool_results, needs_content_hash,
+    process_single_pdf, write_result
+)
+from utils.file_handler import FileHandler
+from utils.instrumentation import MetricsWriter
+from utils.json_validator import JSONValidator
+
+# How many processed files to allow between manifest saves within one poll
+MANIFEST_SAVE_EVERY = 100
+
+class DirectoryWatcher:
+    """Long-running loop that keeps the extractor warm and polls the input directory.
+
+    A PDF is processed when its (size, mtime) signature differs from the one
+    recorded in the manifest, and only once that signature has been stable
+    for a poll interval so files still being copied in are left alone. The
+    manifest is persisted next to the logs, so a restarted watcher skips
+    everything it already handled.
+    """
+
+    def __init__(self, settings: Settings, logger: Optional[logging.Logger] = None):
+        self.settings = settings
+        self.logger = logger or logging.getLogger(__name__)
+        self.file_handler = FileHandler()
+        self.validator = JSONValidator()
+        self.output_sink = create_output_sink(settings, self.file_handler)
+        self.metrics_writer = MetricsWriter(settings.get_metrics_path()) if settings.enable_metrics else None
+        self.manifest_path = settings.get_watch_manifest_path()
+        self.manifest: Dict[str, Dict] = self._load_manifest()
+        self._unsettled: Dict[str, Tuple[int, int]] = {}
+        self._stop_requested = False
+
+    def run(self):
+        """Poll until SIGTERM/SIGINT, processing new or changed PDFs"""
+        worker_count = self.settings.get_worker_count()
+        self.logger.info(f"Watch mode: polling {self.settings.get_input_path()} every "
+                         f"{self.settings.watch_interval_seconds}s with {worker_count} worker(s)")
+        self.logger.info(f"Manifest: {self.manifest_path} ({len(self.manifest)} files already processed)")
+        check_memory_budget(self.settings, worker_count, self.logger)
+
+        pool = None
+        if worker_count > 1:
+            pool = WorkerPool(worker_count)
+            process_files = lambda pdf_files: iter_pool_results(pool, pdf_files, self.settings.hard_timeout_seconds)
+        else:
+            outline_extractor = create_outline_extractor(self.settings)
+            process_files = lambda pdf_files: (
+                process_single_pdf(outline_extractor, str(pdf_file), self.settings.hard_timeout_seconds,
+                                   needs_content_hash(self.settings))
+                for pdf_file in pdf_files
+            )
+
+        # Pool workers reset these in their initializer, so only this process reacts
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        try:
+            while not self._stop_requested:
+                self.poll_once(process_files)
+                self._sleep(self.settings.watch_interval_seconds)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            self.output_sink.close()
+            self._save_manifest()
+            self.logger.info("Watch mode stopped")
+
+    def poll_once(self, process_files: Callable[[List[Path]], Iterator[Dict]]) -> int:
+        """Process every settled new or changed PDF once; returns how many were handled"""
+        ready = self._find_ready_files()
+        if not ready:
+            return 0
+
+        self.logger.info(f"Detected {len(ready)} new or changed PDF(s)")
+        signatures = {pdf_file.name: signature for pdf_file, signature in ready}
+        handled = 0
+
+        for result in process_files([pdf_file for pdf_file, _ in ready]):
+            pdf_name = Path(result['pdf_path']).name
+            success = write_result(result, self.settings, self.output_sink, self.validator, self.logger,
+                                   metrics_writer=self.metrics_writer)
+
+            size, mtime_ns = signatures[pdf_name]
+            self.manifest[pdf_name] = {
+                'size': size,
+                'mtime_ns': mtime_ns,
+                'status': 'ok' if success else 'failed',
+                'output': Path(result['output_file']).name if success else None,
+                'processed_at': time.time()
+            }
+            handled += 1
+            if handled % MANIFEST_SAVE_EVERY == 0:
+                # Outputs first: the manifest must not record files whose outlines are still buffered
+                self.output_sink.flush()
+                self._save_manifest()
+
+            if self._stop_requested:
+                break
+
+        self.output_sink.flush()
+        self._save_manifest()
+        return handled
+
+    def _find_ready_files(self) -> List[Tuple[Path, Tuple[int, int]]]:
+        """New or changed PDFs whose size and mtime have stopped moving"""
+        ready = []
+        seen = set()
+        now_ns = time.time_ns()
+        settle_ns = int(self.settings.watch_interval_seconds * 1e9)
+
+        for pdf_file in sorted(self.settings.get_input_path().glob('*.pdf')):
+            try:
+                stat = pdf_file.stat()
+            except OSError:
+                continue  # Removed between listing and stat
+
+            signature = (stat.st_size, stat.st_mtime_ns)
+            seen.add(pdf_file.name)
+
+            recorded = self.manifest.get(pdf_file.name)
+            if recorded is not None and (recorded['size'], recorded['mtime_ns']) == signature:
+                continue
+
+            # Old enough, or unchanged since the previous poll: the writer is done with it
+            if self._unsettled.get(pdf_file.name) == signature or now_ns - stat.st_mtime_ns >= settle_ns:
+                self._unsettled.pop(pdf_file.name, None)
+                ready.append((pdf_file, signature))
+            else:
+                self._unsettled[pdf_file.name] = signature
+
+        # Forget files that disappeared so a re-added copy is processed again
+        for pdf_name in list(self.manifest):
+            if pdf_name not in seen:
+                del self.manifest[pdf_name]
+        for pdf_name in list(self._unsettled):
+            if pdf_name not in seen:
+                del self._unsettled[pdf_name]
+
+        return ready
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            return self.file_handler.load_json(self.manifest_path)
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable watch manifest {self.manifest_path}: {str(e)}")
+            return {}
+
+    def _save_manifest(self):
+        """Atomically replace the manifest file"""
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.manifest_path.parent, prefix='.', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            self.logger.error(f"Could not save watch manifest: {str(e)}")
+
+    def _request_stop(self, signum, frame):
+        self.logger.info(f"Received signal {signum}, finishing current work and stopping")
+        self._stop_requested = True
+
+    def _sleep(self, seconds: float):
+        """Sleep in short steps so a stop request is noticed quickly"""
+        deadline = time.monotonic() + seconds
+        while not self._stop_requested and time.monotonic() < deadline:
+            time.sleep(min(0.2, deadline - time.monotonic()))
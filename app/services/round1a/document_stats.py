@@ -0,0 +1,58 @@
+"""
+Incremental document statistics for streamed text blocks
+"""
+
+from typing import Dict
+
+
+class DocumentStatsAccumulator:
+    """Running font size histogram, updated one block at a time.
+
+    Holds only a count per rounded font size, so documents can be streamed
+    page by page without keeping their blocks around to compute stats.
+    """
+
+    def __init__(self):
+        self.font_size_counts: Dict[float, int] = {}
+        self.total_blocks = 0
+        self.font_size_sum = 0.0
+        self.max_font_size = None
+        self.min_font_size = None
+
+    def add(self, font_size: float):
+        """Record the font size of one text block"""
+        rounded_size = round(font_size, 1)
+        self.font_size_counts[rounded_size] = self.font_size_counts.get(rounded_size, 0) + 1
+        self.total_blocks += 1
+        self.font_size_sum += font_size
+
+        if self.max_font_size is None or font_size > self.max_font_size:
+            self.max_font_size = font_size
+        if self.min_font_size is None or font_size < self.min_font_size:
+            self.min_font_size = font_size
+
+    def to_stats(self) -> Dict:
+        """Build the stats dict consumed by HeadingDetector"""
+        if not self.total_blocks:
+            return {
+                'avg_font_size': 12,
+                'max_font_size': 12,
+                'min_font_size': 12,
+                'total_blocks': 0,
+                'font_size_distribution': {},
+                'most_common_size': 12,
+                'body_text_size': 12
+            }
+
+        # Find most common font sizes
+        sorted_sizes = sorted(self.font_size_counts.items(), key=lambda x: x[1], reverse=True)
+
+        return {
+            'avg_font_size': self.font_size_sum / self.total_blocks,
+            'max_font_size': self.max_font_size,
+            'min_font_size': self.min_font_size,
+            'total_blocks': self.total_blocks,
+            'font_size_distribution': dict(self.font_size_counts),
+            'most_common_size': sorted_sizes[0][0] if sorted_sizes else 12,
+            'body_text_size': sorted_sizes[0][0] if sorted_sizes else 12  # Assume most common is body text
+        }
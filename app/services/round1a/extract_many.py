@@ -0,0 +1,283 @@
+"""
+Streaming multi-document extraction for Round 1A - backs OutlineExtractor.extract_many
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from services.round1a.batch_runner import HARD_TIMEOUT_GRACE_SECONDS, WorkerPool, _extract_item_in_worker
+from services.round1a.outline_extractor import OutlineExtractor
+from utils.deadline import HardTimeout, hard_timeout
+from utils.outline_cache import OutlineCache
+from utils.page_cache import PageCache
+
+Outcome = Union[Dict, Exception]
+
+def iter_extract_many(extractor: OutlineExtractor, items: Iterable, workers: int = 1, executor: str = 'thread',
+                      ordered: bool = True, timeout: Optional[float] = None) -> Iterator[Tuple[Any, Outcome]]:
+    """Implementation of OutlineExtractor.extract_many; see there for the arguments"""
+    if executor not in ('thread', 'process'):
+        raise ValueError(f"executor must be 'thread' or 'process', not {executor!r}")
+    if timeout is None:
+        timeout = extractor.settings.hard_timeout_seconds
+    entries = (_identify(position, item) for position, item in enumerate(items))
+
+    if executor == 'process':
+        return _iter_processes(entries, workers, ordered, timeout)
+    if workers <= 1:
+        return _iter_inline(extractor, entries, timeout)
+    return _iter_threads(extractor, entries, workers, ordered, timeout)
+
+def _identify(position: int, item: Any) -> Tuple[Any, Any, str]:
+    """(id, pdf, name) for a path, bytes, a file object or an explicit (id, pdf) pair"""
+    if isinstance(item, tuple) and len(item) == 2:
+        item_id, pdf = item
+    elif isinstance(item, (str, os.PathLike)):
+        item_id, pdf = str(item), item
+    else:
+        item_id, pdf = getattr(item, 'name', None) or position, item
+    if isinstance(pdf, os.PathLike):
+        pdf = str(pdf)
+
+    if isinstance(pdf, str):
+        name = Path(pdf).name
+    else:
+        # Title fallback and messages: file objects usually carry their path, bare bytes fall back to the id
+        name = Path(str(getattr(pdf, 'name', '') or item_id)).name
+    return item_id, pdf, name
+
+def _read(pdf: Any) -> Union[str, bytes, bytearray, memoryview]:
+    """Paths and buffers as they are; file objects are read to the end"""
+    if isinstance(pdf, (str, bytes, bytearray, memoryview)):
+        return pdf
+    return pdf.read()
+
+def _extract(extractor: OutlineExtractor, pdf: Any, name: str) -> Dict:
+    data = _read(pdf)
+    return extractor.extract_outline(data, name=name if not isinstance(data, str) else None)
+
+def _iter_inline(extractor: OutlineExtractor, entries: Iterator, timeout: float) -> Iterator[Tuple[Any, Outcome]]:
+    """One at a time in the calling thread, which enforces the timeout itself when it is the main thread"""
+    for item_id, pdf, name in entries:
+        try:
+            with hard_timeout(timeout):
+                outcome = _extract(extractor, pdf, name)
+        except HardTimeout as e:
+            outcome = TimeoutError(str(e))
+        except Exception as e:
+            outcome = e
+        yield item_id, outcome
+
+def _iter_threads(extractor: OutlineExtractor, entries: Iterator, workers: int, ordered: bool,
+                  timeout: float) -> Iterator[Tuple[Any, Outcome]]:
+    """Worker threads, each with its own extractor.
+
+    PyMuPDF keeps the GIL during its calls, so threads mostly overlap input
+    reads (file objects, network storage) and waiting; use processes for CPU
+    parallelism. A thread cannot be stopped: an item past its timeout is
+    reported as TimeoutError and its thread finishes in the background,
+    holding its worker until then; the executor='process' path replaces
+    stuck workers instead.
+    """
+    local = threading.local()
+
+    def run(pdf: Any, name: str, started: List[Optional[float]]) -> Dict:
+        # The timeout runs from here, once a worker has picked the item up
+        started[0] = time.monotonic()
+        if not hasattr(local, 'extractor'):
+            local.extractor = _clone_extractor(extractor)
+        return _extract(local.extractor, pdf, name)
+
+    def submit(entry: Tuple[Any, Any, str]) -> Tuple[Future, List[Optional[float]]]:
+        started = [None]
+        return pool.submit(run, entry[1], entry[2], started), started
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='outline')
+    try:
+        yield from _collect(submit, entries, workers, ordered, timeout, _thread_outcome)
+    finally:
+        # Abandoned (timed out) threads are not waited for
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _clone_extractor(extractor: OutlineExtractor) -> OutlineExtractor:
+    """Extractor for one worker thread, sharing the cache files but no mutable state"""
+    outline_cache = None
+    if extractor.outline_cache is not None:
+        outline_cache = OutlineCache(extractor.outline_cache.cache_dir, extractor.outline_cache.max_bytes)
+    page_cache = None
+    if extractor.pdf_parser.page_cache is not None:
+        # SQLite connections stay with the thread that opened them
+        page_cache = PageCache(extractor.pdf_parser.page_cache.db_path, extractor.pdf_parser.page_cache.max_bytes)
+    # The profiler keeps no state between runs, so threads can share it
+    clone = OutlineExtractor(outline_cache=outline_cache, profiler=extractor.profiler, page_cache=page_cache)
+    # Split subprocesses per thread would oversubscribe the CPUs
+    clone.pdf_parser.split_threshold = 0
+    return clone
+
+def _thread_outcome(future: Future) -> Outcome:
+    return future.exception() or future.result()
+
+def _iter_processes(entries: Iterator, workers: int, ordered: bool, timeout: float) -> Iterator[Tuple[Any, Outcome]]:
+    """Warm worker processes built from Settings, as in batch mode.
+
+    Workers enforce the timeout themselves; a worker stuck inside MuPDF
+    past timeout plus HARD_TIMEOUT_GRACE_SECONDS gets the pool restarted and
+    the other in-flight items are submitted again. A worker that dies
+    gets the pool restarted too, and only its own item fails.
+    """
+    pool = WorkerPool(max(workers, 1))
+    # File objects cannot be pickled, so they are read here as the window refills; paths are read by the worker
+    entries = ((item_id, _read(pdf), name) for item_id, pdf, name in entries)
+
+    def submit(entry: Tuple[Any, Any, str]) -> Tuple[Future, List[Optional[float]]]:
+        # No more items in flight than workers, so an item starts about when it is submitted
+        return pool.executor.submit(_extract_item_in_worker, entry[1], entry[2], timeout), [time.monotonic()]
+
+    try:
+        yield from _collect(submit, entries, max(workers, 1), ordered,
+                            timeout + HARD_TIMEOUT_GRACE_SECONDS if timeout > 0 else 0, _process_outcome,
+                            restart=pool.restart)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _process_outcome(future: Future) -> Outcome:
+    """Map a worker's process_single_pdf result to an outline or an exception"""
+    error = future.exception()
+    if error is not None:
+        return RuntimeError(f'Worker process failed: {str(error) or type(error).__name__}')
+    result = future.result()
+    if result['status'] == 'ok':
+        return result['outline']
+    if result['status'] == 'invalid':
+        return ValueError(f"Invalid PDF: {result['error']}")
+    if result['error'].startswith('Hard timeout'):
+        return TimeoutError(result['error'])
+    return RuntimeError(result['error'])
+
+class _InFlight:
+    """An item between submission and being yielded"""
+    __slots__ = ('entry', 'future', 'started', 'outcome')
+
+    def __init__(self, entry: Tuple[Any, Any, str]):
+        self.entry = entry
+        self.future: Optional[Future] = None  # None while waiting to be (re)submitted or once outcome is known
+        self.started: List[Optional[float]] = [None]
+        self.outcome: Optional[Outcome] = None
+
+    def running(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+    def broken(self) -> bool:
+        """Its worker process died (or was killed with the pool) before it finished"""
+        return (self.future is not None and self.future.done() and not self.future.cancelled()
+                and isinstance(self.future.exception(), BrokenProcessPool))
+
+    def ready(self) -> bool:
+        return self.outcome is not None or (self.future is not None and self.future.done() and not self.broken())
+
+def _collect(submit, entries: Iterator, window: int, ordered: bool, timeout: float, outcome_of,
+             restart=None) -> Iterator[Tuple[Any, Outcome]]:
+    """Keep window items in flight and yield (id, outcome) in input or completion order.
+
+    submit returns the future and a one-item list holding the time the item
+    started, or None until a worker picks it up; an item's timeout runs from
+    its start. restart, when given, replaces the worker processes: when one
+    is stuck, and when one died. Without it a timed-out item keeps its
+    worker busy, so its slot is not refilled until it ends.
+
+    A dead worker fails every item still running in the pool. If only one
+    was running, that item is reported as failed; otherwise they are all
+    submitted again one at a time, so the next crash names the culprit.
+    """
+    in_flight = deque()  # _InFlight records in input order
+    abandoned = []  # Futures of timed-out items still holding a worker
+    exhausted = False
+
+    def start(item: _InFlight):
+        try:
+            item.future, item.started = submit(item.entry)
+        except BrokenProcessPool:
+            # Died after the last check: its items are settled below once their futures fail too
+            if any(other.running() or other.broken() for other in in_flight if other is not item):
+                return
+            restart()
+            item.future, item.started = submit(item.entry)
+
+    while True:
+        abandoned = [future for future in abandoned if not future.done()]
+
+        broken = [item for item in in_flight if item.broken()]
+        if broken:
+            restart()
+            for item in broken:
+                if len(broken) == 1:
+                    error = item.future.exception()
+                    item.outcome = RuntimeError(f'Worker process failed: {str(error) or type(error).__name__}')
+                item.future = None
+
+        while in_flight and (in_flight[0].ready() or not ordered):
+            ready = [in_flight[0]] if ordered else [item for item in in_flight if item.ready()]
+            if not ready:
+                break
+            for item in ready:
+                in_flight.remove(item)
+                yield item.entry[0], item.outcome if item.outcome is not None else outcome_of(item.future)
+
+        waiting = [item for item in in_flight if item.future is None and item.outcome is None]
+        if waiting:
+            # Items a dead worker took down go back one at a time; new items wait until they are through
+            if not any(item.running() for item in in_flight):
+                start(waiting[0])
+        else:
+            while not exhausted and len(in_flight) + len(abandoned) < window:
+                entry = next(entries, None)
+                if entry is None:
+                    exhausted = True
+                    break
+                item = _InFlight(entry)
+                in_flight.append(item)
+                start(item)
+        if not in_flight:
+            if exhausted:
+                return
+            # Every worker is held by a timed-out item: wait for one to come back
+            wait(abandoned, return_when=FIRST_COMPLETED)
+            continue
+
+        # Wait for the head (input order) or for anything (completion order), but not past the oldest deadline
+        head = in_flight[0]
+        watched = [head] if ordered and head.future is not None else [item for item in in_flight if item.running()]
+        if not watched:
+            continue
+        now = time.monotonic()
+        wait_seconds = None
+        if timeout > 0:
+            # An item not picked up yet cannot expire before it starts
+            wait_seconds = max(min((item.started[0] or now) + timeout for item in watched) - now, 0)
+        done, _ = wait([item.future for item in watched], timeout=wait_seconds, return_when=FIRST_COMPLETED)
+        if done:
+            continue
+
+        now = time.monotonic()
+        expired = [item for item in watched if item.started[0] is not None and item.started[0] + timeout <= now]
+        if not expired:
+            continue
+        # The oldest watched item ran out of time
+        expired = min(expired, key=lambda item: item.started[0])
+        if not expired.future.cancel() and restart is None:
+            abandoned.append(expired.future)
+        expired.future = None
+        expired.outcome = TimeoutError(f'Hard timeout: no result after {timeout:g}s')
+        if restart is not None:
+            unfinished = [item for item in in_flight if item.future is not None
+                          and not (item.future.done() and not item.future.cancelled()
+                                   and item.future.exception() is None)]
+            restart()
+            for item in unfinished:
+                start(item)
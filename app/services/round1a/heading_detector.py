@@ -2,12 +2,53 @@
 Advanced heading detection with improved pattern recognition
 """
 
-import re
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from services.round1a.block_store import TextBlockStore
+from services.round1a.text_features import TextFeatureMatcher
+from utils.instrumentation import NULL_TIMER
+
+# Bump whenever a scoring or level change alters outputs, so cached outlines are invalidated
+DETECTOR_VERSION = '2'
+
+# Text feature bits - everything in the heading score except the font ratio,
+# which depends on the document body size and so is only known at the end
+FEATURE_BOLD = 1
+FEATURE_PATTERN = 2
+FEATURE_KEYWORD = 4
+FEATURE_LENGTH = 8
+FEATURE_COLON = 16
+FEATURE_LEFT_MARGIN = 32
+
+ALL_TEXT_FEATURES = (FEATURE_BOLD | FEATURE_PATTERN | FEATURE_KEYWORD | FEATURE_LENGTH
+                     | FEATURE_COLON | FEATURE_LEFT_MARGIN)
+
+# Lazy scoring evaluates text features cheapest first; the matcher regex goes last
+LAZY_FEATURE_ORDER = (FEATURE_BOLD, FEATURE_LEFT_MARGIN, FEATURE_LENGTH, FEATURE_COLON,
+                      FEATURE_KEYWORD, FEATURE_PATTERN)
+
+# Score contributions; the three font entries are alternatives picked by font ratio
+DEFAULT_SCORE_WEIGHTS = {
+    'font_large': 0.35,
+    'font_medium': 0.25,
+    'font_small': 0.15,
+    'bold': 0.25,
+    'pattern': 0.25,
+    'keyword': 0.1,
+    'length': 0.03,
+    'colon': 0.02,
+    'left_margin': 0.02
+}
+
+# Font ratio (block size / body size) needed for font_large, font_medium and font_small
+DEFAULT_FONT_RATIO_TIERS = (1.4, 1.2, 1.1)
 
 class HeadingDetector:
-    def __init__(self):
+    def __init__(self, score_weights: Optional[Dict[str, float]] = None,
+                 font_ratio_tiers: Optional[Tuple[float, float, float]] = None, score_threshold: float = 0.4):
         self.logger = logging.getLogger(__name__)
         
         # Enhanced heading patterns
@@ -34,66 +75,212 @@ class HeadingDetector:
             'abstract', 'methodology', 'results', 'discussion', 'future work',
             'contents', 'revision', 'history', 'requirements', 'specifications'
         ]
+        
+        # Minimum score for a block to be kept as a heading
+        self.score_threshold = score_threshold
+        
+        # Scoring configuration; unknown weight names are rejected so typos do not go unnoticed
+        self.score_weights = dict(DEFAULT_SCORE_WEIGHTS)
+        for name, weight in (score_weights or {}).items():
+            if name not in self.score_weights:
+                raise ValueError(f'Unknown heading score weight: {name}')
+            self.score_weights[name] = float(weight)
+        self.font_ratio_tiers = tuple(font_ratio_tiers or DEFAULT_FONT_RATIO_TIERS)
+        
+        # Patterns, numbering and keywords compiled into one matcher
+        self.text_matcher = TextFeatureMatcher(self.heading_patterns, self.heading_keywords)
+        
+        # Stage timer, swapped in by OutlineExtractor while it collects metrics
+        self.timer = NULL_TIMER
+        
+        # score_features for every font tier and feature combination, so lazy
+        # scoring bounds are table lookups that match full scoring exactly
+        self._score_table = [
+            [self.score_features(tier_ratio, features) for features in range(ALL_TEXT_FEATURES + 1)]
+            for tier_ratio in self.font_ratio_tiers + (0.0,)
+        ]
+    
+    def get_config(self) -> Dict:
+        """Everything that influences detection output, for cache fingerprints"""
+        return {
+            'version': DETECTOR_VERSION,
+            'heading_patterns': list(self.heading_patterns),
+            'heading_keywords': list(self.heading_keywords),
+            'score_threshold': self.score_threshold,
+            'score_weights': self.score_weights,
+            'font_ratio_tiers': list(self.font_ratio_tiers)
+        }
     
     def calculate_heading_score(self, block: Dict, doc_stats: Dict) -> float:
         """Enhanced multi-factor heading detection scoring"""
-        score = 0.0
         text = block['text'].strip()
         
         if not text:
             return 0.0
         
-        # Font size factor (35% weight)
         body_text_size = doc_stats.get('body_text_size', doc_stats['avg_font_size'])
         font_ratio = block['font_size'] / body_text_size
         
-        if font_ratio >= 1.4:
-            score += 0.35
-        elif font_ratio >= 1.2:
-            score += 0.25
-        elif font_ratio >= 1.1:
-            score += 0.15
+        return self.score_features(font_ratio, self.extract_text_features(block, text))
+    
+    def extract_text_features(self, block: Dict, text: str) -> int:
+        """Evaluate the body-size independent factors of a block as feature bits"""
+        return self._text_features(text, block['font_flags'], block['bbox'][0])
+    
+    def _text_features(self, text: str, font_flags: int, x0: float) -> int:
+        """Feature bits from a block's stripped text, font flags and left edge"""
+        return self._text_features_with_depth(text, font_flags, x0)[0]
+    
+    def _text_features_with_depth(self, text: str, font_flags: int, x0: float) -> Tuple[int, Optional[int]]:
+        """Feature bits plus the numbering depth, from a single matcher pass over the text"""
+        features = 0
+        matches_pattern, matches_keyword, numbering_depth = self.text_matcher.match(text)
+        
+        # Bold/formatting factor
+        if font_flags & 2**4:  # Bold flag
+            features |= FEATURE_BOLD
+        
+        # Pattern matching
+        if matches_pattern:
+            features |= FEATURE_PATTERN
+        
+        # Keyword matching
+        if matches_keyword:
+            features |= FEATURE_KEYWORD
+        
+        # Length and formatting factors
+        if 3 <= len(text) <= 100:  # Reasonable heading length
+            features |= FEATURE_LENGTH
+        
+        if text.endswith(':'):  # Colon often indicates heading
+            features |= FEATURE_COLON
+        
+        # Position factor - headings often at start of line
+        if x0 < 100:  # Left margin
+            features |= FEATURE_LEFT_MARGIN
+        
+        return features, numbering_depth
+    
+    def _numbering_depth(self, text: str) -> Optional[int]:
+        """Number of dots in a leading section number (1, 1.2, 1.2.3 ...), or None"""
+        return self.text_matcher.numbering_depth(text)
+    
+    def score_features(self, font_ratio: float, features: int) -> float:
+        """Combine font ratio and text feature bits into the heading score"""
+        weights = self.score_weights
+        large, medium, small = self.font_ratio_tiers
+        score = 0.0
+        
+        # Font size factor (35% weight)
+        if font_ratio >= large:
+            score += weights['font_large']
+        elif font_ratio >= medium:
+            score += weights['font_medium']
+        elif font_ratio >= small:
+            score += weights['font_small']
         
         # Bold/formatting factor (25% weight)
-        if block['font_flags'] & 2**4:  # Bold flag
-            score += 0.25
+        if features & FEATURE_BOLD:
+            score += weights['bold']
         
         # Pattern matching (25% weight)
-        text_lower = text.lower()
-        for pattern in self.heading_patterns:
-            if re.match(pattern, text, re.IGNORECASE):
-                score += 0.25
-                break
+        if features & FEATURE_PATTERN:
+            score += weights['pattern']
         
         # Keyword matching (10% weight)
-        for keyword in self.heading_keywords:
-            if keyword in text_lower:
-                score += 0.1
-                break
+        if features & FEATURE_KEYWORD:
+            score += weights['keyword']
         
         # Length and formatting factors (5% weight)
-        if 3 <= len(text) <= 100:  # Reasonable heading length
-            score += 0.03
+        if features & FEATURE_LENGTH:
+            score += weights['length']
         
-        if text.endswith(':'):  # Colon often indicates heading
-            score += 0.02
+        if features & FEATURE_COLON:
+            score += weights['colon']
         
-        # Position factor - headings often at start of line
-        if block['bbox'][0] < 100:  # Left margin
-            score += 0.02
+        if features & FEATURE_LEFT_MARGIN:
+            score += weights['left_margin']
         
         return min(score, 1.0)
     
+    def _font_tier(self, font_ratio: float) -> int:
+        """Row of the score table for a font ratio (3 = no font credit)"""
+        large, medium, small = self.font_ratio_tiers
+        if font_ratio >= large:
+            return 0
+        if font_ratio >= medium:
+            return 1
+        if font_ratio >= small:
+            return 2
+        return 3
+    
+    def score_lazily(self, text: str, font_ratio: float, font_flags: int, x0: float,
+                     full_confidence: bool = False) -> Tuple[bool, int, Optional[int], int]:
+        """Accept/reject a stripped line, evaluating factors only until the outcome is fixed.
+        
+        Factors run cheapest first (font ratio, bold, margin, length, colon,
+        keyword, pattern). Before each one the lowest score still possible
+        (remaining factors absent) and the highest (all present) are looked
+        up; the loop stops once both fall on the same side of the threshold.
+        With full_confidence accepted lines get every factor evaluated, so
+        their feature bits give the exact score.
+        
+        Returns (accepted, known feature bits, numbering depth or None,
+        factors evaluated including the font ratio).
+        """
+        scores = self._score_table[self._font_tier(font_ratio)]
+        threshold = self.score_threshold
+        features = 0
+        unknown = ALL_TEXT_FEATURES
+        numbering_depth = None
+        evaluated = 1
+        
+        for feature in LAZY_FEATURE_ORDER:
+            if scores[features | unknown] < threshold:
+                return False, features, numbering_depth, evaluated
+            if scores[features] >= threshold and not full_confidence:
+                break
+            
+            evaluated += 1
+            unknown &= ~feature
+            if feature == FEATURE_BOLD:
+                present = font_flags & 2**4
+            elif feature == FEATURE_LEFT_MARGIN:
+                present = x0 < 100
+            elif feature == FEATURE_LENGTH:
+                present = 3 <= len(text) <= 100
+            elif feature == FEATURE_COLON:
+                present = text.endswith(':')
+            elif feature == FEATURE_KEYWORD:
+                present = self.text_matcher.contains_keyword(text)
+            else:
+                matches_pattern, numbering_depth = self.text_matcher.match_pattern(text)
+                present = matches_pattern
+            
+            if present:
+                features |= feature
+        
+        if scores[features | unknown] < threshold:
+            return False, features, numbering_depth, evaluated
+        
+        # Accepted: the level still needs the numbering depth if the pattern was skipped
+        if unknown & FEATURE_PATTERN:
+            numbering_depth = self.text_matcher.numbering_depth(text)
+        return True, features, numbering_depth, evaluated
+    
     def determine_heading_level(self, block: Dict, doc_stats: Dict) -> str:
         """Determine heading level (H1, H2, H3, H4) based on font size and patterns"""
-        text = block['text'].strip()
-        font_size = block['font_size']
         body_size = doc_stats.get('body_text_size', doc_stats['avg_font_size'])
-        
+        return self._heading_level(block['text'].strip(), block['font_size'], body_size)
+    
+    def _heading_level(self, text: str, font_size: float, body_size: float) -> str:
+        """Heading level from stripped text, font size and body text size"""
+        return self._level_from_depth(self._numbering_depth(text), font_size, body_size)
+    
+    def _level_from_depth(self, dots: Optional[int], font_size: float, body_size: float) -> str:
+        """Heading level from an already computed numbering depth"""
         # Check for numbered patterns that indicate hierarchy
-        numbered_match = re.match(r'^(\d+)(\.\d+)*\.?\s+', text)
-        if numbered_match:
-            dots = numbered_match.group(0).count('.')
+        if dots is not None:
             if dots == 0:  # 1., 2., 3. = H1
                 return "H1"
             elif dots == 1:  # 1.1, 1.2, 1.3 = H2
@@ -115,34 +302,90 @@ class HeadingDetector:
         else:
             return "H4"
     
-    def detect_headings(self, text_blocks: List[Dict], doc_stats: Dict) -> List[Dict]:
+    def score_features_batch(self, font_ratios: np.ndarray, features: np.ndarray) -> np.ndarray:
+        """Vectorized score_features; adds the factors in the same order so results match exactly"""
+        weights = self.score_weights
+        large, medium, small = self.font_ratio_tiers
+        scores = np.zeros(len(font_ratios))
+        
+        scores += np.where(font_ratios >= large, weights['font_large'],
+                           np.where(font_ratios >= medium, weights['font_medium'],
+                                    np.where(font_ratios >= small, weights['font_small'], 0.0)))
+        scores += np.where(features & FEATURE_BOLD, weights['bold'], 0.0)
+        scores += np.where(features & FEATURE_PATTERN, weights['pattern'], 0.0)
+        scores += np.where(features & FEATURE_KEYWORD, weights['keyword'], 0.0)
+        scores += np.where(features & FEATURE_LENGTH, weights['length'], 0.0)
+        scores += np.where(features & FEATURE_COLON, weights['colon'], 0.0)
+        scores += np.where(features & FEATURE_LEFT_MARGIN, weights['left_margin'], 0.0)
+        
+        return np.minimum(scores, 1.0)
+    
+    def detect_headings(self, text_blocks: Union[List[Dict], TextBlockStore], doc_stats: Dict) -> List[Dict]:
         """Identify heading blocks with confidence scores and levels"""
-        headings = []
+        return self.rank_candidates(self.collect_candidates(text_blocks, doc_stats), doc_stats)
+    
+    def collect_candidates(self, text_blocks: Union[Iterable[Dict], TextBlockStore], doc_stats: Dict,
+                           full_confidence: bool = True) -> TextBlockStore:
+        """Keep the blocks that reach the threshold in a compact candidate store.
+        
+        Blocks are decided by score_lazily, so most of them are rejected or
+        accepted before the matcher regex runs. full_confidence=False stores
+        only the features needed to accept a block, which is enough for the
+        outline but leaves the reported confidence a lower bound.
+        """
+        candidates = TextBlockStore()
+        body_text_size = doc_stats.get('body_text_size', doc_stats['avg_font_size'])
         
-        for block in text_blocks:
-            text = block['text'].strip()
+        if isinstance(text_blocks, TextBlockStore):
+            rows = text_blocks.rows()
+        else:
+            rows = ((block['text'], block['font_size'], block['font_flags'], block['font_name'],
+                     block['bbox'], block['page']) for block in text_blocks)
+        
+        for text, font_size, font_flags, font_name, bbox, page in rows:
+            text = text.strip()
             if not text or len(text) < 2:
                 continue
             
-            score = self.calculate_heading_score(block, doc_stats)
+            accepted, features, numbering_depth, _ = self.score_lazily(
+                text, font_size / body_text_size, font_flags, bbox[0], full_confidence)
+            if accepted:
+                candidates.append(text, font_size, font_flags, font_name, bbox, page, features, numbering_depth)
+        
+        return candidates
+    
+    def rank_candidates(self, candidates: TextBlockStore, doc_stats: Dict) -> List[Dict]:
+        """Score candidates against the final document stats and build headings"""
+        headings = []
+        if len(candidates) == 0:
+            return headings
+        
+        body_text_size = doc_stats.get('body_text_size', doc_stats['avg_font_size'])
+        font_sizes = np.frombuffer(candidates.font_size, dtype=np.float64)
+        features = np.frombuffer(candidates.features, dtype=np.uint8)
+        scores = self.score_features_batch(font_sizes / body_text_size, features)
+        
+        # Lower threshold for better recall
+        for index in np.flatnonzero(scores >= self.score_threshold):
+            index = int(index)
+            text = candidates.text(index)
+            font_size = candidates.font_size[index]
             
-            if score >= 0.4:  # Lower threshold for better recall
-                level = self.determine_heading_level(block, doc_stats)
-                
-                headings.append({
-                    'text': text,
-                    'level': level,
-                    'confidence': score,
-                    'page': block['page'],
-                    'bbox': block['bbox'],
-                    'font_size': block['font_size']
-                })
+            headings.append({
+                'text': text,
+                'level': self._level_from_depth(candidates.get_numbering_depth(index), font_size, body_text_size),
+                'confidence': float(scores[index]),
+                'page': candidates.page[index],
+                'bbox': candidates.get_bbox(index),
+                'font_size': font_size
+            })
         
         # Sort by page and then by vertical position
         headings.sort(key=lambda x: (x['page'], x['bbox'][1]))
         
         # Post-process to improve hierarchy
-        headings = self._refine_heading_hierarchy(headings)
+        with self.timer.stage('refine'):
+            headings = self._refine_heading_hierarchy(headings)
         
         return headings
     
@@ -2,24 +2,92 @@
 Main service for Round 1A - Enhanced PDF outline extraction
 """
 
+import hashlib
 import json
 import logging
 import re  # ADD THIS IMPORT
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from config.settings import Settings  # ADD THIS IMPORT
+from services.round1a.bookmark_extractor import BookmarkExtractor
+from services.round1a.candidate_filter import CandidateFilter
+from services.round1a.document_stats import DocumentStatsAccumulator
 from services.round1a.pdf_parser import PDFParser
 from services.round1a.heading_detector import HeadingDetector
 from utils.file_handler import FileHandler
+from utils.instrumentation import NULL_TIMER, StageTimer
+from utils.deadline import Deadline
+from utils.memory_governor import MemoryGovernor
+from utils.outline_cache import OutlineCache
+from utils.page_cache import PageCache
+from utils.pdf_source import PDFSource
+from utils.profiling import DocumentProfiler
+
+# Share of the deadline spent parsing pages; the rest is kept for scoring and ranking
+PARSE_BUDGET_SHARE = 0.75
+# Pages are only skipped up front when the estimated parse time is this many
+# times the parse budget; closer calls are left to the in-loop deadline cut
+PLAN_MARGIN = 2.0
 
 class OutlineExtractor:
-    def __init__(self):
+    def __init__(self, outline_cache: Optional[OutlineCache] = None, profiler: Optional[DocumentProfiler] = None,
+                 page_cache: Optional[PageCache] = None):
         self.logger = logging.getLogger(__name__)
         self.settings = Settings()  # ADD THIS
-        self.pdf_parser = PDFParser()
-        self.heading_detector = HeadingDetector()
+        self.memory_governor = None
+        if self.settings.max_memory_mb > 0:
+            self.memory_governor = MemoryGovernor(self.settings.max_memory_mb)
+        self.pdf_parser = PDFParser(
+            split_threshold=self.settings.page_split_threshold,
+            split_workers=self.settings.page_split_workers,
+            lean=self.settings.pdf_extraction_mode == 'lean',
+            clip_margin=self.settings.pdf_clip_margin,
+            memory_governor=self.memory_governor,
+            page_cache=page_cache
+        )
+        self.heading_detector = HeadingDetector(
+            score_weights=self.settings.heading_score_weights,
+            font_ratio_tiers=self.settings.heading_font_ratio_tiers,
+            score_threshold=self.settings.heading_score_threshold
+        )
+        self.candidate_filter = CandidateFilter(
+            self.heading_detector,
+            remove_running=self.settings.remove_running_headers
+        )
+        self.bookmark_extractor = BookmarkExtractor(max_level=self.settings.max_heading_levels)
         self.file_handler = FileHandler()
+        
+        # Optional content-addressed cache consulted before any parsing
+        self.outline_cache = outline_cache
+        self.last_cache_status: Optional[str] = None  # 'hit', 'miss' or None when uncached
+        self.last_content_hash: Optional[str] = None  # SHA-256 of the last PDF, when the cache computed it
+        self.last_extraction_method: Optional[str] = None  # 'bookmarks' or the heuristic method
+        self.last_filter_report: Optional[Dict] = None  # Lines pruned before text matching
+        self.last_metrics: Optional[Dict] = None  # Stage times, counts and peak RSS of the last call
+        self.last_coverage: Optional[Dict] = None  # Set when the deadline cut the last outline short
+        
+        # Optional cProfile capture; last_profile_path is set when a dump was kept
+        self.profiler = profiler
+        self.last_profile_path: Optional[Path] = None
+        self.timer = NULL_TIMER
+        self.calibrate_memory()
+    
+    def calibrate_memory(self, worker_count: int = 1):
+        """Measure this process's warm footprint and budget growth above it; pool workers pass the pool size"""
+        if self.memory_governor is not None:
+            baseline_mb = self.memory_governor.calibrate() / 2**20
+            self.memory_governor.set_limit(self.settings.get_process_memory_limit_mb(worker_count, baseline_mb))
+    
+    def get_config_fingerprint(self) -> str:
+        """Hash of the parser and detector configuration that shapes the outline"""
+        config = {
+            'parser': self.pdf_parser.get_config(),
+            'detector': self.heading_detector.get_config(),
+            'candidate_filter': self.candidate_filter.get_config(),
+            'bookmarks': self.bookmark_extractor.get_config() if self.settings.extract_bookmarks else None
+        }
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
     
     def process(self):
         """Main processing pipeline for Round 1A"""
@@ -61,36 +129,245 @@ class OutlineExtractor:
         """Process single PDF - wrapper for extract_outline"""
         return self.extract_outline(pdf_path)
     
-    def extract_outline(self, pdf_path: str) -> Dict:
-        """Extract hierarchical outline from PDF in competition format"""
+    def extract_outline(self, pdf: Union[str, Path, bytes, bytearray, memoryview, PDFSource],
+                        name: Optional[str] = None) -> Dict:
+        """Extract hierarchical outline from PDF in competition format.
+        
+        pdf is a path, the PDF's bytes (name then stands in for the filename)
+        or a PDFSource the caller opened and keeps ownership of.
+        """
+        # Fresh timer per document, shared with the parser and detector stages
+        timer = StageTimer()
+        self._set_timer(timer)
+        self.last_profile_path = None
+        source = None
+        try:
+            with self.timer.stage('read_input'):
+                source = pdf if isinstance(pdf, PDFSource) else self.open_source(pdf, name)
+            if self.profiler is None:
+                return self._extract_outline(source)
+            outline, self.last_profile_path = self.profiler.run(source.name, source.sha256(),
+                                                                lambda: self._extract_outline(source))
+            return outline
+        finally:
+            if source is not None and source is not pdf:
+                source.close()
+            if self.memory_governor is not None and self.memory_governor.low_memory:
+                self.memory_governor.release()
+            self.last_metrics = timer.to_dict()
+            self._set_timer(NULL_TIMER)
+    
+    def _set_timer(self, timer):
+        self.timer = timer
+        self.pdf_parser.timer = timer
+        self.heading_detector.timer = timer
+    
+    def extract_many(self, items: Iterable, workers: int = 1, executor: str = 'thread', ordered: bool = True,
+                     timeout: Optional[float] = None) -> Iterator[Tuple[Any, Union[Dict, Exception]]]:
+        """Extract a stream of PDFs, yielding (id, outline or exception) as results are ready.
+        
+        items are paths, bytes, binary file objects or explicit (id, pdf)
+        pairs; the id is the path, the file object's name or the position
+        otherwise. Items are consumed lazily with at most workers in flight.
+        executor 'thread' runs workers threads with one extractor each (one
+        worker runs in the calling thread with this extractor); 'process'
+        uses warm worker processes configured from Settings, as batch mode
+        does. ordered=False yields in completion order. timeout is seconds
+        per item, from when a worker starts it (default
+        hard_timeout_seconds, 0 = none); an item past it yields
+        TimeoutError. Failures never stop the stream: the exception is
+        yielded in place of the outline.
+        """
+        # Imported lazily: the batch helpers import this module
+        from services.round1a.extract_many import iter_extract_many
+        return iter_extract_many(self, items, workers, executor, ordered, timeout)
+    
+    def open_source(self, pdf: Union[str, Path, bytes, bytearray, memoryview], name: Optional[str] = None) -> PDFSource:
+        """Read a PDF path once (or wrap in-memory bytes) for validation, hashing and parsing"""
+        if isinstance(pdf, (bytes, bytearray, memoryview)):
+            return PDFSource.from_bytes(pdf, name or 'document.pdf')
+        return PDFSource.open(pdf, int(self.settings.input_buffer_max_mb * 1024 * 1024))
+    
+    def _extract_outline(self, source: PDFSource) -> Dict:
+        deadline = None
+        if self.settings.extraction_deadline_seconds > 0:
+            deadline = Deadline(self.settings.extraction_deadline_seconds)
         
         # Validate PDF before processing
-        is_valid, error_msg = self.file_handler.validate_pdf_file(pdf_path)
+        with self.timer.stage('validate'):
+            is_valid, error_msg = source.validate()
         if not is_valid:
             raise ValueError(f"Invalid PDF: {error_msg}")
         
-        # Extract document title
-        document_title = self.pdf_parser.extract_document_title(pdf_path)
+        self.last_cache_status = None
+        self.last_extraction_method = None
+        self.last_filter_report = None
+        self.last_coverage = None
+        self.last_content_hash = None
+        cache_key = None
+        if self.outline_cache is not None:
+            with self.timer.stage('cache_lookup'):
+                content_hash = self.last_content_hash = source.sha256()
+                cache_key = self.outline_cache.make_key(content_hash, self.get_config_fingerprint())
+                cached = self.outline_cache.get(cache_key)
+            if cached is not None:
+                self.last_cache_status = 'hit'
+                self.last_extraction_method = cached['extraction_method']
+                return self._format_result(source, cached['title'], cached['outline'], cached['extraction_method'])
+            self.last_cache_status = 'miss'
+        
+        document_title, outline, method = self._extract_title_and_outline(source, deadline)
+        self.last_extraction_method = method
+        self.timer.count('headings', len(outline))
+        
+        # A partial outline depends on how fast this run was, a low-memory one on memory
+        # pressure (text-only pages when the parser is not lean); neither is cached
+        low_memory = self.memory_governor is not None and self.memory_governor.low_memory
+        if cache_key is not None and self.last_coverage is None and not (low_memory and not self.pdf_parser.lean):
+            # Store the raw title: the filename fallback depends on the path, not the content
+            with self.timer.stage('cache_store'):
+                self.outline_cache.put(cache_key, {'title': document_title, 'outline': outline, 'extraction_method': method})
         
-        # Extract text with metadata
-        text_blocks = self.pdf_parser.extract_text_with_metadata(pdf_path)
-        doc_stats = self.pdf_parser.get_document_stats(text_blocks)
+        return self._format_result(source, document_title, outline, method, self.last_coverage)
+    
+    def _format_result(self, source: PDFSource, document_title: str, outline: List[Dict], method: str,
+                       coverage: Optional[Dict] = None) -> Dict:
+        """Assemble the competition output, falling back to the filename as title"""
+        metadata = {'extraction_method': method}
+        if coverage is not None:
+            metadata.update(partial=True, **coverage)
+        return {
+            'title': document_title if document_title else source.name.replace('.pdf', ''),
+            'outline': outline,
+            'metadata': metadata
+        }
+    
+    def _extract_title_and_outline(self, source: PDFSource, deadline: Optional[Deadline] = None) -> Tuple[str, List[Dict], str]:
+        """Use the PDF's bookmarks when they pass the quality check, else the heuristic pipeline"""
+        if self.settings.extract_bookmarks:
+            with self.timer.stage('bookmarks'):
+                result = self._extract_from_bookmarks(source)
+            if result is not None:
+                return result[0], result[1], 'bookmarks'
+        
+        document_title, outline = self._extract_with_heuristics(source, deadline)
+        return document_title, outline, self.settings.heading_detection_method
+    
+    def _extract_from_bookmarks(self, source: PDFSource) -> Optional[Tuple[str, List[Dict]]]:
+        """Map the embedded table of contents, skipping body text extraction"""
+        toc, page_count, first_page_lines = self.pdf_parser.read_bookmarks(source)
+        self.timer.count('pages', page_count)
+        self.timer.count('bookmarks', len(toc))
+        if not toc:
+            return None
+        
+        bookmarks = self.bookmark_extractor.build_outline(toc, page_count)
+        if bookmarks is None:
+            self.logger.info(f'Bookmarks in {source.name} failed the quality check, using heuristics')
+            return None
+        
+        outline = []
+        for bookmark in bookmarks:
+            text = self._clean_heading_text(bookmark['text'])
+            if text:
+                outline.append({'level': bookmark['level'], 'text': text, 'page': bookmark['page']})
+        
+        return self.pdf_parser.extract_title_from_lines(first_page_lines), outline
+    
+    def _extract_with_heuristics(self, source: PDFSource, deadline: Optional[Deadline] = None) -> Tuple[str, List[Dict]]:
+        """Run the full parsing and heading detection pipeline"""
+        # Stream pages once: stats accumulate and lines are stored, with their
+        # numeric feature bits, as pages go by
+        stats = DocumentStatsAccumulator()
+        page_info = {'page_count': 0, 'first_page_lines': [], 'stopped_early': False}
+        max_pages = self._plan_page_count(deadline)
+        with self.timer.stage('extract'):
+            blocks = self._iter_text_blocks(source, stats, page_info, max_pages, deadline)
+            lines = self.candidate_filter.collect_lines(blocks)
+            doc_stats = stats.to_stats()
+        self.timer.count('pages', page_info['page_count'])
+        self.timer.count('blocks', stats.total_blocks)
+        
+        total_pages = self.pdf_parser.last_page_count
+        if page_info['page_count'] < total_pages:
+            # Capped up front by a calibrated estimate, or cut when the parse budget ran out
+            strategy = 'deadline' if page_info['stopped_early'] else 'first_pages'
+            self.last_coverage = {'pages_covered': page_info['page_count'], 'total_pages': total_pages,
+                                  'strategy': strategy}
+            self.logger.warning(f"Time budget: {source.name} outline covers {page_info['page_count']}"
+                                f"/{total_pages} pages ({strategy})")
+        
+        # Numeric bound and running header/footer removal, now that the body text size
+        # and every page are known; only the surviving lines reach the text matcher
+        with self.timer.stage('prefilter'):
+            lines, report = self.candidate_filter.filter(lines, doc_stats, page_info['page_count'])
+        self._check_memory('prefilter')
+        self.last_filter_report = report
+        pruned = report['pruned_numeric'] + report['pruned_running']
+        self.timer.count('pruned', pruned)
+        self.logger.info(f"Pre-filter pruned {pruned}/{report['lines']} lines in {source.name} "
+                         f"({report['pruned_running']} running headers/footers)")
+        
+        # Extract document title
+        with self.timer.stage('title'):
+            document_title = self.pdf_parser.extract_title_from_lines(page_info['first_page_lines'])
         
         # Check page limit compliance (hackathon requirement)
-        total_pages = len(set(block['page'] for block in text_blocks)) if text_blocks else 0
         if total_pages > self.settings.max_pages_per_pdf:
             self.logger.warning(f'PDF has {total_pages} pages, exceeds {self.settings.max_pages_per_pdf} page limit')
         
-        # Detect headings
-        headings = self.heading_detector.detect_headings(text_blocks, doc_stats)
+        # Detect headings; with the body text size known, lines are scored lazily
+        with self.timer.stage('ranking'):
+            candidates = self.heading_detector.collect_candidates(lines, doc_stats)
+            del lines
+            headings = self.heading_detector.rank_candidates(candidates, doc_stats)
+        self.timer.count('candidates', len(candidates))
         
         # Build flat outline structure (matching sample format)
         outline = self._build_flat_outline(headings)
         
-        return {
-            'title': document_title if document_title else Path(pdf_path).name.replace('.pdf', ''),
-            'outline': outline
-        }
+        return document_title, outline
+    
+    def _check_memory(self, where: str):
+        """Stage-boundary memory check; pages are checked by the parser"""
+        if self.memory_governor is not None:
+            self.memory_governor.check(where=where)
+            if self.memory_governor.low_memory:
+                self.timer.count('low_memory', 1)
+    
+    def _plan_page_count(self, deadline: Optional[Deadline]) -> Optional[int]:
+        """Leading pages worth parsing at a calibrated cost per page (None = all).
+
+        Only documents estimated to take well past the parse budget, even split
+        across processes, are capped; the deadline cut while parsing is what
+        keeps every other document within budget.
+        """
+        if deadline is None or self.settings.estimated_ms_per_page <= 0:
+            return None
+        parse_seconds = deadline.remaining(PARSE_BUDGET_SHARE)
+        ms_per_page = self.settings.estimated_ms_per_page / self.pdf_parser.max_split_workers()
+        return max(1, int(PLAN_MARGIN * parse_seconds * 1000 / ms_per_page))
+    
+    def _iter_text_blocks(self, source: PDFSource, stats: DocumentStatsAccumulator, page_info: Dict,
+                          max_pages: Optional[int] = None, deadline: Optional[Deadline] = None) -> Iterator[Dict]:
+        """Stream text blocks page by page, updating stats and page info on the way"""
+        pages = self.pdf_parser.iter_pages(source, max_pages)
+        try:
+            for page_num, lines in pages:
+                page_info['page_count'] = page_num + 1
+                if page_num == 0:
+                    page_info['first_page_lines'] = lines
+                
+                for block in self.pdf_parser.iter_page_blocks(page_num, lines):
+                    stats.add(block['font_size'])
+                    yield block
+                
+                # Slower pages than estimated: stop here and keep what was found
+                if deadline is not None and deadline.expired(PARSE_BUDGET_SHARE):
+                    page_info['stopped_early'] = page_num + 1 < self.pdf_parser.last_page_count
+                    return
+        finally:
+            pages.close()
     
     def _build_flat_outline(self, headings: List[Dict]) -> List[Dict]:
         """Build flat outline structure matching sample format"""
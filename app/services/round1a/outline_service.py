@@ -0,0 +1,243 @@
+"""
+HTTP mode for Round 1A - outlines on demand from a warm worker pool
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from config.settings import Settings
+from services.round1a.batch_runner import _process_bytes_in_worker, check_memory_budget, create_worker_pool
+from utils.metrics import MetricsRegistry
+
+class ServiceOverloaded(Exception):
+    """Raised when the admission queue is full"""
+
+class ServiceUnavailable(Exception):
+    """Raised when a request cannot be answered within its deadline"""
+
+class OutlineService:
+    """Bounded admission in front of a process pool of warm OutlineExtractors.
+
+    At most ``workers + server_queue_size`` documents are admitted at once;
+    beyond that single requests are rejected with 429 straight away rather
+    than queueing without bound. A slot is only released when the worker is
+    actually done with the document, so a request that timed out (503) keeps
+    counting against capacity until its PDF finishes.
+    """
+
+    def __init__(self, settings: Settings, logger: Optional[logging.Logger] = None):
+        self.settings = settings
+        self.logger = logger or logging.getLogger(__name__)
+        self.worker_count = settings.get_worker_count()
+        self.capacity = self.worker_count + max(settings.server_queue_size, 0)
+        self.deadline_seconds = settings.timeout_seconds
+        self.metrics = MetricsRegistry()
+        self.pool = None
+        self.in_flight = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self):
+        """Create the worker pool; must run inside the serving event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.capacity)
+        check_memory_budget(self.settings, self.worker_count, self.logger)
+        self.pool = create_worker_pool(self.worker_count)
+        self.logger.info(f"Outline service: {self.worker_count} worker(s), "
+                         f"{self.capacity - self.worker_count} queued request(s) max")
+
+    def stop(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    def is_full(self) -> bool:
+        return self._slots.locked()
+
+    async def extract(self, data: bytes, filename: str, wait_for_slot: bool = False) -> Dict:
+        """Run one PDF through the pool within the request deadline.
+
+        Raises ServiceOverloaded when no slot is free (unless wait_for_slot)
+        and ServiceUnavailable when the deadline passes or the pool is broken.
+        """
+        if not wait_for_slot and self._slots.locked():
+            raise ServiceOverloaded(f"Queue full ({self.capacity} requests in progress)")
+
+        await self._slots.acquire()
+        self.in_flight += 1
+        pool = self.pool
+        try:
+            future = pool.submit(_process_bytes_in_worker, data, filename)
+        except BrokenProcessPool:
+            self._release_slot()
+            self._restart_pool(pool)
+            raise ServiceUnavailable("Worker pool restarted, retry the request")
+        future.add_done_callback(self._on_worker_done)
+
+        try:
+            # Cancelling the wrapper drops a still-queued task; a running one finishes in the background
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.deadline_seconds)
+        except asyncio.TimeoutError:
+            raise ServiceUnavailable(f"Outline not ready within {self.deadline_seconds}s")
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            raise ServiceUnavailable("Worker process died, retry the request")
+
+    def _on_worker_done(self, future: Future):
+        # Runs on the executor's management thread
+        self._loop.call_soon_threadsafe(self._release_slot)
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    def _restart_pool(self, broken_pool):
+        """Replace a pool whose worker died; queued futures of the old pool fail and free their slots"""
+        if self.pool is not broken_pool:
+            return  # Another request already replaced it
+        self.logger.error("Worker pool broken, starting a new one")
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = create_worker_pool(self.worker_count)
+
+    def render_metrics(self) -> str:
+        self.metrics.set_gauge('in_flight_requests', self.in_flight)
+        self.metrics.set_gauge('queue_capacity', self.capacity)
+        self.metrics.set_gauge('workers', self.worker_count)
+        return self.metrics.render()
+
+def _result_response(result: Dict) -> JSONResponse:
+    """Map a process_single_pdf result to an HTTP response"""
+    if result['status'] == 'ok':
+        headers = {'X-Cache': result['cache_status']} if result['cache_status'] else None
+        return JSONResponse(result['outline'], headers=headers)
+    status_code = 422 if result['status'] == 'invalid' else 500
+    return JSONResponse({'error': result['error']}, status_code=status_code)
+
+def _error_response(status_code: int, message: str) -> JSONResponse:
+    headers = {'Retry-After': '1'} if status_code in (429, 503) else None
+    return JSONResponse({'error': message}, status_code=status_code, headers=headers)
+
+def create_app(settings: Optional[Settings] = None, logger: Optional[logging.Logger] = None) -> FastAPI:
+    """Build the FastAPI application; the worker pool lives for the app's lifespan"""
+    service = OutlineService(settings or Settings(), logger)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        service.start()
+        try:
+            yield
+        finally:
+            service.stop()
+
+    app = FastAPI(title='Service 1A - PDF Outline Extraction', lifespan=lifespan)
+    app.state.outline_service = service
+
+    @app.post('/outline')
+    async def extract_outline(request: Request, filename: str = 'document.pdf'):
+        """PDF bytes in the request body, outline JSON out"""
+        start_time = time.perf_counter()
+        response = await _handle_single(service, request, filename)
+        service.metrics.observe_latency('/outline', time.perf_counter() - start_time)
+        service.metrics.count_response('/outline', str(response.status_code))
+        return response
+
+    @app.post('/outline/batch')
+    async def extract_outline_batch(request: Request):
+        """JSON {"documents": [{"id", "filename", "pdf_base64"}]} in, one NDJSON line per document out"""
+        try:
+            payload = await request.json()
+            documents = payload['documents']
+            if not isinstance(documents, list):
+                raise TypeError('documents must be a list')
+        except (ValueError, KeyError, TypeError) as e:
+            service.metrics.count_response('/outline/batch', '400')
+            return _error_response(400, f"Expected a JSON body with a 'documents' list: {str(e)}")
+
+        if service.is_full():
+            service.metrics.count_response('/outline/batch', '429')
+            return _error_response(429, "Queue full, retry later")
+
+        service.metrics.count_response('/outline/batch', '200')
+        return StreamingResponse(_stream_batch(service, documents), media_type='application/x-ndjson')
+
+    @app.get('/metrics')
+    async def metrics():
+        return PlainTextResponse(service.render_metrics(), media_type='text/plain; version=0.0.4')
+
+    @app.get('/health')
+    async def health():
+        return {'status': 'ok', 'in_flight': service.in_flight, 'capacity': service.capacity}
+
+    return app
+
+async def _handle_single(service: OutlineService, request: Request, filename: str) -> JSONResponse:
+    data = await request.body()
+    if not data:
+        return _error_response(400, "Request body must contain the PDF bytes")
+
+    try:
+        result = await service.extract(data, filename)
+    except ServiceOverloaded as e:
+        return _error_response(429, str(e))
+    except ServiceUnavailable as e:
+        return _error_response(503, str(e))
+
+    return _result_response(result)
+
+async def _stream_batch(service: OutlineService, documents: list):
+    """Yield NDJSON lines in completion order, keeping at most one document per worker in flight"""
+    window = asyncio.Semaphore(service.worker_count)
+
+    async def run_document(index: int, document: Dict) -> Dict:
+        doc_id = document.get('id', index) if isinstance(document, dict) else index
+        async with window:
+            start_time = time.perf_counter()
+            line = {'id': doc_id, 'status': 'ok', 'outline': None, 'error': None}
+            try:
+                data = base64.b64decode(document['pdf_base64'], validate=True)
+                # Batch documents wait for a slot instead of being rejected one by one
+                result = await service.extract(data, document.get('filename', f'{doc_id}.pdf'), wait_for_slot=True)
+                line['status'] = result['status']
+                line['outline'] = result['outline']
+                line['error'] = result['error']
+            except (KeyError, TypeError, binascii.Error) as e:
+                line['status'] = 'invalid'
+                line['error'] = f"Missing or malformed pdf_base64: {str(e)}"
+            except ServiceUnavailable as e:
+                line['status'] = 'unavailable'
+                line['error'] = str(e)
+
+            elapsed = time.perf_counter() - start_time
+            service.metrics.observe_latency('/outline/batch', elapsed)
+            line['latency_ms'] = round(elapsed * 1000, 1)
+            return line
+
+    tasks = [asyncio.create_task(run_document(index, document)) for index, document in enumerate(documents)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            yield json.dumps(line, ensure_ascii=False) + '\n'
+    finally:
+        # Client went away: stop dispatching the rest of the batch
+        for task in tasks:
+            task.cancel()
+
+def run_server(settings: Settings, logger: Optional[logging.Logger] = None):
+    """Serve the HTTP API until SIGTERM/SIGINT"""
+    import uvicorn
+
+    logger = logger or logging.getLogger(__name__)
+    logger.info(f"HTTP mode: listening on {settings.server_host}:{settings.server_port}")
+    uvicorn.run(create_app(settings, logger), host=settings.server_host, port=settings.server_port,
+                log_level=settings.log_level.lower())
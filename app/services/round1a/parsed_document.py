@@ -0,0 +1,36 @@
+"""
+Parsed PDF representation shared by title detection, stats and heading detection
+"""
+
+from typing import Dict, Iterator, List, Tuple
+
+
+class ParsedDocument:
+    """Text lines and spans of a PDF, parsed once and read by every stage.
+
+    ``pages`` holds one list of lines per page. Each line is a dict with the
+    line ``bbox`` and its non-empty ``spans`` (stripped ``text``, ``size``,
+    ``flags``, ``font`` and span ``bbox``), in PyMuPDF reading order.
+    """
+
+    def __init__(self, source: str, pages: List[List[Dict]]):
+        self.source = source
+        self.pages = pages
+
+    @property
+    def page_count(self) -> int:
+        """Number of pages in the document"""
+        return len(self.pages)
+
+    def iter_lines(self) -> Iterator[Tuple[int, Dict]]:
+        """Yield (page_num, line) for every text line in the document"""
+        for page_num, lines in enumerate(self.pages):
+            for line in lines:
+                yield page_num, line
+
+    def iter_page_spans(self, page_num: int) -> Iterator[Dict]:
+        """Yield every span on a single page"""
+        if page_num >= len(self.pages):
+            return
+        for line in self.pages[page_num]:
+            yield from line['spans']
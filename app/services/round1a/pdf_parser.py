@@ -3,89 +3,419 @@ PDF parsing and text extraction for Round 1A - Simplified Version
 """
 
 import fitz  # PyMuPDF
+import hashlib
 import logging
+import marshal
+import multiprocessing
+import os
 import re
-from typing import Dict, List, Tuple
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 
+from services.round1a.block_store import TextBlockStore
+from services.round1a.document_stats import DocumentStatsAccumulator
+from services.round1a.parsed_document import ParsedDocument
+from utils.instrumentation import NULL_TIMER
+from utils.memory_governor import MemoryGovernor
+from utils.page_cache import PageCache
+from utils.pdf_source import PDFSource
+
+# Bump whenever a change to span/line extraction alters outputs, so cached outlines are invalidated
+PARSER_VERSION = '1'
+
+# TEXTFLAGS_DICT without TEXT_PRESERVE_IMAGES: image blocks (and their pixel
+# data) are never materialized. Without images in the way MuPDF can join
+# spans an image used to separate into one line, so this is not output-neutral
+LEAN_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Indirect reference inside PDF object source ("12 0 R"), a named reference in a
+# resource dictionary ("/F1 12 0 R") and a name operand in a content stream
+OBJECT_REFERENCE = re.compile(r'\b(\d+) (\d+) R\b')
+RESOURCE_ENTRY = re.compile(r'/([^\s/<>\[\]()]+)\s*(\d+ \d+ R)')
+CONTENT_NAME = re.compile(rb'/([^\s/<>\[\]()%{}]+)')
+
+# Resource categories text extraction depends on (fonts, form XObjects, font-setting graphics states)
+TEXT_RESOURCES = ('Font', 'XObject', 'ExtGState')
+# Inheritable page entries that set the page area and orientation
+PAGE_BOX_KEYS = ('MediaBox', 'CropBox', 'Rotate')
+
+def _parse_pages(pdf_path: str, page_nums: List[int], lean: bool, clip_margin: float) -> List[List[Dict]]:
+    """Worker task: open a private fitz handle and parse the given pages"""
+    parser = PDFParser(lean=lean, clip_margin=clip_margin)
+    doc = fitz.open(pdf_path)
+    try:
+        return [parser._parse_page(doc[page_num]) for page_num in page_nums]
+    finally:
+        doc.close()
+
 class PDFParser:
-    def __init__(self):
+    def __init__(self, split_threshold: int = 0, split_workers: int = 0, lean: bool = False, clip_margin: float = 0.0,
+                 memory_governor: Optional[MemoryGovernor] = None, page_cache: Optional[PageCache] = None):
         self.logger = logging.getLogger(__name__)
+        # Documents with at least split_threshold pages are parsed by several
+        # processes (0 disables splitting; split_workers 0 = one per CPU)
+        self.split_threshold = split_threshold
+        self.split_workers = split_workers
+        # Lean mode asks PyMuPDF for text only; clip_margin drops this fraction
+        # of the page height at the top and bottom (running headers/footers)
+        self.lean = lean
+        self.clip_margin = clip_margin
+        # Stage timer, swapped in by OutlineExtractor while it collects metrics
+        self.timer = NULL_TIMER
+        # Page count of the document iter_pages opened last, even when it parsed fewer pages
+        self.last_page_count = 0
+        # Checked at every page boundary of iter_pages; may switch pages to lean extraction
+        self.memory_governor = memory_governor
+        # Optional per-page cache: iter_pages only parses pages whose fingerprint is not in it
+        self.page_cache = page_cache
     
-    def extract_text_with_metadata(self, pdf_path: str) -> List[Dict]:
-        """Extract text blocks with comprehensive font and position metadata"""
-        doc = fitz.open(pdf_path)
-        text_blocks = []
+    def get_config(self) -> Dict:
+        """Everything that influences extraction output, for cache fingerprints"""
+        # Page splitting is output-neutral, so it is deliberately left out
+        return {'version': PARSER_VERSION, 'lean': self.lean, 'clip_margin': self.clip_margin}
+    
+    def parse_document(self, pdf: Union[str, PDFSource]) -> ParsedDocument:
+        """Open the PDF once and collect the text spans of every page"""
+        pages = [lines for _, lines in self.iter_pages(pdf)]
+        return ParsedDocument((pdf.path or pdf.name) if isinstance(pdf, PDFSource) else str(pdf), pages)
+    
+    def iter_pages(self, pdf: Union[str, PDFSource], max_pages: Optional[int] = None) -> Iterator[Tuple[int, List[Dict]]]:
+        """Yield (page_num, lines) one page at a time, in page order, for at most max_pages leading pages"""
+        with self.timer.stage('pdf_open'):
+            doc = self._open(pdf)
         
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            blocks = page.get_text('dict')
+        pages = None
+        new_pages: Dict[str, bytes] = {}
+        cached: Dict[int, bytes] = {}
+        try:
+            self.last_page_count = len(doc)
+            page_count = self.last_page_count if max_pages is None else min(self.last_page_count, max_pages)
             
-            for block in blocks['blocks']:
-                if 'lines' in block:
-                    for line in block['lines']:
-                        line_text_parts = []
-                        line_font_info = []
-                        
-                        for span in line['spans']:
-                            text = span['text'].strip()
-                            if text:
-                                line_text_parts.append(text)
-                                line_font_info.append({
-                                    'size': span['size'],
-                                    'flags': span['flags'],
-                                    'font': span['font']
-                                })
-                        
-                        if line_text_parts:
-                            # Combine spans in the same line
-                            combined_text = ' '.join(line_text_parts)
-                            
-                            # Use the most prominent font in the line
-                            primary_font = max(line_font_info, key=lambda x: x['size'])
-                            
-                            text_blocks.append({
-                                'text': combined_text,
-                                'font_size': primary_font['size'],
-                                'font_flags': primary_font['flags'],
-                                'font_name': primary_font['font'],
-                                'bbox': line['bbox'],
-                                'page': page_num
-                            })
-        
-        doc.close()
-        return text_blocks
+            fingerprints: List[Optional[str]] = []
+            if self.page_cache is not None and page_count > 0:
+                with self.timer.stage('page_cache'):
+                    fingerprints, cached = self._lookup_pages(doc, page_count)
+                self.timer.count('page_cache_hits', len(cached))
+            # The baseline includes the cached pages, which are all loaded by now
+            if self.memory_governor is not None:
+                self.memory_governor.start(page_count)
+            to_parse = [page_num for page_num in range(page_count) if page_num not in cached]
+            
+            # Split workers open the file themselves, so in-memory inputs are parsed here
+            pdf_path = pdf.path if isinstance(pdf, PDFSource) else str(pdf)
+            worker_count = self._get_split_worker_count(len(to_parse)) if pdf_path else 1
+            if worker_count > 1:
+                doc.close()
+                pages = self._iter_pages_parallel(pdf_path, to_parse, worker_count)
+            else:
+                pages = ((page_num, self._parse_page(doc[page_num])) for page_num in to_parse)
+            
+            for page_num in range(page_count):
+                if page_num in cached:
+                    lines = PageCache.decode(cached[page_num])
+                else:
+                    _, lines = next(pages)
+                    if fingerprints and fingerprints[page_num] is not None:
+                        # Serial parsing follows the governor's low-memory switch, workers always use self.lean
+                        lean = self.lean or (worker_count == 1 and self.memory_governor is not None
+                                             and self.memory_governor.low_memory)
+                        new_pages[self._page_key(fingerprints[page_num], lean)] = PageCache.encode(lines)
+                yield page_num, lines
+                # After the consumer has taken the page, so its blocks are counted too
+                if self.memory_governor is not None:
+                    self.memory_governor.check(page_num + 1, f'page {page_num + 1}/{page_count}')
+        finally:
+            if pages is not None:
+                pages.close()
+            if not doc.is_closed:
+                doc.close()
+            # Also after a deadline or an error: every page parsed so far is reusable
+            if new_pages or cached:
+                with self.timer.stage('page_cache'):
+                    used_keys = [self._page_key(fingerprints[page_num], self.lean) for page_num in cached]
+                    self.page_cache.store(new_pages, used_keys)
     
-    def extract_document_title(self, pdf_path: str) -> str:
-        """Extract document title from first page"""
-        doc = fitz.open(pdf_path)
+    def read_bookmarks(self, pdf: Union[str, PDFSource]) -> Tuple[List[list], int, List[Dict]]:
+        """Return (get_toc entries, page count, first page lines) without parsing the body"""
+        with self.timer.stage('pdf_open'):
+            doc = self._open(pdf)
         
-        if len(doc) == 0:
+        try:
+            toc = doc.get_toc(simple=True)
+            # The first page is only needed for the title once there is a TOC to use
+            first_page_lines = self._parse_page(doc[0]) if toc and len(doc) > 0 else []
+            return toc, len(doc), first_page_lines
+        finally:
             doc.close()
-            return ""
+    
+    @staticmethod
+    def _open(pdf: Union[str, PDFSource]) -> fitz.Document:
+        """PyMuPDF document for a path or an already read PDFSource"""
+        if isinstance(pdf, PDFSource):
+            return pdf.open_document()
+        return fitz.open(pdf)
+    
+    def max_split_workers(self) -> int:
+        """Processes a document past the split threshold is parsed by (1 = never split)"""
+        return self._get_split_worker_count(sys.maxsize)
+    
+    def _get_split_worker_count(self, page_count: int) -> int:
+        """Number of processes to split this document across (1 = serial)"""
+        if self.split_threshold <= 0 or page_count < self.split_threshold:
+            return 1
         
-        # Get text blocks from first page only
-        first_page = doc[0]
-        blocks = first_page.get_text('dict')
+        # Daemonic processes (e.g. multiprocessing.Pool workers) cannot start children
+        if multiprocessing.current_process().daemon:
+            return 1
         
-        title_candidates = []
+        workers = self.split_workers if self.split_workers > 0 else (os.cpu_count() or 1)
+        return min(workers, page_count)
+    
+    def _iter_pages_parallel(self, pdf_path: str, page_nums: List[int], worker_count: int) -> Iterator[Tuple[int, List[Dict]]]:
+        """Parse runs of consecutive page_nums in worker processes and yield them in page order"""
+        # Several ranges per worker so one dense range does not hold up the rest
+        page_count = len(page_nums)
+        range_count = min(page_count, worker_count * 4)
+        bounds = [page_count * i // range_count for i in range(range_count + 1)]
+        
+        self.logger.debug(f'Splitting {page_count} pages into {range_count} ranges across {worker_count} processes')
+        
+        with ProcessPoolExecutor(max_workers=worker_count) as executor:
+            # Keep a bounded window of ranges in flight so finished but
+            # unconsumed pages never pile up in memory
+            pending = deque()
+            next_range = 0
+            try:
+                while next_range < range_count or pending:
+                    while next_range < range_count and len(pending) < worker_count * 2:
+                        chunk = page_nums[bounds[next_range]:bounds[next_range + 1]]
+                        pending.append((chunk, executor.submit(_parse_pages, pdf_path, chunk, self.lean, self.clip_margin)))
+                        next_range += 1
+                    
+                    chunk, future = pending.popleft()
+                    with self.timer.stage('get_text'):
+                        page_lines = future.result()
+                    yield from zip(chunk, page_lines)
+            finally:
+                # A consumer that stops early (deadline) should only wait for ranges already running
+                for _, future in pending:
+                    future.cancel()
+    
+    def _lookup_pages(self, doc: fitz.Document, page_count: int) -> Tuple[List[Optional[str]], Dict[int, bytes]]:
+        """Fingerprint the first page_count pages and fetch the cached ones as {page_num: encoded lines}"""
+        digests: Dict[int, str] = {}
+        fingerprints = [self._page_fingerprint(doc, page_num, digests) for page_num in range(page_count)]
+        keys = {page_num: self._page_key(fingerprint, self.lean)
+                for page_num, fingerprint in enumerate(fingerprints) if fingerprint is not None}
+        found = self.page_cache.get_many(keys.values())
+        return fingerprints, {page_num: found[key] for page_num, key in keys.items() if key in found}
+    
+    def _page_fingerprint(self, doc: fitz.Document, page_num: int, digests: Dict[int, str]) -> Optional[str]:
+        """Digest of everything the text of one page is extracted from, or None when it cannot be computed.
+        
+        That is the decoded content streams, the fonts, form XObjects and
+        graphics states they name, and the page boxes and rotation. Resources
+        shared with other pages only count for the entries this page uses, so
+        adding a font for one page does not invalidate the rest. Referenced
+        objects are hashed by content, not object number, so a rewritten file
+        still matches; digests memoizes them per document.
+        """
+        try:
+            page_xref = doc.page_xref(page_num)
+            content = b''.join(doc.xref_stream(xref) or b'' for xref in self._content_xrefs(doc, page_xref))
+            digest = hashlib.sha256(content)
+            used_names = {name.decode('latin-1') for name in CONTENT_NAME.findall(content)}
+            holder, resources = self._page_entry(doc, page_xref, 'Resources')
+            for category in TEXT_RESOURCES:
+                entries = self._used_resources(doc, holder, resources, category, used_names, digests)
+                digest.update(f'{category}={entries};'.encode('utf-8'))
+            for key in PAGE_BOX_KEYS:
+                _, value = self._page_entry(doc, page_xref, key)
+                digest.update(f'{key}={self._resolve_references(doc, value, digests)};'.encode('utf-8'))
+            return digest.hexdigest()
+        except (RuntimeError, ValueError, IndexError, RecursionError) as e:
+            self.logger.debug(f'No fingerprint for page {page_num + 1}, it is parsed uncached: {str(e)}')
+            return None
+    
+    @staticmethod
+    def _content_xrefs(doc: fitz.Document, page_xref: int) -> List[int]:
+        """Content stream objects of a page, in drawing order"""
+        kind, value = doc.xref_get_key(page_xref, 'Contents')
+        xrefs = [int(match.group(1)) for match in OBJECT_REFERENCE.finditer(value)]
+        if kind == 'xref' and not doc.xref_is_stream(xrefs[0]):
+            # Contents may also point to an array object
+            xrefs = [int(match.group(1)) for match in OBJECT_REFERENCE.finditer(doc.xref_object(xrefs[0], compressed=True))]
+        return xrefs
+    
+    @staticmethod
+    def _page_entry(doc: fitz.Document, page_xref: int, key: str) -> Tuple[int, str]:
+        """(object holding it, source) of a page dictionary entry, inherited through the page tree if missing"""
+        xref = page_xref
+        while True:
+            kind, value = doc.xref_get_key(xref, key)
+            if kind != 'null':
+                return xref, value
+            kind, parent = doc.xref_get_key(xref, 'Parent')
+            if kind != 'xref':
+                return xref, value
+            xref = int(parent.split()[0])
+    
+    def _used_resources(self, doc: fitz.Document, holder: int, resources: str, category: str,
+                        used_names: set, digests: Dict[int, str]) -> str:
+        """Digests of the entries of one resource category that the content streams name"""
+        if resources.endswith(' R'):
+            kind, value = doc.xref_get_key(int(resources.split()[0]), category)
+        elif resources.startswith('<<'):
+            kind, value = doc.xref_get_key(holder, f'Resources/{category}')
+        else:
+            return ''
+        if kind == 'xref':
+            value = doc.xref_object(int(value.split()[0]), compressed=True)
+        elif kind != 'dict':
+            return ''
+        
+        # Anything but "/Name N 0 R" entries (inline dictionaries) is hashed whole
+        if RESOURCE_ENTRY.sub('', value).strip() not in ('<<>>', ''):
+            return self._resolve_references(doc, value, digests)
+        return ''.join(
+            f'/{name} {self._resolve_references(doc, reference, digests)}'
+            for name, reference in sorted(RESOURCE_ENTRY.findall(value)) if name in used_names
+        )
+    
+    def _resolve_references(self, doc: fitz.Document, source: str, digests: Dict[int, str]) -> str:
+        """Object source with every indirect reference replaced by the digest of its target"""
+        return OBJECT_REFERENCE.sub(lambda match: self._object_digest(doc, int(match.group(1)), digests), source)
+    
+    def _object_digest(self, doc: fitz.Document, xref: int, digests: Dict[int, str]) -> str:
+        """Digest of an object's source with references resolved, plus its raw stream data"""
+        digest = digests.get(xref)
+        if digest is None:
+            # Stands in for the object while it is being hashed, should it reference itself
+            digests[xref] = f'@{xref}'
+            hasher = hashlib.sha256(self._resolve_references(doc, doc.xref_object(xref, compressed=True), digests).encode('utf-8'))
+            if doc.xref_is_stream(xref):
+                hasher.update(doc.xref_stream_raw(xref) or b'')
+            digest = digests[xref] = hasher.hexdigest()
+        return digest
+    
+    def _page_key(self, fingerprint: str, lean: bool) -> str:
+        """Page cache key: page fingerprint plus the settings that shape its parsed lines"""
+        config = f'{PARSER_VERSION}:{fitz.VersionBind}:{lean}:{self.clip_margin}:{marshal.version}'
+        return hashlib.sha256(f'{fingerprint}:{config}'.encode('utf-8')).hexdigest()
+    
+    def _parse_page(self, page) -> List[Dict]:
+        """Collect non-empty spans of a page grouped by line"""
+        lines = []
+        clip = self._content_clip(page) if self.clip_margin > 0 else None
+        low_memory = self.memory_governor is not None and self.memory_governor.low_memory
+        with self.timer.stage('get_text'):
+            if self.lean or low_memory:
+                blocks = page.get_text('dict', flags=LEAN_TEXT_FLAGS, clip=clip)
+            else:
+                blocks = page.get_text('dict', clip=clip)
         
         for block in blocks['blocks']:
-            if 'lines' in block:
+            # Image blocks carry no 'lines'; skip them and empty text blocks up front
+            if block.get('lines'):
                 for line in block['lines']:
+                    spans = []
                     for span in line['spans']:
                         text = span['text'].strip()
-                        if text and len(text) > 5:  # Reasonable title length
-                            # Check if it's in upper part of page (likely title area)
-                            if span['bbox'][1] < 200:  # Y coordinate < 200
-                                title_candidates.append({
-                                    'text': text,
-                                    'font_size': span['size'],
-                                    'font_flags': span['flags'],
-                                    'y_pos': span['bbox'][1]
-                                })
+                        if text:
+                            spans.append({
+                                'text': text,
+                                'size': span['size'],
+                                'flags': span['flags'],
+                                'font': span['font'],
+                                'bbox': span['bbox']
+                            })
+                    
+                    if spans:
+                        lines.append({'bbox': line['bbox'], 'spans': spans})
         
-        doc.close()
+        return lines
+    
+    def _content_clip(self, page) -> fitz.Rect:
+        """Page area without the top and bottom clip_margin bands"""
+        rect = page.rect
+        margin = rect.height * self.clip_margin
+        return fitz.Rect(rect.x0, rect.y0 + margin, rect.x1, rect.y1 - margin)
+    
+    def _ensure_parsed(self, source: Union[str, ParsedDocument]) -> ParsedDocument:
+        """Accept either a path or an already parsed document"""
+        if isinstance(source, ParsedDocument):
+            return source
+        return self.parse_document(source)
+    
+    def iter_page_blocks(self, page_num: int, lines: List[Dict]) -> Iterator[Dict]:
+        """Turn the parsed lines of one page into text blocks"""
+        for line in lines:
+            spans = line['spans']
+            
+            # Combine spans in the same line
+            combined_text = ' '.join(span['text'] for span in spans)
+            
+            # Use the most prominent font in the line
+            primary_font = max(spans, key=lambda x: x['size'])
+            
+            yield {
+                'text': combined_text,
+                'font_size': primary_font['size'],
+                'font_flags': primary_font['flags'],
+                'font_name': primary_font['font'],
+                'bbox': line['bbox'],
+                'page': page_num
+            }
+    
+    def extract_text_with_metadata(self, source: Union[str, ParsedDocument]) -> List[Dict]:
+        """Extract text blocks with comprehensive font and position metadata"""
+        parsed = self._ensure_parsed(source)
+        text_blocks = []
+        
+        for page_num, lines in enumerate(parsed.pages):
+            text_blocks.extend(self.iter_page_blocks(page_num, lines))
+        
+        return text_blocks
+    
+    def extract_text_store(self, source: Union[str, ParsedDocument]) -> TextBlockStore:
+        """Extract text blocks into a compact columnar store"""
+        parsed = self._ensure_parsed(source)
+        store = TextBlockStore()
+        
+        for page_num, lines in enumerate(parsed.pages):
+            for block in self.iter_page_blocks(page_num, lines):
+                store.append_block(block)
+        
+        return store
+    
+    def extract_document_title(self, source: Union[str, ParsedDocument]) -> str:
+        """Extract document title from first page"""
+        parsed = self._ensure_parsed(source)
+        
+        if parsed.page_count == 0:
+            return ""
+        
+        return self.extract_title_from_lines(parsed.pages[0])
+    
+    def extract_title_from_lines(self, first_page_lines: List[Dict]) -> str:
+        """Pick the title from the parsed lines of the first page"""
+        title_candidates = []
+        
+        for line in first_page_lines:
+            for span in line['spans']:
+                text = span['text']
+                if len(text) > 5:  # Reasonable title length
+                    # Check if it's in upper part of page (likely title area)
+                    if span['bbox'][1] < 200:  # Y coordinate < 200
+                        title_candidates.append({
+                            'text': text,
+                            'font_size': span['size'],
+                            'font_flags': span['flags'],
+                            'y_pos': span['bbox'][1]
+                        })
         
         if not title_candidates:
             return ""
@@ -108,36 +438,14 @@ class PDFParser:
         
         return ' '.join(title_parts)
     
-    def get_document_stats(self, text_blocks: List[Dict]) -> Dict:
+    def get_document_stats(self, text_blocks: Union[List[Dict], TextBlockStore]) -> Dict:
         """Calculate comprehensive document statistics"""
-        if not text_blocks:
-            return {
-                'avg_font_size': 12,
-                'max_font_size': 12,
-                'min_font_size': 12,
-                'total_blocks': 0,
-                'font_size_distribution': {},
-                'most_common_size': 12,
-                'body_text_size': 12
-            }
+        if isinstance(text_blocks, TextBlockStore):
+            font_sizes = text_blocks.font_size
+        else:
+            font_sizes = (block['font_size'] for block in text_blocks)
         
-        font_sizes = [block['font_size'] for block in text_blocks]
-        
-        # Calculate font size distribution
-        font_size_counts = {}
-        for size in font_sizes:
-            rounded_size = round(size, 1)
-            font_size_counts[rounded_size] = font_size_counts.get(rounded_size, 0) + 1
-        
-        # Find most common font sizes
-        sorted_sizes = sorted(font_size_counts.items(), key=lambda x: x[1], reverse=True)
-        
-        return {
-            'avg_font_size': sum(font_sizes) / len(font_sizes),
-            'max_font_size': max(font_sizes),
-            'min_font_size': min(font_sizes),
-            'total_blocks': len(text_blocks),
-            'font_size_distribution': font_size_counts,
-            'most_common_size': sorted_sizes[0][0] if sorted_sizes else 12,
-            'body_text_size': sorted_sizes[0][0] if sorted_sizes else 12  # Assume most common is body text
-        }
+        stats = DocumentStatsAccumulator()
+        for font_size in font_sizes:
+            stats.add(font_size)
+        return stats.to_stats()
@@ -0,0 +1,258 @@
+"""
+Multi-node batch mode for Round 1A - replicas sharing one input directory
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from config.settings import Settings
+from services.round1a.batch_runner import (
+    WorkerPool, check_memory_budget, create_outline_extractor, create_output_sink, iter_pool_results, needs_content_hash,
+    process_single_pdf, write_result
+)
+from utils.file_handler import FileHandler
+from utils.instrumentation import MetricsWriter
+from utils.json_validator import JSONValidator
+from utils.work_claims import WorkClaims
+
+def shard_of(pdf_name: str, shard_count: int) -> int:
+    """Shard a PDF belongs to; stable across hosts and Python processes, unlike hash()"""
+    digest = hashlib.sha256(pdf_name.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+class ShardedBatch:
+    """One node of a batch run split across replicas that mount the same volumes.
+
+    SHARD_MODE=hash takes the PDFs whose name hashes to SHARD_INDEX out of
+    SHARD_COUNT: no coordination, but a crashed shard's files wait for that
+    shard to be run again. SHARD_MODE=claim lets any number of replicas take
+    files as they go through WorkClaims lease files; claims of a crashed node
+    expire and are taken over, and a node keeps polling until every PDF is
+    done, so the run completes while any node is alive.
+
+    Files are handled in chunks. An outline is flushed to the output sink
+    before its completion record is written and its claim released, so a
+    crash repeats work instead of losing it, and a node restarted on the same
+    input skips what is already done. Every node merges all completion
+    records into summary.json when it finishes.
+    """
+
+    def __init__(self, settings: Settings, logger: Optional[logging.Logger] = None):
+        if settings.shard_mode not in ('hash', 'claim'):
+            raise ValueError(f"SHARD_MODE must be 'hash', 'claim' or 'off', not {settings.shard_mode!r}")
+        if settings.shard_mode == 'hash' and not 0 <= settings.shard_index < settings.shard_count:
+            raise ValueError(f"SHARD_INDEX {settings.shard_index} is outside 0..{settings.shard_count - 1}")
+        self.settings = settings
+        self.logger = logger or logging.getLogger(__name__)
+        self.file_handler = FileHandler()
+        self.validator = JSONValidator()
+        self.claims = WorkClaims(settings.get_shard_state_path(), settings.node_id, settings.claim_lease_seconds)
+        self.metrics_writer = MetricsWriter(settings.get_metrics_path()) if settings.enable_metrics else None
+        self.successful_count = 0
+        self.failed_count = 0
+
+    def run(self) -> int:
+        """Process this node's share of the input directory; returns the exit code"""
+        settings = self.settings
+        pdf_files = sorted(self.file_handler.get_pdf_files(settings.get_input_path()))
+        worker_count = settings.get_worker_count()
+        if settings.shard_mode == 'hash':
+            self.logger.info(f"Shard {settings.shard_index}/{settings.shard_count} (node {settings.node_id})")
+        else:
+            self.logger.info(f"Claiming work as node {settings.node_id} "
+                             f"(lease {settings.claim_lease_seconds:g}s, {worker_count} worker(s))")
+        check_memory_budget(settings, worker_count, self.logger)
+
+        pool = WorkerPool(worker_count) if worker_count > 1 else None
+        if pool is not None:
+            process_files = lambda files: iter_pool_results(pool, files, settings.hard_timeout_seconds)
+        else:
+            outline_extractor = create_outline_extractor(settings)
+            process_files = lambda files: (
+                process_single_pdf(outline_extractor, str(pdf_file), settings.hard_timeout_seconds,
+                                   needs_content_hash(settings))
+                for pdf_file in files
+            )
+
+        # Enough files per chunk to keep every worker busy between sink flushes
+        chunk_size = max(worker_count, 1) * 4
+        self.claims.start_heartbeat()
+        try:
+            with create_output_sink(settings, self.file_handler) as output_sink:
+                if settings.shard_mode == 'hash':
+                    mine = [pdf_file for pdf_file in pdf_files
+                            if shard_of(pdf_file.name, settings.shard_count) == settings.shard_index]
+                    pending = [pdf_file for pdf_file in mine if not self._is_done(pdf_file)]
+                    self.logger.info(f"{len(mine)} of {len(pdf_files)} PDF(s) in this shard, {len(pending)} to process")
+                    for start in range(0, len(pending), chunk_size):
+                        self._process_chunk(pending[start:start + chunk_size], process_files, output_sink)
+                else:
+                    self._claim_loop(pdf_files, chunk_size, process_files, output_sink)
+        finally:
+            self.claims.stop_heartbeat()
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+        summary = self.write_summary(pdf_files)
+        self.log_summary(summary)
+
+        if self.failed_count > 0 and self.successful_count == 0:
+            return 1
+        return 2 if self.failed_count > 0 else 0
+
+    def _claim_loop(self, pdf_files: List[Path], chunk_size: int, process_files: Callable, output_sink):
+        """Claim and process chunks until every PDF is done or claimed by a live node"""
+        if not pdf_files:
+            return
+        # Start each node at a different point of the list so they rarely race for the same claims
+        offset = int(WorkClaims.key(self.settings.node_id), 16) % len(pdf_files)
+        ordered = pdf_files[offset:] + pdf_files[:offset]
+
+        while True:
+            now = self.claims.volume_time()
+            chunk = []
+            claimed_elsewhere = 0
+            for pdf_file in ordered:
+                if len(chunk) >= chunk_size:
+                    break
+                if self._is_done(pdf_file):
+                    continue
+                if self.claims.try_claim(pdf_file.name, now):
+                    chunk.append(pdf_file)
+                else:
+                    claimed_elsewhere += 1
+
+            if chunk:
+                self._process_chunk(chunk, process_files, output_sink)
+            elif claimed_elsewhere:
+                # Wait for the other nodes; their claims are taken over if they stop renewing them
+                self.logger.info(f"{claimed_elsewhere} PDF(s) claimed by other nodes, waiting")
+                time.sleep(self.settings.watch_interval_seconds)
+            else:
+                return
+
+    def _process_chunk(self, pdf_files: List[Path], process_files: Callable[[List[Path]], Iterator[Dict]],
+                       output_sink):
+        """Extract and write a chunk, then record completions once the sink has flushed"""
+        completions = []
+        for result in process_files(pdf_files):
+            pdf_file = Path(result['pdf_path'])
+            success = write_result(result, self.settings, output_sink, self.validator, self.logger,
+                                   metrics_writer=self.metrics_writer)
+            if success:
+                self.successful_count += 1
+            else:
+                self.failed_count += 1
+            completions.append((pdf_file, self._completion_record(pdf_file, result, success)))
+
+        output_sink.flush()
+        for pdf_file, record in completions:
+            try:
+                self.claims.mark_done(pdf_file.name, record)
+            except OSError as e:
+                self.logger.error(f"Could not record completion of {pdf_file.name}: {str(e)}")
+            self.claims.release(pdf_file.name)
+
+    def _completion_record(self, pdf_file: Path, result: Dict, success: bool) -> Dict:
+        outline_data = result['outline'] or {}
+        try:
+            stat = pdf_file.stat()
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            size, mtime_ns = None, None
+        return {
+            'status': 'ok' if success else 'failed',
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'output': Path(result['output_file']).name if success else None,
+            'error': result['error'],
+            'processing_time': round(result['processing_time'], 4),
+            'over_budget': result['processing_time'] > self.settings.timeout_seconds,
+            'partial': bool(outline_data.get('metadata', {}).get('partial')),
+            'cache_status': result['cache_status'],
+            'finished_at': time.time()
+        }
+
+    def _is_done(self, pdf_file: Path) -> bool:
+        """Completed by any node, and unchanged since"""
+        record = self.claims.completion(pdf_file.name)
+        if record is None:
+            return False
+        try:
+            stat = pdf_file.stat()
+        except OSError:
+            return True  # Removed meanwhile; nothing left to do
+        return (record.get('size'), record.get('mtime_ns')) == (stat.st_size, stat.st_mtime_ns)
+
+    def write_summary(self, pdf_files: Optional[List[Path]] = None) -> Dict:
+        """Merge every node's completion records for the current input into summary.json"""
+        if pdf_files is None:
+            pdf_files = sorted(self.file_handler.get_pdf_files(self.settings.get_input_path()))
+        summary = merge_completions(self.claims.iter_completions(), [pdf_file.name for pdf_file in pdf_files])
+        summary_path = self.settings.get_shard_state_path() / 'summary.json'
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=summary_path.parent, prefix='.', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, summary_path)
+        except OSError as e:
+            self.logger.error(f"Could not write shard summary: {str(e)}")
+        return summary
+
+    def log_summary(self, summary: Dict):
+        logger = self.logger
+        logger.info("=" * 50)
+        if self.successful_count or self.failed_count:
+            logger.info(f"Node {self.settings.node_id}: {self.successful_count} succeeded, {self.failed_count} failed")
+        logger.info(f"🌐 All nodes: {summary['completed']}/{summary['total_files']} PDFs done "
+                    f"({summary['successful']} ok, {summary['failed']} failed) by {len(summary['nodes'])} node(s)")
+        if summary['remaining']:
+            logger.info(f"🌐 Still running or waiting on other nodes: {summary['remaining']} PDF(s)")
+        if summary['files_per_second']:
+            logger.info(f"🌐 Throughput: {summary['files_per_second']} PDFs/s over {summary['wall_seconds']}s")
+        if summary['failed_files']:
+            logger.warning(f"❌ Failed: {', '.join(summary['failed_files'])}")
+        if summary['over_budget_files']:
+            logger.warning(f"⏱ Over the {self.settings.timeout_seconds}s budget: {', '.join(summary['over_budget_files'])}")
+        if summary['partial_files']:
+            logger.warning(f"✂ Partial outlines (time budget): {', '.join(summary['partial_files'])}")
+        logger.info(f"📋 Summary: {(self.settings.get_shard_state_path() / 'summary.json').absolute()}")
+
+def merge_completions(records: Iterator[Dict], pdf_names: List[str]) -> Dict:
+    """Run-wide totals from the completion records of all nodes, limited to pdf_names"""
+    wanted = set(pdf_names)
+    records = sorted((record for record in records if record.get('pdf') in wanted), key=lambda record: record['pdf'])
+
+    nodes: Dict[str, Dict] = {}
+    for record in records:
+        node = nodes.setdefault(record['node'], {'files': 0, 'failed': 0, 'processing_seconds': 0.0})
+        node['files'] += 1
+        node['failed'] += record['status'] != 'ok'
+        node['processing_seconds'] = round(node['processing_seconds'] + record['processing_time'], 4)
+
+    finished = [record['finished_at'] for record in records]
+    # From the first file's start to the last file's end, across all nodes
+    wall_seconds = round(max(finished) - min(record['finished_at'] - record['processing_time'] for record in records), 3) \
+        if records else 0.0
+    failed_files = [record['pdf'] for record in records if record['status'] != 'ok']
+    return {
+        'generated_at': time.time(),
+        'total_files': len(wanted),
+        'completed': len(records),
+        'remaining': len(wanted) - len(records),
+        'successful': len(records) - len(failed_files),
+        'failed': len(failed_files),
+        'failed_files': failed_files,
+        'over_budget_files': [record['pdf'] for record in records if record.get('over_budget')],
+        'partial_files': [record['pdf'] for record in records if record.get('partial')],
+        'cache_hits': sum(record.get('cache_status') == 'hit' for record in records),
+        'wall_seconds': wall_seconds,
+        'files_per_second': round(len(records) / wall_seconds, 2) if wall_seconds > 0 else None,
+        'nodes': nodes
+    }
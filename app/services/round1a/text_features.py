@@ -0,0 +1,75 @@
+"""
+Precompiled text feature matching for heading detection
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+# Same numbering regex determine_heading_level has always used
+NUMBERING_PATTERN = r'\d+(?:\.\d+)*\.?\s+'
+
+
+class TextFeatureMatcher:
+    """Evaluate every text feature of a line with one compiled regex.
+
+    The heading patterns are joined into a single ``heading`` alternation of
+    named groups (pattern_0, pattern_1, ...), and a lookahead captures the leading
+    section number in the same match, so one ``match`` call answers both
+    "is this a heading pattern" and "how deep is the numbering". Keywords
+    are scanned with plain substring tests on the lowered text, which
+    measured faster than a regex automaton on line-length strings.
+    """
+
+    def __init__(self, heading_patterns: List[str], heading_keywords: List[str]):
+        alternatives = '|'.join(f'(?P<pattern_{index}>{pattern})'
+                                for index, pattern in enumerate(heading_patterns))
+        # Both parts are optional so the match always succeeds and the
+        # numbering is captured even when no heading pattern matches
+        self.pattern = re.compile(
+            f'(?:(?=(?P<numbering>{NUMBERING_PATTERN})))?(?:(?P<heading>{alternatives}))?',
+            re.IGNORECASE
+        )
+        self.pattern_groups = [f'pattern_{index}' for index in range(len(heading_patterns))]
+        self.keywords = tuple(dict.fromkeys(heading_keywords))
+
+    def match(self, text: str) -> Tuple[bool, bool, Optional[int]]:
+        """Return (matches a heading pattern, contains a keyword, numbering depth or None)"""
+        found = self.pattern.match(text)
+        numbering = found.group('numbering')
+
+        return (
+            found.group('heading') is not None,
+            self.contains_keyword(text),
+            numbering.count('.') if numbering is not None else None
+        )
+
+    def match_pattern(self, text: str) -> Tuple[bool, Optional[int]]:
+        """Return (matches a heading pattern, numbering depth or None) without the keyword scan"""
+        found = self.pattern.match(text)
+        numbering = found.group('numbering')
+        return found.group('heading') is not None, numbering.count('.') if numbering is not None else None
+
+    def matches_pattern(self, text: str) -> bool:
+        """Whether the text matches any heading pattern"""
+        return self.pattern.match(text).group('heading') is not None
+
+    def matched_pattern(self, text: str) -> Optional[str]:
+        """Name of the first heading pattern group that matches, for debugging"""
+        found = self.pattern.match(text)
+        for name in self.pattern_groups:
+            if found.group(name) is not None:
+                return name
+        return None
+
+    def contains_keyword(self, text: str) -> bool:
+        """Whether the lowered text contains any heading keyword"""
+        text_lower = text.lower()
+        for keyword in self.keywords:
+            if keyword in text_lower:
+                return True
+        return False
+
+    def numbering_depth(self, text: str) -> Optional[int]:
+        """Number of dots in a leading section number, or None"""
+        numbering = self.pattern.match(text).group('numbering')
+        return numbering.count('.') if numbering is not None else None
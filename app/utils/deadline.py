@@ -0,0 +1,51 @@
+"""
+Per-document time budgets for Service 1A
+"""
+
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+class Deadline:
+    """Wall-clock budget for one document, started on construction"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.start = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def remaining(self, share: float = 1.0) -> float:
+        """Seconds left until share of the budget is used up"""
+        return self.seconds * share - self.elapsed()
+
+    def expired(self, share: float = 1.0) -> bool:
+        return self.remaining(share) <= 0
+
+class HardTimeout(Exception):
+    """A document ran past the hard per-file timeout"""
+
+@contextmanager
+def hard_timeout(seconds: float):
+    """Raise HardTimeout in the block once seconds have passed.
+
+    Uses SIGALRM, so it only arms in the main thread on POSIX and is a no-op
+    elsewhere. The signal is handled between Python bytecodes: a single long
+    call into MuPDF is interrupted when it returns, not during it.
+    """
+    if seconds <= 0 or not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise HardTimeout(f'Hard timeout: still running after {seconds:g}s')
+
+    previous_handler = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
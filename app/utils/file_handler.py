@@ -4,9 +4,20 @@ File handling utilities for Service 1A - PDF Outline Extraction
 
 import json
 import logging
+import os
+import tempfile
 from pathlib import Path
 from typing import Dict, List, Union, Optional
 
+def _new_file_mode() -> int:
+    """Mode open() gives a new file under the current umask"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+# Read once at import: os.umask can only be read by setting it, which is not thread-safe
+NEW_FILE_MODE = _new_file_mode()
+
 class FileHandler:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -29,14 +40,34 @@ class FileHandler:
             self.logger.error(f'Error loading JSON from {file_path}: {str(e)}')
             raise
     
-    def save_json(self, data: Dict, file_path: Union[str, Path], indent: int = 2) -> bool:
-        """Save data to JSON file without BOM - optimized for outline format"""
+    def save_json(self, data: Dict, file_path: Union[str, Path], indent: int = 2, atomic: bool = False) -> bool:
+        """Save data to JSON file without BOM - optimized for outline format
+        
+        With atomic=True the JSON is written to a temp file in the same
+        directory and renamed into place, so readers never see a partial file.
+        The file keeps the mode of the one it replaces, or gets the umask
+        default, rather than the owner-only mode of the temp file.
+        """
+        tmp_path = None
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=indent, ensure_ascii=False, separators=(',', ': '))
+            if atomic:
+                fd, tmp_path = tempfile.mkstemp(dir=Path(file_path).parent, prefix='.', suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=indent, ensure_ascii=False, separators=(',', ': '))
+                try:
+                    mode = os.stat(file_path).st_mode & 0o7777
+                except FileNotFoundError:
+                    mode = NEW_FILE_MODE
+                os.chmod(tmp_path, mode)
+                os.replace(tmp_path, file_path)
+            else:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=indent, ensure_ascii=False, separators=(',', ': '))
             self.logger.info(f'JSON saved successfully: {file_path}')
             return True
         except Exception as e:
+            if tmp_path is not None:
+                Path(tmp_path).unlink(missing_ok=True)
             self.logger.error(f'Error saving JSON to {file_path}: {str(e)}')
             return False
     
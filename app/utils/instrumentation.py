@@ -0,0 +1,99 @@
+"""
+Lightweight per-stage timing and resource instrumentation for Service 1A
+"""
+
+import json
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import psutil
+
+class StageTimer:
+    """Accumulate wall time per named stage, counters and peak RSS for one document.
+
+    Stages may nest (``get_text`` runs inside ``extract``), so stage times
+    are inclusive and do not add up to the total. Repeated stages, such as
+    ``get_text`` once per page, accumulate. RSS is sampled with psutil
+    whenever an outermost stage ends, which keeps per-page overhead off the
+    hot path; the peak is the largest sample seen, and each outermost stage
+    also keeps the largest sample taken at its own end.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.peak_rss_bytes = 0
+        self.stage_rss_bytes: Dict[str, int] = {}
+        self._depth = 0
+        self._process = psutil.Process()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+            if self._depth == 0:
+                rss = self.sample_memory()
+                self.stage_rss_bytes[name] = max(self.stage_rss_bytes.get(name, 0), rss)
+
+    def count(self, name: str, value: int):
+        self.counts[name] = value
+
+    def sample_memory(self) -> int:
+        try:
+            rss = self._process.memory_info().rss
+        except psutil.Error:
+            return 0
+        self.peak_rss_bytes = max(self.peak_rss_bytes, rss)
+        return rss
+
+    def to_dict(self) -> Dict:
+        """Stage times in milliseconds, counters and peak RSS in MB"""
+        return {
+            'stages_ms': {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            'counts': dict(self.counts),
+            'peak_rss_mb': round(self.peak_rss_bytes / (1024 * 1024), 1),
+            'stage_rss_mb': {name: round(rss / (1024 * 1024), 1) for name, rss in self.stage_rss_bytes.items()}
+        }
+
+class NullTimer:
+    """Stand-in used when nobody is collecting metrics"""
+
+    def stage(self, name: str):
+        return nullcontext()
+
+    def count(self, name: str, value: int):
+        pass
+
+NULL_TIMER = NullTimer()
+
+class MetricsWriter:
+    """Append one JSON object per processed file to a JSON-lines file"""
+
+    def __init__(self, metrics_path: Union[str, Path]):
+        self.logger = logging.getLogger(__name__)
+        self.metrics_path = Path(metrics_path)
+
+    def write(self, record: Dict) -> bool:
+        try:
+            self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.metrics_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+            return True
+        except OSError as e:
+            self.logger.warning(f"Could not write metrics to {self.metrics_path}: {str(e)}")
+            return False
+
+def slowest_stage(metrics: Optional[Dict]) -> Optional[str]:
+    """Human readable name and time of the stage that took longest"""
+    if not metrics or not metrics.get('stages_ms'):
+        return None
+    name, milliseconds = max(metrics['stages_ms'].items(), key=lambda item: item[1])
+    return f"{name} {milliseconds / 1000:.2f}s"
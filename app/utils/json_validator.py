@@ -8,12 +8,28 @@ import logging
 from typing import Dict, List, Optional, Union
 from pathlib import Path
 
+try:
+    import jsonschema
+except ImportError:  # The hand-written checks below enforce the same rules
+    jsonschema = None
+
 class JSONValidator:
+    # Compiled from get_expected_schema() once per process and shared by every instance
+    _schema_validator = None
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        if jsonschema is not None and JSONValidator._schema_validator is None:
+            schema = self.get_expected_schema()
+            validator_class = jsonschema.validators.validator_for(schema)
+            validator_class.check_schema(schema)
+            JSONValidator._schema_validator = validator_class(schema)
     
     def validate_outline_output(self, output_data: Dict) -> tuple[bool, List[str]]:
-        """Validate Service 1A PDF outline JSON output format"""
+        """Validate Service 1A PDF outline JSON output format (the in-memory dict, before it is written)"""
+        if JSONValidator._schema_validator is not None:
+            return self._validate_with_schema(output_data)
+        
         errors = []
         
         # Check required top-level fields for Service 1A
@@ -44,6 +60,13 @@ class JSONValidator:
         
         return len(errors) == 0, errors
     
+    def _validate_with_schema(self, output_data: Dict) -> tuple[bool, List[str]]:
+        errors = []
+        for error in JSONValidator._schema_validator.iter_errors(output_data):
+            location = '/'.join(str(part) for part in error.absolute_path)
+            errors.append(f'{location}: {error.message}' if location else error.message)
+        return len(errors) == 0, errors
+    
     def _validate_outline_sections(self, sections: List[Dict]) -> List[str]:
         """Validate outline section structure for PDF headings"""
         errors = []
@@ -93,7 +116,10 @@ class JSONValidator:
             'total_pages': int,
             'processing_time': (int, float),
             'extraction_method': str,
-            'pdf_filename': str
+            'pdf_filename': str,
+            'partial': bool,
+            'pages_covered': int,
+            'strategy': str
         }
         
         for field, expected_type in optional_fields.items():
@@ -151,10 +177,12 @@ class JSONValidator:
             "properties": {
                 "title": {
                     "type": "string",
+                    "pattern": "\\S",
                     "description": "Document title extracted from PDF"
                 },
                 "outline": {
                     "type": "array",
+                    "minItems": 1,
                     "items": {
                         "type": "object",
                         "required": ["level", "text", "page"],
@@ -163,7 +191,7 @@ class JSONValidator:
                                 "type": "string",
                                 "enum": ["title", "H1", "H2", "H3", "H4", "H5", "H6"]
                             },
-                            "text": {"type": "string"},
+                            "text": {"type": "string", "pattern": "\\S"},
                             "page": {"type": "integer", "minimum": 1, "maximum": 50}
                         }
                     }
@@ -174,7 +202,10 @@ class JSONValidator:
                         "total_pages": {"type": "integer"},
                         "processing_time": {"type": "number"},
                         "extraction_method": {"type": "string"},
-                        "pdf_filename": {"type": "string"}
+                        "pdf_filename": {"type": "string"},
+                        "partial": {"type": "boolean"},
+                        "pages_covered": {"type": "integer"},
+                        "strategy": {"type": "string"}
                     }
                 }
             }
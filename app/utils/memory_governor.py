@@ -0,0 +1,157 @@
+"""
+RSS-based memory governor for Service 1A extraction
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import logging
+from typing import Optional
+
+import fitz
+import psutil
+
+# Pages to see before growth is extrapolated to the whole document; failing on a
+# projection also needs FAIL_PROJECTION_SHARE of the document seen in low-memory mode
+MIN_PROJECTION_PAGES = 20
+FAIL_PROJECTION_SHARE = 0.1
+# In low-memory mode the store is emptied again after this much growth
+SHRINK_STEP_BYTES = 4 * 1024 * 1024
+
+def _load_libc():
+    """glibc, for malloc_trim; None where it is not available"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6')
+        return libc if hasattr(libc, 'malloc_trim') else None
+    except OSError:
+        return None
+
+_LIBC = _load_libc()
+
+class MemoryLimitExceeded(MemoryError):
+    """A document would push the process past its memory budget"""
+
+class MemoryGovernor:
+    """Keep one process within limit_mb of growth above its idle baseline while a document is parsed.
+
+    Memory is the resident set minus file-backed shared pages (libraries),
+    which psutil reads cheaply from /proc on Linux; elsewhere it is the plain
+    RSS. calibrate() records the process's footprint once it is warm
+    (modules imported, extractor built); the budget only covers growth above
+    that, because a forked pool worker's footprint is mostly copy-on-write
+    pages it shares with the parent. check() is called at page and
+    stage boundaries. Past soft_ratio of the limit, or when the growth so
+    far projects past it by the last page, the governor empties PyMuPDF's
+    resource store and switches to low-memory mode: text-only page
+    extraction, and the store is emptied again after every few MB of
+    growth. The document fails with MemoryLimitExceeded, instead of the
+    container getting OOM-killed, when memory stays above the limit after
+    shrinking and a garbage collection, or earlier when the growth seen in
+    low-memory mode projects past the limit by the last page.
+    """
+
+    def __init__(self, limit_mb: float, soft_ratio: float = 0.8):
+        self.logger = logging.getLogger(__name__)
+        self.soft_ratio = soft_ratio
+        self.set_limit(limit_mb)
+        self.baseline_bytes = 0
+        self.low_memory = False
+        self._process = psutil.Process()
+        self._start_bytes = 0
+        self._start_pages = 0
+        self._page_count = 0
+        self._next_shrink_bytes = 0
+
+    def calibrate(self) -> int:
+        """Take the current footprint as the idle baseline; returns it in bytes"""
+        self.baseline_bytes = self.memory_bytes()
+        return self.baseline_bytes
+
+    def set_limit(self, limit_mb: float):
+        """Growth allowed above the baseline"""
+        self.limit_bytes = int(limit_mb * 1024 * 1024)
+        self.soft_bytes = int(self.limit_bytes * self.soft_ratio)
+
+    def start(self, page_count: int = 0):
+        """Reset for a new document of page_count pages"""
+        self.low_memory = False
+        self._page_count = page_count
+        self._start_bytes = self.growth_bytes()
+        self._start_pages = 0
+
+    def check(self, pages_done: Optional[int] = None, where: str = ''):
+        """Sample memory and react; raises MemoryLimitExceeded when shrinking cannot help"""
+        used = self.growth_bytes()
+        if not self.low_memory:
+            if used >= self.soft_bytes or self._projected(used, pages_done) >= self.soft_bytes:
+                used = self._enter_low_memory(used, pages_done, where)
+        elif used >= self._next_shrink_bytes:
+            fitz.TOOLS.store_shrink(100)
+            used = self.growth_bytes()
+            self._next_shrink_bytes = used + SHRINK_STEP_BYTES
+
+        if used >= self.limit_bytes:
+            # Last resort before giving up on the document
+            self.release()
+            used = self.growth_bytes()
+            if used >= self.limit_bytes:
+                raise MemoryLimitExceeded(
+                    f'Memory limit: {used / 2**20:.0f} MB above the {self.baseline_bytes / 2**20:.0f} MB baseline '
+                    f'exceeds the {self.limit_bytes / 2**20:.0f} MB budget{" at " + where if where else ""} '
+                    f'even after freeing caches'
+                )
+
+        # Already saving what can be saved: a document still growing towards the limit fails now
+        projected = self._projected(used, pages_done, int(self._page_count * FAIL_PROJECTION_SHARE))
+        if self.low_memory and projected >= self.limit_bytes:
+            raise MemoryLimitExceeded(
+                f'Memory limit: {used / 2**20:.0f} MB above the baseline at {where} and growing towards '
+                f'{projected / 2**20:.0f} MB, over the {self.limit_bytes / 2**20:.0f} MB budget'
+            )
+
+    def release(self):
+        """Empty PyMuPDF's store and hand freed heap pages back to the OS"""
+        fitz.TOOLS.store_shrink(100)
+        gc.collect()
+        if _LIBC is not None:
+            # Without this a failed large document keeps the process above the budget
+            _LIBC.malloc_trim(0)
+
+    def _enter_low_memory(self, used: int, pages_done: Optional[int], where: str) -> int:
+        self.logger.warning(f'Memory governor: {used / 2**20:.0f} MB above the baseline, nearing the '
+                            f'{self.limit_bytes / 2**20:.0f} MB budget{" at " + where if where else ""}, '
+                            f'switching to low-memory mode')
+        self.low_memory = True
+        fitz.TOOLS.store_shrink(100)
+        used = self.growth_bytes()
+        self._next_shrink_bytes = used + SHRINK_STEP_BYTES
+        # Project from here on: growth before the switch included the store
+        self._start_bytes = used
+        self._start_pages = pages_done or 0
+        return used
+
+    def _projected(self, used: int, pages_done: Optional[int], min_pages: int = 0) -> float:
+        """Memory at the last page if it keeps growing at the rate seen since the baseline"""
+        if not pages_done or pages_done >= self._page_count:
+            return used
+        pages_seen = pages_done - self._start_pages
+        if pages_seen < max(MIN_PROJECTION_PAGES, min_pages):
+            return used
+        growth_per_page = max(used - self._start_bytes, 0) / pages_seen
+        return used + growth_per_page * (self._page_count - pages_done)
+
+    def growth_bytes(self) -> int:
+        """Memory added since calibrate()"""
+        return max(self.memory_bytes() - self.baseline_bytes, 0)
+
+    def memory_bytes(self) -> int:
+        """Resident memory without file-backed shared pages"""
+        return process_memory_bytes(self._process)
+
+def process_memory_bytes(process: Optional[psutil.Process] = None) -> int:
+    """Resident memory of a process (default: this one) without file-backed shared pages"""
+    try:
+        info = (process or psutil.Process()).memory_info()
+    except psutil.Error:
+        return 0
+    return info.rss - getattr(info, 'shared', 0)
@@ -0,0 +1,80 @@
+"""
+Minimal latency histograms and counters exposed in Prometheus text format
+"""
+
+import threading
+from typing import Dict, List, Tuple
+
+# Seconds; covers cache hits (ms) up to the 10 s per-PDF budget and beyond
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class LatencyHistogram:
+    """Cumulative-bucket histogram of observed latencies in seconds"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+
+class MetricsRegistry:
+    """Per-label latency histograms, counters and gauges for the HTTP service"""
+
+    def __init__(self, prefix: str = 'outline'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._counters: Dict[Tuple[str, str], int] = {}
+        self._gauges: Dict[str, float] = {}
+
+    def observe_latency(self, endpoint: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(endpoint)
+            if histogram is None:
+                histogram = self._histograms[endpoint] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def count_response(self, endpoint: str, status: str):
+        with self._lock:
+            key = (endpoint, status)
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def render(self) -> str:
+        """Prometheus text exposition of everything recorded so far"""
+        latency = f'{self.prefix}_request_latency_seconds'
+        lines: List[str] = [
+            f'# HELP {latency} Request latency by endpoint',
+            f'# TYPE {latency} histogram'
+        ]
+
+        with self._lock:
+            for endpoint, histogram in sorted(self._histograms.items()):
+                label = f'endpoint="{endpoint}"'
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'{latency}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{latency}_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f'{latency}_sum{{{label}}} {histogram.total:.6f}')
+                lines.append(f'{latency}_count{{{label}}} {histogram.count}')
+
+            responses = f'{self.prefix}_responses_total'
+            lines.append(f'# HELP {responses} Responses by endpoint and status')
+            lines.append(f'# TYPE {responses} counter')
+            for (endpoint, status), count in sorted(self._counters.items()):
+                lines.append(f'{responses}{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            for name, value in sorted(self._gauges.items()):
+                lines.append(f'# TYPE {self.prefix}_{name} gauge')
+                lines.append(f'{self.prefix}_{name} {value}')
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,130 @@
+"""
+Content-addressed on-disk cache of extracted outlines for Service 1A
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+class OutlineCache:
+    """Outline JSON keyed by PDF content hash plus extractor config fingerprint.
+
+    Entries are small JSON files under ``cache_dir``; reads refresh the file
+    mtime so the oldest mtime is the least recently used entry, and writes
+    evict from that end once the cache grows past ``max_bytes``. Several
+    processes can share one directory: writes are atomic renames and each
+    process trims against its own view of the index.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path], max_bytes: int):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._index: Optional[Dict[str, list]] = None  # key -> [size, last_used]
+        self._total_bytes = 0
+
+    @staticmethod
+    def hash_file(pdf_path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+        """SHA-256 of the file contents"""
+        digest = hashlib.sha256()
+        with open(pdf_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(content_hash: str, fingerprint: str) -> str:
+        """Cache key for a document hash under a given extractor configuration"""
+        return hashlib.sha256(f'{content_hash}:{fingerprint}'.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f'{key}.json'
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached outline for key, or None on a miss"""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # Touch the entry so eviction sees it as recently used
+        now = time.time()
+        try:
+            os.utime(entry_path, (now, now))
+        except OSError:
+            pass
+        if self._index is not None and key in self._index:
+            self._index[key][1] = now
+
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: Dict) -> bool:
+        """Store an outline atomically and evict least recently used entries if needed"""
+        entry_path = self._entry_path(key)
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=entry_path.parent, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_path, entry_path)
+            except BaseException:
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+        except OSError as e:
+            self.logger.warning(f'Could not write outline cache entry {key[:12]}: {str(e)}')
+            return False
+
+        index = self._load_index()
+        previous = index.get(key)
+        if previous is not None:
+            self._total_bytes -= previous[0]
+        index[key] = [len(payload), time.time()]
+        self._total_bytes += len(payload)
+
+        self._evict()
+        return True
+
+    def _load_index(self) -> Dict[str, list]:
+        """Scan the cache directory once per process"""
+        if self._index is None:
+            self._index = {}
+            self._total_bytes = 0
+            if self.cache_dir.exists():
+                for entry_path in self.cache_dir.glob('*/*.json'):
+                    try:
+                        stat = entry_path.stat()
+                    except OSError:
+                        continue
+                    self._index[entry_path.stem] = [stat.st_size, stat.st_mtime]
+                    self._total_bytes += stat.st_size
+        return self._index
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._entry_path(key).unlink(missing_ok=True)
+            del self._index[key]
+            self._total_bytes -= size
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters for this process"""
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,155 @@
+"""
+Output sinks for Service 1A - where extracted outlines are written
+"""
+
+import json
+import logging
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from utils.file_handler import FileHandler
+
+class OutputSink:
+    """Destination for validated outlines.
+
+    write() returns where the outline went (a path, or '-' for stdout).
+    Aggregating sinks buffer records and commit them batch_size at a time,
+    so flush() must be called before the output is read and close() at the
+    end of a run; records still buffered when the process dies are lost and
+    their PDFs are simply processed again next run.
+    """
+
+    # Whether write() wants the SHA-256 of the PDF, which callers may have to compute
+    needs_content_hash = False
+
+    def write(self, pdf_name: str, outline_data: Dict, content_hash: Optional[str] = None) -> Optional[str]:
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self) -> 'OutputSink':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class JsonFileSink(OutputSink):
+    """One indented JSON file per PDF in the output directory, as the hackathon expects"""
+
+    def __init__(self, output_dir: Union[str, Path], file_handler: Optional[FileHandler] = None,
+                 output_filename: Optional[Callable[[str], str]] = None):
+        self.output_dir = Path(output_dir)
+        self.file_handler = file_handler or FileHandler()
+        self.output_filename = output_filename or (lambda pdf_name: f"{Path(pdf_name).stem}.json")
+
+    def write(self, pdf_name: str, outline_data: Dict, content_hash: Optional[str] = None) -> Optional[str]:
+        output_file = self.output_dir / self.output_filename(pdf_name)
+        # Temp file + rename: an interrupted run never leaves a truncated JSON behind
+        if not self.file_handler.save_json(outline_data, output_file, atomic=True):
+            return None
+        return str(output_file)
+
+class NdjsonSink(OutputSink):
+    """Append-only stream with one compact JSON object per PDF, to a file or stdout ('-').
+
+    Each line is {"filename", "content_hash", "title", "outline", ...} so a
+    whole corpus loads with one sequential read. A PDF processed again gets
+    a new line; readers keep the last line per filename.
+    """
+
+    needs_content_hash = True
+
+    def __init__(self, path: Union[str, Path], batch_size: int = 100):
+        self.logger = logging.getLogger(__name__)
+        self.path = str(path)
+        self.batch_size = max(batch_size, 1)
+        self._lines: List[str] = []
+        if self.path == '-':
+            self._stream = sys.stdout
+        else:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._stream = open(self.path, 'a', encoding='utf-8')
+
+    def write(self, pdf_name: str, outline_data: Dict, content_hash: Optional[str] = None) -> Optional[str]:
+        record = {'filename': pdf_name, 'content_hash': content_hash, **outline_data}
+        self._lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        if len(self._lines) >= self.batch_size:
+            self.flush()
+        return self.path
+
+    def flush(self):
+        if not self._lines:
+            return
+        # One write per batch; a line is never split across two writes
+        self._stream.write('\n'.join(self._lines) + '\n')
+        self._stream.flush()
+        self._lines = []
+
+    def close(self):
+        self.flush()
+        if self._stream is not sys.stdout:
+            self._stream.close()
+
+class SqliteSink(OutputSink):
+    """Indexed SQLite store: one row per PDF filename, looked up by name or content hash.
+
+    Rows are upserted batch_size at a time in one transaction. The outline
+    document (title, outline and any metadata) is stored as compact JSON;
+    ``SELECT output FROM outlines`` streams the corpus back in one pass.
+    """
+
+    needs_content_hash = True
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS outlines ('
+        ' filename TEXT PRIMARY KEY,'
+        ' content_hash TEXT,'
+        ' title TEXT NOT NULL,'
+        ' output TEXT NOT NULL,'
+        ' written_at REAL NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS outlines_content_hash ON outlines (content_hash)'
+    )
+    UPSERT = (
+        'INSERT INTO outlines (filename, content_hash, title, output, written_at) VALUES (?, ?, ?, ?, ?) '
+        'ON CONFLICT (filename) DO UPDATE SET content_hash = excluded.content_hash, title = excluded.title, '
+        'output = excluded.output, written_at = excluded.written_at'
+    )
+
+    def __init__(self, path: Union[str, Path], batch_size: int = 100):
+        self.logger = logging.getLogger(__name__)
+        self.path = str(path)
+        self.batch_size = max(batch_size, 1)
+        self._rows: List[Tuple] = []
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path)
+        # WAL lets readers query while a batch run is still writing
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        with self._connection:
+            for statement in self.SCHEMA:
+                self._connection.execute(statement)
+
+    def write(self, pdf_name: str, outline_data: Dict, content_hash: Optional[str] = None) -> Optional[str]:
+        output = json.dumps(outline_data, ensure_ascii=False, separators=(',', ':'))
+        self._rows.append((pdf_name, content_hash, outline_data.get('title', ''), output, time.time()))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+        return self.path
+
+    def flush(self):
+        if not self._rows:
+            return
+        with self._connection:
+            self._connection.executemany(self.UPSERT, self._rows)
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        self._connection.close()
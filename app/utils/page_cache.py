@@ -0,0 +1,136 @@
+"""
+Per-page cache of parsed text lines for Service 1A
+"""
+
+import logging
+import marshal
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+# SQLite's default limit on host parameters is 999 in older builds
+LOOKUP_CHUNK = 500
+
+class PageCache:
+    """Parsed lines of single pages, keyed by page fingerprint plus parser configuration.
+
+    Lets a re-published PDF reuse every page whose content did not change.
+    Entries live in one SQLite file (WAL, so pool workers can share it) as
+    marshal-encoded line lists, which round-trip the parser's tuples
+    exactly. Lookups and stores are batched per document. Least recently
+    used entries are evicted once the file holds more than max_bytes of
+    lines; like OutlineCache, each process trims against its own running
+    total.
+    """
+
+    def __init__(self, db_path: Union[str, Path], max_bytes: int):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._total_bytes = 0
+
+    @staticmethod
+    def encode(lines: List[Dict]) -> bytes:
+        return marshal.dumps(lines)
+
+    @staticmethod
+    def decode(payload: bytes) -> List[Dict]:
+        return marshal.loads(payload)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Encoded lines for every key that is cached; decode() them when needed"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        try:
+            connection = self._connect()
+            for start in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[start:start + LOOKUP_CHUNK]
+                rows = connection.execute(
+                    f'SELECT key, lines FROM pages WHERE key IN ({",".join("?" * len(chunk))})', chunk
+                )
+                found.update(rows)
+        except sqlite3.Error as e:
+            self.logger.warning(f'Page cache lookup failed: {str(e)}')
+            return {}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def store(self, entries: Dict[str, bytes], used_keys: Iterable[str] = ()) -> bool:
+        """Add encoded pages and refresh the keys that were hits, in one transaction"""
+        now = time.time()
+        used_keys = list(used_keys)
+        keys = list(entries)
+        try:
+            connection = self._connect()
+            with connection:
+                # Replaced pages no longer count towards the total
+                replaced_bytes = 0
+                for start in range(0, len(keys), LOOKUP_CHUNK):
+                    chunk = keys[start:start + LOOKUP_CHUNK]
+                    replaced_bytes += connection.execute(
+                        f'SELECT COALESCE(SUM(size), 0) FROM pages WHERE key IN ({",".join("?" * len(chunk))})', chunk
+                    ).fetchone()[0]
+                connection.executemany(
+                    'INSERT OR REPLACE INTO pages (key, lines, size, last_used) VALUES (?, ?, ?, ?)',
+                    [(key, payload, len(payload), now) for key, payload in entries.items()]
+                )
+                for start in range(0, len(used_keys), LOOKUP_CHUNK):
+                    chunk = used_keys[start:start + LOOKUP_CHUNK]
+                    connection.execute(
+                        f'UPDATE pages SET last_used = ? WHERE key IN ({",".join("?" * len(chunk))})', [now, *chunk]
+                    )
+            self._total_bytes += sum(len(payload) for payload in entries.values()) - replaced_bytes
+            self._evict()
+            return True
+        except sqlite3.Error as e:
+            self.logger.warning(f'Could not store {len(entries)} page(s) in the page cache: {str(e)}')
+            return False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use; the running total starts from what is on disk"""
+        if self._connection is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Several worker processes write to the same file; wait for their transactions
+            connection = sqlite3.connect(str(self.db_path), timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with connection:
+                connection.execute('CREATE TABLE IF NOT EXISTS pages '
+                                   '(key TEXT PRIMARY KEY, lines BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)')
+                connection.execute('CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used)')
+            self._total_bytes = connection.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+            self._connection = connection
+        return self._connection
+
+    def _evict(self):
+        """Drop least recently used pages until the cache is back under 90% of max_bytes"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        with self._connection:
+            while self._total_bytes > target:
+                rows = self._connection.execute('SELECT key, size FROM pages ORDER BY last_used LIMIT 1000').fetchall()
+                if not rows:
+                    self._total_bytes = 0
+                    break
+                evicted = []
+                for key, size in rows:
+                    if self._total_bytes <= target:
+                        break
+                    evicted.append((key,))
+                    self._total_bytes -= size
+                self._connection.executemany('DELETE FROM pages WHERE key = ?', evicted)
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters for this process"""
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
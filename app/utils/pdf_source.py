@@ -0,0 +1,86 @@
+"""
+Single-read PDF inputs for Service 1A
+"""
+
+import hashlib
+import mmap
+import os
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import fitz
+
+# Default size up to which a file is read into memory; larger files are memory-mapped
+DEFAULT_BUFFER_MAX_BYTES = 64 * 1024 * 1024
+
+class PDFSource:
+    """One input PDF, read from storage at most once.
+
+    A file up to buffer_max_bytes is read into a bytes buffer with a single
+    open and read. Validation, hashing and parsing all use that buffer, and
+    fitz.open(stream=...) takes it without a copy because PyMuPDF only
+    accepts bytes streams. A larger file is memory-mapped for validation and
+    hashing. MuPDF then opens it by path, so its pages are read on demand
+    instead of being copied into one buffer. Sources built from bytes
+    received in memory have no path at all. Use open() or from_bytes(),
+    and close() when done (or use it as a context manager).
+    """
+
+    def __init__(self, name: str, data: Union[bytes, mmap.mmap], path: Optional[str] = None):
+        self.name = name
+        self.data = data
+        self.path = path
+        self.size = len(data)
+        self._content_hash: Optional[str] = None
+
+    @classmethod
+    def open(cls, pdf_path: Union[str, Path], buffer_max_bytes: int = DEFAULT_BUFFER_MAX_BYTES) -> 'PDFSource':
+        """Read or map pdf_path; raises OSError when it cannot be read"""
+        pdf_path = Path(pdf_path)
+        with open(pdf_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 or size <= buffer_max_bytes:
+                data = f.read()
+            else:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(pdf_path.name, data, str(pdf_path))
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview], name: str = 'document.pdf') -> 'PDFSource':
+        """Wrap a PDF held in memory; name only feeds messages and the title fallback"""
+        return cls(Path(name).name or 'document.pdf', data if isinstance(data, bytes) else bytes(data))
+
+    def validate(self) -> Tuple[bool, Optional[str]]:
+        """Same checks as FileHandler.validate_pdf_file, on the buffer.
+
+        In-memory sources have no file name to go by, only the header is checked.
+        """
+        if self.path is not None and not self.name.lower().endswith('.pdf'):
+            return False, f"File is not a PDF: {self.name}"
+        if self.size == 0:
+            return False, f"PDF file is empty: {self.name}"
+        if self.data[:4] != b'%PDF':
+            return False, f"Invalid PDF header: {self.name}"
+        return True, None
+
+    def sha256(self) -> str:
+        """SHA-256 of the contents, computed once; equals OutlineCache.hash_file of the same file"""
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha256(self.data).hexdigest()
+        return self._content_hash
+
+    def open_document(self) -> fitz.Document:
+        """A fresh PyMuPDF document over the buffer, or over the file for mapped inputs"""
+        if isinstance(self.data, bytes):
+            return fitz.open(stream=self.data, filetype='pdf')
+        return fitz.open(self.path)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __enter__(self) -> 'PDFSource':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,76 @@
+"""
+On-demand cProfile capture for slow documents
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, TypeVar, Union
+
+T = TypeVar('T')
+
+class DocumentProfiler:
+    """Run each document under cProfile and keep the dump only if it was slow.
+
+    Dumps go to ``profiles_dir/<pdf stem>-<content hash>.prof`` (loadable
+    with pstats or snakeviz); the hash keeps in-memory inputs and same-named
+    files from different directories apart. min_seconds compares against the profiled wall time, which
+    includes cProfile's own overhead, so it errs on the side of keeping a
+    dump. Work done in page-split subprocesses is not captured.
+    """
+
+    def __init__(self, profiles_dir: Union[str, Path], min_seconds: float = 0.0):
+        self.logger = logging.getLogger(__name__)
+        self.profiles_dir = Path(profiles_dir)
+        self.min_seconds = min_seconds
+
+    def run(self, pdf_path: str, content_hash: str, function: Callable[[], T]) -> Tuple[T, Optional[Path]]:
+        """Call function under the profiler; returns its result and the dump path, if one was kept"""
+        profiler = cProfile.Profile()
+        start_time = time.perf_counter()
+        try:
+            result = profiler.runcall(function)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            # A failing document is exactly the one worth keeping
+            dump_path = self._dump(profiler, pdf_path, content_hash, elapsed)
+        return result, dump_path
+
+    def _dump(self, profiler: cProfile.Profile, pdf_path: str, content_hash: str, elapsed: float) -> Optional[Path]:
+        if elapsed < self.min_seconds:
+            return None
+        dump_path = self.profiles_dir / f'{Path(pdf_path).stem}-{content_hash[:12]}.prof'
+        try:
+            self.profiles_dir.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(dump_path))
+        except OSError as e:
+            self.logger.warning(f'Could not write profile for {Path(pdf_path).name}: {str(e)}')
+            return None
+        self.logger.info(f'Profiled {Path(pdf_path).name} ({elapsed:.2f}s) -> {dump_path}')
+        return dump_path
+
+def write_profile_summary(dump_paths: List[Union[str, Path]], summary_path: Union[str, Path],
+                          top: int = 30) -> Optional[str]:
+    """Merge per-document dumps and write the top functions by cumulative time"""
+    # The same document processed twice in a run has one dump
+    existing = [path for path in dict.fromkeys(map(str, dump_paths)) if Path(path).exists()]
+    if not existing:
+        return None
+
+    buffer = io.StringIO()
+    buffer.write(f'Profiles merged: {len(existing)}\n')
+    for path in existing:
+        buffer.write(f'  {Path(path).name}\n')
+    buffer.write('\n')
+
+    stats = pstats.Stats(*existing, stream=buffer)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(top)
+    summary = buffer.getvalue()
+
+    summary_path = Path(summary_path)
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    summary_path.write_text(summary, encoding='utf-8')
+    return summary
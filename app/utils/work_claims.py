@@ -0,0 +1,194 @@
+"""
+Lease-based work claiming on a shared directory for Service 1A
+"""
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+class WorkClaims:
+    """Claim, lease and completion files that let several nodes share one input directory.
+
+    Everything is a plain file under state_dir, so any shared volume works
+    and no node coordinates the others:
+
+    - claims/<key>.claim is created with O_EXCL, so exactly one node wins a
+      file. The claim is alive while its mtime is younger than lease_seconds;
+      the heartbeat thread refreshes the claims this node holds.
+    - An expired claim (its node crashed or hangs) is broken by renaming it
+      to a name unique to the breaking node. Only one rename can succeed, and
+      a claim renewed in the meantime is put back.
+    - done/<key>.json records the outcome once the outline is written; it
+      carries the PDF's size and mtime so a replaced file is processed again.
+    - nodes/<node>.json is touched on every scan. Its mtime is the volume's
+      clock, so lease ages never depend on the clocks of different hosts.
+
+    A node that loses a claim while still working (paused past its lease)
+    finishes anyway, which only repeats work: outputs are written atomically.
+    """
+
+    def __init__(self, state_dir: Union[str, Path], node_id: str, lease_seconds: float = 60.0):
+        self.logger = logging.getLogger(__name__)
+        self.state_dir = Path(state_dir)
+        self.node_id = node_id
+        self.lease_seconds = lease_seconds
+        self.claims_dir = self.state_dir / 'claims'
+        self.done_dir = self.state_dir / 'done'
+        self.nodes_dir = self.state_dir / 'nodes'
+        for directory in (self.claims_dir, self.done_dir, self.nodes_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self._held: Dict[str, str] = {}  # PDF name -> token written into its claim file
+        self._lock = threading.Lock()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stop_heartbeat = threading.Event()
+
+    @staticmethod
+    def key(pdf_name: str) -> str:
+        """File-system safe name of a PDF's claim and completion files"""
+        return hashlib.sha1(pdf_name.encode('utf-8')).hexdigest()
+
+    def volume_time(self) -> float:
+        """Touch this node's file and return its mtime: the shared volume's notion of now"""
+        node_path = self.nodes_dir / f'{self.key(self.node_id)}.json'
+        self._write_json(node_path, {'node': self.node_id, 'host': socket.gethostname(), 'pid': os.getpid(),
+                                     'updated_at': time.time()})
+        return node_path.stat().st_mtime
+
+    def try_claim(self, pdf_name: str, now: float) -> bool:
+        """Claim pdf_name for this node; False when another node holds a live claim"""
+        claim_path = self.claims_dir / f'{self.key(pdf_name)}.claim'
+        token = uuid.uuid4().hex
+        for attempt in range(2):
+            try:
+                fd = os.open(claim_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                # One retry, after breaking an expired claim
+                if attempt or not self._break_expired(claim_path, pdf_name, now):
+                    return False
+                continue
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'pdf': pdf_name, 'node': self.node_id, 'token': token, 'claimed_at': time.time()}, f)
+            with self._lock:
+                self._held[pdf_name] = token
+            return True
+        return False
+
+    def _break_expired(self, claim_path: Path, pdf_name: str, now: float) -> bool:
+        """Remove claim_path if its lease ran out; True when the file may be claimed again"""
+        try:
+            if now - claim_path.stat().st_mtime <= self.lease_seconds:
+                return False
+        except FileNotFoundError:
+            return True
+
+        stale_path = claim_path.with_name(f'{claim_path.name}.{uuid.uuid4().hex}.stale')
+        try:
+            os.rename(claim_path, stale_path)
+        except FileNotFoundError:
+            # Another node broke it first and may already hold a new claim
+            return True
+        # Renewed, or replaced by a fresh claim, between the stat and the rename: put it back
+        if now - stale_path.stat().st_mtime <= self.lease_seconds:
+            try:
+                os.link(stale_path, claim_path)
+            except FileExistsError:
+                pass
+            stale_path.unlink(missing_ok=True)
+            return False
+
+        owner = self._read_json(stale_path) or {}
+        stale_path.unlink(missing_ok=True)
+        self.logger.warning(f"Claim on {pdf_name} by {owner.get('node', 'unknown node')} expired, reclaiming it")
+        return True
+
+    def renew(self) -> List[str]:
+        """Refresh the leases of every held claim; returns the PDFs whose claims were lost"""
+        lost = []
+        with self._lock:
+            for pdf_name, token in list(self._held.items()):
+                claim_path = self.claims_dir / f'{self.key(pdf_name)}.claim'
+                try:
+                    if (self._read_json(claim_path) or {}).get('token') != token:
+                        raise FileNotFoundError(claim_path)
+                    os.utime(claim_path)
+                except OSError:
+                    lost.append(pdf_name)
+                    del self._held[pdf_name]
+        for pdf_name in lost:
+            self.logger.warning(f"Lost the claim on {pdf_name} (lease expired); another node may process it too")
+        return lost
+
+    def release(self, pdf_name: str):
+        """Drop a held claim, normally after mark_done"""
+        with self._lock:
+            token = self._held.pop(pdf_name, None)
+        if token is None:
+            return
+        claim_path = self.claims_dir / f'{self.key(pdf_name)}.claim'
+        if (self._read_json(claim_path) or {}).get('token') == token:
+            claim_path.unlink(missing_ok=True)
+
+    def mark_done(self, pdf_name: str, record: Dict):
+        """Atomically write the completion record of pdf_name"""
+        self._write_json(self.done_dir / f'{self.key(pdf_name)}.json', dict(record, pdf=pdf_name, node=self.node_id))
+
+    def completion(self, pdf_name: str) -> Optional[Dict]:
+        """Completion record of pdf_name, or None when it was not processed yet"""
+        return self._read_json(self.done_dir / f'{self.key(pdf_name)}.json')
+
+    def iter_completions(self) -> Iterator[Dict]:
+        for done_path in self.done_dir.glob('*.json'):
+            record = self._read_json(done_path)
+            if record is not None:
+                yield record
+
+    def start_heartbeat(self, interval_seconds: Optional[float] = None):
+        """Renew held claims in a background thread, by default three times per lease"""
+        if self._heartbeat is not None:
+            return
+        interval_seconds = interval_seconds or self.lease_seconds / 3
+        self._stop_heartbeat.clear()
+
+        def beat():
+            while not self._stop_heartbeat.wait(interval_seconds):
+                try:
+                    self.renew()
+                    self.volume_time()
+                except OSError as e:
+                    self.logger.warning(f"Claim heartbeat failed: {str(e)}")
+
+        self._heartbeat = threading.Thread(target=beat, name='claim-heartbeat', daemon=True)
+        self._heartbeat.start()
+
+    def stop_heartbeat(self):
+        if self._heartbeat is not None:
+            self._stop_heartbeat.set()
+            self._heartbeat.join()
+            self._heartbeat = None
+
+    def _read_json(self, path: Path) -> Optional[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Missing, or created but not written yet
+            return None
+
+    def _write_json(self, path: Path, data: Dict):
+        """Temp file + rename, so other nodes never read a partial record"""
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
@@ -0,0 +1,60 @@
+"""
+Memory benchmark: list-of-dicts text blocks vs the columnar TextBlockStore
+
+Usage: python benchmarks/block_store_memory.py [pdf ...]
+Defaults to the sample PDFs in app/input.
+"""
+
+import sys
+import tracemalloc
+from pathlib import Path
+
+app_dir = Path(__file__).resolve().parent.parent / 'app'
+sys.path.insert(0, str(app_dir))
+
+from services.round1a.heading_detector import HeadingDetector
+from services.round1a.pdf_parser import PDFParser
+
+
+def measure(build):
+    """Return (result, bytes still allocated by the result)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    pdf_files = [Path(arg) for arg in sys.argv[1:]] or sorted((app_dir / 'input').glob('*.pdf'))
+    parser = PDFParser()
+    detector = HeadingDetector()
+
+    print(f"{'file':45} {'blocks':>7} {'dicts KB':>9} {'store KB':>9} {'ratio':>6}  same")
+    total_dicts = total_store = 0
+
+    for pdf_file in pdf_files:
+        parsed = parser.parse_document(str(pdf_file))
+        blocks, dict_bytes = measure(lambda: parser.extract_text_with_metadata(parsed))
+        store, store_bytes = measure(lambda: parser.extract_text_store(parsed))
+
+        # Both layouts must give the same stats and headings
+        dict_stats = parser.get_document_stats(blocks)
+        store_stats = parser.get_document_stats(store)
+        same = (dict_stats == store_stats and
+                detector.detect_headings(blocks, dict_stats) == detector.detect_headings(store, store_stats))
+
+        total_dicts += dict_bytes
+        total_store += store_bytes
+        ratio = dict_bytes / store_bytes if store_bytes else 0.0
+        print(f"{pdf_file.name[:45]:45} {len(blocks):7d} {dict_bytes / 1024:9.1f} "
+              f"{store_bytes / 1024:9.1f} {ratio:5.1f}x  {same}")
+
+    if total_store:
+        print(f"{'total':45} {'':7} {total_dicts / 1024:9.1f} {total_store / 1024:9.1f} "
+              f"{total_dicts / total_store:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Report what the candidate pre-filter prunes
+
+Stores the lines of the given PDFs (the samples in app/input by default)
+the way the extraction pipeline does and prints, per document, how many
+the numeric bound and running header/footer removal prune before any
+text matching. tests/test_candidate_filter.py checks that the numeric
+bound never prunes a line the full scoring would keep.
+
+Usage: python benchmarks/candidate_filter.py [pdf ...]
+"""
+
+import sys
+from pathlib import Path
+
+app_dir = Path(__file__).resolve().parent.parent / 'app'
+sys.path.insert(0, str(app_dir))
+
+from services.round1a.candidate_filter import CandidateFilter
+from services.round1a.heading_detector import HeadingDetector
+from services.round1a.pdf_parser import PDFParser
+
+
+def main():
+    pdf_files = [Path(arg) for arg in sys.argv[1:]] or sorted((app_dir / 'input').glob('*.pdf'))
+    parser = PDFParser()
+    candidate_filter = CandidateFilter(HeadingDetector())
+
+    for pdf_file in pdf_files:
+        blocks = parser.extract_text_with_metadata(str(pdf_file))
+        doc_stats = parser.get_document_stats(blocks)
+        page_count = max(block['page'] for block in blocks) + 1 if blocks else 0
+
+        _, report = candidate_filter.filter(candidate_filter.collect_lines(blocks), doc_stats, page_count)
+        pruned = report['pruned_numeric'] + report['pruned_running']
+        share = pruned / report['lines'] if report['lines'] else 0.0
+        print(f"{pdf_file.name}: {report['lines']} lines, {report['pruned_numeric']} numeric + "
+              f"{report['pruned_running']} running pruned ({share:.0%}), {report['kept']} to text matching")
+
+
+if __name__ == '__main__':
+    main()
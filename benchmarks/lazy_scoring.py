@@ -0,0 +1,71 @@
+"""
+Benchmark: full heading scoring vs threshold-aware lazy scoring
+
+Scores every line of the given PDFs (the samples in app/input by default)
+with calculate_heading_score, which always evaluates all seven factors,
+and with HeadingDetector.score_lazily, which stops once the accept/reject
+decision is fixed. Reports the average number of factors evaluated per
+line and the time per line; tests/test_heading_scoring.py checks that
+both give the same decisions and scores.
+
+Usage: python benchmarks/lazy_scoring.py [pdf ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+app_dir = Path(__file__).resolve().parent.parent / 'app'
+sys.path.insert(0, str(app_dir))
+
+from services.round1a.heading_detector import ALL_TEXT_FEATURES, HeadingDetector
+from services.round1a.pdf_parser import PDFParser
+
+ROUNDS = 20
+FULL_FACTOR_COUNT = 1 + bin(ALL_TEXT_FEATURES).count('1')
+
+
+def main():
+    pdf_files = [Path(arg) for arg in sys.argv[1:]] or sorted((app_dir / 'input').glob('*.pdf'))
+    parser = PDFParser()
+    detector = HeadingDetector()
+
+    lines = []
+    for pdf_file in pdf_files:
+        blocks = parser.extract_text_with_metadata(str(pdf_file))
+        doc_stats = parser.get_document_stats(blocks)
+        body_size = doc_stats.get('body_text_size', doc_stats['avg_font_size'])
+        for block in blocks:
+            text = block['text'].strip()
+            if text:
+                lines.append((block, doc_stats, text, block['font_size'] / body_size))
+
+    evaluated = {False: 0, True: 0}
+    for block, doc_stats, text, font_ratio in lines:
+        for full_confidence in (False, True):
+            _, _, _, count = detector.score_lazily(
+                text, font_ratio, block['font_flags'], block['bbox'][0], full_confidence)
+            evaluated[full_confidence] += count
+
+    def time_per_line(function):
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            for line in lines:
+                function(*line)
+        return (time.perf_counter() - start) / (ROUNDS * max(len(lines), 1)) * 1e6
+
+    full = time_per_line(lambda block, doc_stats, text, font_ratio:
+                         detector.calculate_heading_score(block, doc_stats))
+    lazy = time_per_line(lambda block, doc_stats, text, font_ratio:
+                         detector.score_lazily(text, font_ratio, block['font_flags'], block['bbox'][0]))
+
+    count = max(len(lines), 1)
+    print(f"lines: {len(lines)}")
+    print(f"factors per line: full {FULL_FACTOR_COUNT}  lazy {evaluated[False] / count:.2f}  "
+          f"lazy + full confidence {evaluated[True] / count:.2f}")
+    print(f"full scoring : {full:6.2f} us/line")
+    print(f"lazy scoring : {lazy:6.2f} us/line  ({full / lazy:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
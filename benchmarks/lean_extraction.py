@@ -0,0 +1,101 @@
+"""
+Benchmark: full get_text('dict') parsing vs the lean text-only mode
+
+Parses every page of the given PDFs (the samples in app/input by default)
+with PDFParser(lean=False) and PDFParser(lean=True) and reports the time
+per page. The identical-output check runs the whole heuristic pipeline in
+both modes and exits non-zero if any outline differs. Line-level
+differences are listed too: with images out of the way MuPDF sometimes
+joins spans into one line, which is expected.
+
+With --clip MARGIN the lean parser also drops that fraction of the page
+height at the top and bottom; the script then reports how many lines the
+clip removed instead of requiring identical output.
+
+Usage: python benchmarks/lean_extraction.py [--clip MARGIN] [pdf ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import fitz
+
+app_dir = Path(__file__).resolve().parent.parent / 'app'
+sys.path.insert(0, str(app_dir))
+
+from services.round1a.outline_extractor import OutlineExtractor
+from services.round1a.pdf_parser import PDFParser
+
+ROUNDS = 10
+
+
+def parse_pages(parser, doc):
+    return [parser._parse_page(doc[page_num]) for page_num in range(len(doc))]
+
+
+def time_per_page(parser, docs):
+    page_count = sum(len(doc) for doc in docs)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for doc in docs:
+            parse_pages(parser, doc)
+    return (time.perf_counter() - start) / (ROUNDS * max(page_count, 1)) * 1e3
+
+
+def extract_outline(parser, pdf_file):
+    """Heuristic outline with the given parser (bookmarks and cache off)"""
+    extractor = OutlineExtractor()
+    extractor.settings.extract_bookmarks = False
+    extractor.pdf_parser = parser
+    return extractor.extract_outline(str(pdf_file))
+
+
+def main():
+    args = sys.argv[1:]
+    clip_margin = 0.0
+    if args[:1] == ['--clip']:
+        clip_margin = float(args[1])
+        args = args[2:]
+
+    pdf_files = [Path(arg) for arg in args] or sorted((app_dir / 'input').glob('*.pdf'))
+    docs = [fitz.open(str(pdf_file)) for pdf_file in pdf_files]
+
+    full_parser = PDFParser(lean=False)
+    lean_parser = PDFParser(lean=True, clip_margin=clip_margin)
+
+    outline_mismatches = 0
+    full_lines = lean_lines = 0
+    for pdf_file, doc in zip(pdf_files, docs):
+        full_pages = parse_pages(full_parser, doc)
+        lean_pages = parse_pages(lean_parser, doc)
+        full_lines += sum(len(lines) for lines in full_pages)
+        lean_lines += sum(len(lines) for lines in lean_pages)
+        if clip_margin > 0:
+            continue
+
+        changed_pages = [page_num + 1 for page_num, (full, lean) in enumerate(zip(full_pages, lean_pages))
+                         if full != lean]
+        if changed_pages:
+            print(f"{pdf_file.name}: line grouping differs on pages {changed_pages}")
+        if extract_outline(full_parser, pdf_file) != extract_outline(lean_parser, pdf_file):
+            outline_mismatches += 1
+            print(f"outline mismatch: {pdf_file.name}")
+
+    full = time_per_page(full_parser, docs)
+    lean = time_per_page(lean_parser, docs)
+
+    print(f"files: {len(docs)}  pages: {sum(len(doc) for doc in docs)}  outline mismatches: {outline_mismatches}")
+    print(f"full dict : {full:7.3f} ms/page  {full_lines} lines")
+    print(f"lean      : {lean:7.3f} ms/page  {lean_lines} lines  ({full / lean:.2f}x)")
+    if clip_margin > 0:
+        print(f"clip margin {clip_margin:.0%} dropped {full_lines - lean_lines} lines")
+
+    for doc in docs:
+        doc.close()
+
+    sys.exit(1 if outline_mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""
+Benchmark suite: end-to-end extraction over real and synthetic PDFs
+
+Runs OutlineExtractor (outline cache off, everything else from the usual
+environment settings) over the samples in app/input and over synthetic
+documents from synthetic_pdfs.py at each page count x heading density x
+font mix. For every group (the samples, and the synthetic documents of
+each page count) it reports throughput, p50/p95 latency per file and per
+page, median stage times, the largest RSS seen at the end of each
+pipeline stage and, for synthetic documents, recall and precision
+against the planted outline.
+
+Results go to a JSON file. The run fails (exit 1) when a document of at
+most --budget-pages pages takes longer than --budget seconds (the
+challenge's 10 s for 50 pages), or when a group's p95 time per page is
+more than --tolerance slower than in the --baseline results file.
+Larger documents are measured and reported but not held to the budget.
+The extraction deadline applies as configured, so very large documents
+may come back partial; per-page figures use the pages actually covered.
+Set EXTRACTION_DEADLINE_SECONDS=0 for full scaling curves.
+
+Usage: python benchmarks/pipeline_suite.py [--pages 10,50,500,5000] [--repeat 3]
+           [--baseline results.json] [--output results.json] [--no-samples]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+import fitz
+import numpy as np
+
+bench_dir = Path(__file__).resolve().parent
+app_dir = bench_dir.parent / 'app'
+sys.path.insert(0, str(app_dir))
+
+from config.settings import Settings
+from services.round1a.outline_extractor import OutlineExtractor
+
+import synthetic_pdfs
+
+RESULTS_VERSION = 1
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run_document(extractor: OutlineExtractor, document: Dict, repeat: int) -> Dict:
+    """Extract one document repeat times and collect latencies and stage metrics"""
+    latencies = []
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = extractor.extract_outline(str(document['path']))
+        latencies.append(time.perf_counter() - start)
+        runs.append(extractor.last_metrics)
+    outline = result['outline']
+
+    row = {
+        'file': document['path'].name,
+        'group': document['group'],
+        'pages': document['pages'],
+        'pages_covered': result['metadata'].get('pages_covered', document['pages']),
+        'extraction_method': extractor.last_extraction_method,
+        'latency_s': [round(latency, 4) for latency in latencies],
+        'stages_ms': {stage: round(percentile([run['stages_ms'].get(stage, 0.0) for run in runs], 50), 3)
+                      for stage in runs[-1]['stages_ms']},
+        'stage_rss_mb': {stage: max(run['stage_rss_mb'].get(stage, 0.0) for run in runs)
+                         for stage in runs[-1]['stage_rss_mb']},
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in runs),
+        'headings': len(outline)
+    }
+    if 'planted' in document:
+        # Whitespace is ignored: refinement may print "1.1" as "1. 1"
+        found = {''.join(entry['text'].split()) for entry in outline}
+        planted = {''.join(entry['text'].split()) for entry in document['planted']['outline']}
+        matched = len(found & planted)
+        row['recall'] = round(matched / len(planted), 4) if planted else 1.0
+        row['precision'] = round(matched / len(found), 4) if found else 1.0
+    return row
+
+
+def summarize_group(rows: List[Dict]) -> Dict:
+    latencies = [latency for row in rows for latency in row['latency_s']]
+    per_page_ms = [latency / max(row['pages_covered'], 1) * 1000 for row in rows for latency in row['latency_s']]
+    total_seconds = sum(latencies)
+    total_pages = sum(row['pages_covered'] * len(row['latency_s']) for row in rows)
+    stages = sorted({stage for row in rows for stage in row['stages_ms']})
+
+    summary = {
+        'files': len(rows),
+        'runs': len(latencies),
+        'throughput_files_per_s': round(len(latencies) / total_seconds, 3) if total_seconds else None,
+        'throughput_pages_per_s': round(total_pages / total_seconds, 1) if total_seconds else None,
+        'latency_s': {'p50': round(percentile(latencies, 50), 4), 'p95': round(percentile(latencies, 95), 4),
+                      'max': round(max(latencies), 4)},
+        'per_page_ms': {'p50': round(percentile(per_page_ms, 50), 3), 'p95': round(percentile(per_page_ms, 95), 3)},
+        'stages_ms_p50': {stage: round(percentile([row['stages_ms'].get(stage, 0.0) for row in rows], 50), 3)
+                          for stage in stages},
+        'stage_rss_mb_max': {stage: max(row['stage_rss_mb'].get(stage, 0.0) for row in rows)
+                             for stage in sorted({stage for row in rows for stage in row['stage_rss_mb']})},
+        'peak_rss_mb': max(row['peak_rss_mb'] for row in rows),
+        'partial_files': sum(1 for row in rows if row['pages_covered'] < row['pages'])
+    }
+    if all('recall' in row for row in rows):
+        summary['recall'] = round(sum(row['recall'] for row in rows) / len(rows), 4)
+        summary['precision'] = round(sum(row['precision'] for row in rows) / len(rows), 4)
+    return summary
+
+
+def check_results(results: Dict, budget: float, budget_pages: int, baseline_path: Path, tolerance: float) -> List[str]:
+    failures = []
+    for row in results['documents']:
+        if row['pages'] <= budget_pages and max(row['latency_s']) > budget:
+            failures.append(f"{row['file']}: {max(row['latency_s']):.2f}s over the {budget}s budget")
+
+    if baseline_path:
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+        for group, summary in results['groups'].items():
+            previous = baseline.get('groups', {}).get(group)
+            if not previous:
+                continue
+            limit = previous['per_page_ms']['p95'] * (1 + tolerance)
+            if summary['per_page_ms']['p95'] > limit:
+                failures.append(f"{group}: p95 {summary['per_page_ms']['p95']:.2f} ms/page, baseline "
+                                f"{previous['per_page_ms']['p95']:.2f} ms/page (+{tolerance:.0%} allowed)")
+    return failures
+
+
+def print_report(results: Dict):
+    print(f"{'group':<16} {'files':>5} {'pages/s':>9} {'p50 s':>8} {'p95 s':>8} "
+          f"{'p50 ms/pg':>10} {'p95 ms/pg':>10} {'peak MB':>8} {'recall':>7}")
+    for group, summary in results['groups'].items():
+        recall = f"{summary['recall']:.2f}" if 'recall' in summary else '-'
+        print(f"{group:<16} {summary['files']:>5} {summary['throughput_pages_per_s']:>9} "
+              f"{summary['latency_s']['p50']:>8.3f} {summary['latency_s']['p95']:>8.3f} "
+              f"{summary['per_page_ms']['p50']:>10.2f} {summary['per_page_ms']['p95']:>10.2f} "
+              f"{summary['peak_rss_mb']:>8} {recall:>7}")
+        slowest = sorted(summary['stages_ms_p50'].items(), key=lambda item: -item[1])[:4]
+        print(f"{'':<16} stages p50: " + ', '.join(f"{stage} {ms:.1f}ms" for stage, ms in slowest))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--pages', default='10,50,500,5000', help='synthetic page counts ("" for none)')
+    arg_parser.add_argument('--densities', default=','.join(synthetic_pdfs.HEADING_DENSITIES))
+    arg_parser.add_argument('--fonts', default=','.join(synthetic_pdfs.FONT_MIXES))
+    arg_parser.add_argument('--repeat', type=int, default=3, help='timed runs per document')
+    arg_parser.add_argument('--synthetic-dir', type=Path,
+                            default=Path(tempfile.gettempdir()) / 'outline-benchmark-pdfs',
+                            help='where generated PDFs are kept and reused')
+    arg_parser.add_argument('--no-samples', action='store_true', help='skip app/input/*.pdf')
+    arg_parser.add_argument('--output', type=Path,
+                            default=bench_dir / 'results' / f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json")
+    arg_parser.add_argument('--baseline', type=Path, help='earlier results file to compare against')
+    arg_parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 per-page slowdown')
+    arg_parser.add_argument('--budget', type=float, default=None, help='seconds per document (timeout_seconds)')
+    arg_parser.add_argument('--budget-pages', type=int, default=50, help='largest document held to the budget')
+    args = arg_parser.parse_args()
+
+    # Per-document warnings (page limit and the like) would drown the report
+    logging.getLogger().setLevel(logging.ERROR)
+    settings = Settings()
+    budget = args.budget if args.budget is not None else float(settings.timeout_seconds)
+
+    documents = []
+    if not args.no_samples:
+        for pdf_file in sorted((app_dir / 'input').glob('*.pdf')):
+            with fitz.open(pdf_file) as doc:
+                documents.append({'path': pdf_file, 'pages': len(doc), 'group': 'samples'})
+    page_counts = [int(pages) for pages in args.pages.split(',') if pages]
+    if page_counts:
+        print(f"Preparing synthetic PDFs in {args.synthetic_dir} ...")
+        for document in synthetic_pdfs.generate_suite(args.synthetic_dir, page_counts, args.densities.split(','),
+                                                      args.fonts.split(',')):
+            documents.append(dict(document, group=f"synthetic/p{document['pages']}"))
+    if not documents:
+        sys.exit('No documents to benchmark')
+
+    extractor = OutlineExtractor()
+    # Untimed warm-up so imports and first-call setup do not land in the first sample
+    extractor.extract_outline(str(documents[0]['path']))
+
+    rows = []
+    for document in documents:
+        rows.append(run_document(extractor, document, args.repeat))
+        print(f"  {rows[-1]['file']}: {min(rows[-1]['latency_s']):.3f}s best of {args.repeat}")
+
+    groups = {}
+    for row in rows:
+        groups.setdefault(row['group'], []).append(row)
+
+    results = {
+        'version': RESULTS_VERSION,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'pymupdf': fitz.VersionBind,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat,
+            'parser': extractor.pdf_parser.get_config(),
+            'extract_bookmarks': settings.extract_bookmarks,
+            'page_split_threshold': settings.page_split_threshold
+        },
+        'groups': {group: summarize_group(group_rows) for group, group_rows in groups.items()},
+        'documents': rows
+    }
+    failures = check_results(results, budget, args.budget_pages, args.baseline, args.tolerance)
+    results['failures'] = failures
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2), encoding='utf-8')
+
+    print()
+    print_report(results)
+    print(f"\nResults: {args.output}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
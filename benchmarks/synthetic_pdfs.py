@@ -0,0 +1,167 @@
+"""
+Synthetic PDF generator for the benchmark suite
+
+Builds deterministic documents with PyMuPDF: a title on page 1, numbered
+H1/H2/H3 headings at a chosen density and body text lines in between.
+The font mix controls how varied the typography is:
+
+* uniform - Helvetica body, Helvetica Bold headings
+* mixed   - Times body, Helvetica Bold headings at several sizes, Courier
+            code lines and occasional bold body lines
+
+Each document comes back with the outline that was planted in it (also
+saved next to the PDF as JSON), so callers can check recall as well as
+speed. Existing files are reused; bump GENERATOR_VERSION when the layout
+changes.
+
+Usage: python benchmarks/synthetic_pdfs.py OUT_DIR [--pages 10,50,500,5000]
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Dict, List
+
+import fitz
+
+GENERATOR_VERSION = '2'
+
+# Average number of headings per page
+HEADING_DENSITIES = {'sparse': 0.25, 'normal': 1.0, 'dense': 4.0}
+FONT_MIXES = ('uniform', 'mixed')
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+MARGIN = 72
+LINE_GAP = 1.5
+
+# Body words avoid "Section", "Figure", "Table" and the like, which would turn a body line into a keyword heading
+WORDS = ('system data model results method analysis process design value range policy report '
+         'review service network support market budget quality project training research '
+         'customer document program sample measure control period').split()
+TOPICS = ('Introduction Background Overview Methodology Requirements Architecture Evaluation '
+          'Results Discussion Implementation Deployment Security Governance Timeline Appendix').split()
+
+FONTS = {
+    'uniform': {'body': ('helv', 10), 'code': ('helv', 10), 'body_bold': ('hebo', 10),
+                'H1': ('hebo', 18), 'H2': ('hebo', 14), 'H3': ('hebo', 12), 'title': ('hebo', 24)},
+    'mixed': {'body': ('tiro', 10.5), 'code': ('cour', 9), 'body_bold': ('tibo', 10.5),
+              'H1': ('hebo', 20), 'H2': ('hebo', 15), 'H3': ('tibo', 12.5), 'title': ('hebo', 26)},
+}
+
+
+def document_name(pages: int, density: str, font_mix: str) -> str:
+    return f'synthetic-p{pages}-{density}-{font_mix}-v{GENERATOR_VERSION}.pdf'
+
+
+def generate_pdf(path: Path, pages: int, density: str = 'normal', font_mix: str = 'uniform',
+                 seed: int = 0) -> Dict:
+    """Write one synthetic PDF and return {'title', 'outline', 'pages'} as planted"""
+    rng = random.Random(f'{seed}-{pages}-{density}-{font_mix}')
+    fonts = FONTS[font_mix]
+    heading_rate = HEADING_DENSITIES[density]
+    title = f'Synthetic {density.title()} Benchmark Document'
+    outline: List[Dict] = []
+    numbers = [0, 0, 0]
+
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        # One Shape per page: page.insert_text would commit the content stream on every line
+        shape = page.new_shape()
+        y = MARGIN
+        if page_num == 0:
+            fontname, fontsize = fonts['title']
+            shape.insert_text((MARGIN, y), title, fontname=fontname, fontsize=fontsize)
+            y += fontsize * 2
+
+        # Headings land on random lines of the page; the rest is body text
+        heading_count = int(heading_rate) + (rng.random() < heading_rate % 1)
+        line_slots = max(int((PAGE_HEIGHT - MARGIN - y) / (10 * LINE_GAP * 1.4)), heading_count)
+        heading_lines = set(rng.sample(range(line_slots), heading_count))
+
+        for line in range(line_slots):
+            if y > PAGE_HEIGHT - MARGIN:
+                break
+            if line in heading_lines:
+                level = _next_level(rng, numbers)
+                text = _heading_text(rng, numbers, level)
+                fontname, fontsize = fonts[f'H{level}']
+                shape.insert_text((MARGIN, y + fontsize * 0.5), text, fontname=fontname, fontsize=fontsize)
+                outline.append({'level': f'H{level}', 'text': text, 'page': page_num + 1})
+                y += fontsize * 2.2
+                continue
+
+            style = 'body'
+            if font_mix == 'mixed':
+                roll = rng.random()
+                style = 'code' if roll < 0.08 else 'body_bold' if roll < 0.11 else 'body'
+            fontname, fontsize = fonts[style]
+            words = rng.choices(WORDS, k=rng.randint(8, 14))
+            shape.insert_text((MARGIN, y), ' '.join(words).capitalize() + '.', fontname=fontname, fontsize=fontsize)
+            y += fontsize * LINE_GAP
+        shape.commit()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(path), garbage=3, deflate=True)
+    doc.close()
+    return {'title': title, 'outline': outline, 'pages': pages}
+
+
+def _next_level(rng: random.Random, numbers: List[int]) -> int:
+    """Pick a heading level that keeps the numbering well formed"""
+    if numbers[0] == 0:
+        return 1
+    roll = rng.random()
+    if roll < 0.3:
+        return 1
+    if roll < 0.75 or numbers[1] == 0:
+        return 2
+    return 3
+
+
+def _heading_text(rng: random.Random, numbers: List[int], level: int) -> str:
+    numbers[level - 1] += 1
+    for deeper in range(level, 3):
+        numbers[deeper] = 0
+    label = '.'.join(str(number) for number in numbers[:level])
+    if level == 1:
+        label += '.'
+    return f'{label} {rng.choice(TOPICS)} {rng.choice(WORDS).title()}'
+
+
+def generate_suite(out_dir: Path, page_counts: List[int], densities: List[str] = None,
+                   font_mixes: List[str] = None) -> List[Dict]:
+    """Generate (or reuse) one PDF per page count x density x font mix"""
+    documents = []
+    for pages in page_counts:
+        for density in densities or list(HEADING_DENSITIES):
+            for font_mix in font_mixes or list(FONT_MIXES):
+                path = Path(out_dir) / document_name(pages, density, font_mix)
+                planted_path = path.with_suffix('.json')
+                if path.exists() and planted_path.exists():
+                    planted = json.loads(planted_path.read_text(encoding='utf-8'))
+                else:
+                    planted = generate_pdf(path, pages, density, font_mix)
+                    planted_path.write_text(json.dumps(planted), encoding='utf-8')
+                documents.append({'path': path, 'pages': pages, 'density': density, 'font_mix': font_mix,
+                                  'planted': planted})
+    return documents
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('out_dir', type=Path)
+    arg_parser.add_argument('--pages', default='10,50,500,5000')
+    arg_parser.add_argument('--densities', default=','.join(HEADING_DENSITIES))
+    arg_parser.add_argument('--fonts', default=','.join(FONT_MIXES))
+    args = arg_parser.parse_args()
+
+    documents = generate_suite(args.out_dir, [int(p) for p in args.pages.split(',')],
+                               args.densities.split(','), args.fonts.split(','))
+    for document in documents:
+        print(f"{document['path']}: {document['pages']} pages, {len(document['planted']['outline'])} headings")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark: per-pattern regex loop vs the compiled TextFeatureMatcher
+
+Times the original text feature checks (six re.match calls, the keyword
+substring loop and the separate numbering regex) against one
+TextFeatureMatcher.match call per line, on every line of the given PDFs
+(the samples in app/input by default). Exits non-zero if the two disagree.
+
+Usage: python benchmarks/text_features.py [pdf ...]
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+app_dir = Path(__file__).resolve().parent.parent / 'app'
+sys.path.insert(0, str(app_dir))
+
+from services.round1a.heading_detector import HeadingDetector
+from services.round1a.pdf_parser import PDFParser
+
+ROUNDS = 20
+
+
+def legacy_features(detector, text):
+    """Text features exactly as calculate_heading_score/determine_heading_level used to compute them"""
+    matches_pattern = False
+    for pattern in detector.heading_patterns:
+        if re.match(pattern, text, re.IGNORECASE):
+            matches_pattern = True
+            break
+
+    matches_keyword = False
+    text_lower = text.lower()
+    for keyword in detector.heading_keywords:
+        if keyword in text_lower:
+            matches_keyword = True
+            break
+
+    numbered_match = re.match(r'^(\d+)(\.\d+)*\.?\s+', text)
+    depth = numbered_match.group(0).count('.') if numbered_match else None
+    return matches_pattern, matches_keyword, depth
+
+
+def time_per_line(function, texts):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for text in texts:
+            function(text)
+    return (time.perf_counter() - start) / (ROUNDS * max(len(texts), 1)) * 1e6
+
+
+def main():
+    pdf_files = [Path(arg) for arg in sys.argv[1:]] or sorted((app_dir / 'input').glob('*.pdf'))
+    parser = PDFParser()
+    detector = HeadingDetector()
+
+    texts = []
+    for pdf_file in pdf_files:
+        texts.extend(block['text'].strip() for block in parser.extract_text_with_metadata(str(pdf_file)))
+
+    mismatches = [text for text in texts
+                  if legacy_features(detector, text) != detector.text_matcher.match(text)]
+    for text in mismatches[:20]:
+        print(f"mismatch: {text!r} legacy {legacy_features(detector, text)} "
+              f"compiled {detector.text_matcher.match(text)}")
+
+    legacy = time_per_line(lambda text: legacy_features(detector, text), texts)
+    compiled = time_per_line(detector.text_matcher.match, texts)
+
+    print(f"lines: {len(texts)}  mismatches: {len(mismatches)}")
+    print(f"legacy regex loop : {legacy:6.2f} us/line")
+    print(f"compiled matcher  : {compiled:6.2f} us/line  ({legacy / compiled:.1f}x)")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
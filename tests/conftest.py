@@ -0,0 +1,17 @@
+"""
+Shared pytest setup: the service modules import each other from app/
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parent.parent / 'app'
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+@pytest.fixture(scope='session')
+def sample_pdfs():
+    """The sample PDFs shipped in app/input"""
+    return sorted((APP_DIR / 'input').glob('*.pdf'))
@@ -0,0 +1,56 @@
+"""
+Batch worker pool: a dead worker only fails the file it was running
+"""
+
+import os
+import shutil
+
+import pytest
+
+from services.round1a import batch_runner
+from services.round1a.batch_runner import WorkerPool, iter_pool_results
+
+def crash_on_marker(pdf_path: str):
+    """Worker task standing in for _process_in_worker: dies like an OOM-killed process on crash*.pdf"""
+    if os.path.basename(pdf_path).startswith('crash'):
+        os._exit(1)
+    return batch_runner.process_single_pdf(batch_runner._worker_extractor, pdf_path)
+
+@pytest.fixture
+def worker_env(monkeypatch, tmp_path):
+    monkeypatch.setenv('OUTLINE_CACHE', 'false')
+    monkeypatch.setenv('METRICS', 'false')
+    # Workers are forked after this, so they run the crashing task
+    monkeypatch.setattr(batch_runner, '_process_in_worker', crash_on_marker)
+
+def copy_inputs(sample_pdfs, directory, crash_positions):
+    """The samples, with a crashing copy inserted at each of crash_positions"""
+    pdf_files = [shutil.copy(pdf_path, directory / pdf_path.name) for pdf_path in sample_pdfs]
+    for count, position in enumerate(crash_positions):
+        pdf_files.insert(position, shutil.copy(sample_pdfs[0], directory / f'crash{count}.pdf'))
+    return [str(pdf_file) for pdf_file in pdf_files]
+
+@pytest.mark.parametrize('crash_positions', [[0], [2], [1, 4]])
+def test_dead_worker_only_fails_its_file(worker_env, tmp_path, sample_pdfs, crash_positions):
+    pdf_files = copy_inputs(sample_pdfs, tmp_path, crash_positions)
+
+    with WorkerPool(2) as pool:
+        results = list(iter_pool_results(pool, pdf_files, hard_timeout_seconds=30))
+
+    assert [result['pdf_path'] for result in results] == pdf_files
+    for result in results:
+        if os.path.basename(result['pdf_path']).startswith('crash'):
+            assert result['status'] == 'error'
+            assert result['error'].startswith('Worker process failed')
+        else:
+            assert result['status'] == 'ok', result['error']
+
+def worker_split_threshold() -> int:
+    return batch_runner._worker_extractor.pdf_parser.split_threshold
+
+def test_workers_do_not_split_pages(monkeypatch):
+    monkeypatch.setenv('OUTLINE_CACHE', 'false')
+    monkeypatch.setenv('PAGE_SPLIT_THRESHOLD', '300')
+
+    with WorkerPool(2) as pool:
+        assert pool.submit_task(worker_split_threshold).result(timeout=30) == 0
@@ -0,0 +1,58 @@
+"""
+Candidate pre-filter: lines the numeric bound prunes are never text matched, and never headings
+"""
+
+import fitz
+
+from services.round1a.candidate_filter import CandidateFilter
+from services.round1a.heading_detector import HeadingDetector
+from services.round1a.outline_extractor import OutlineExtractor
+from services.round1a.pdf_parser import PDFParser
+
+# Body size, not bold and over 100 characters: no heading score is reachable
+LONG_LINE = 'long body line {} ' + 'with plenty of filler words ' * 4
+
+def write_pdf(path):
+    doc = fitz.open()
+    for page_num in range(2):
+        page = doc.new_page()
+        page.insert_text((72, 72), f'{page_num + 1}. Chapter {page_num + 1}', fontsize=18)
+        for line_num in range(10):
+            page.insert_text((72, 120 + line_num * 16), f'Body text line {line_num}', fontsize=10)
+        for line_num in range(8):
+            page.insert_text((72, 300 + line_num * 16), LONG_LINE.format(f'{page_num}-{line_num}'), fontsize=6)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def test_pruned_lines_never_reach_the_matcher(tmp_path, monkeypatch):
+    monkeypatch.setenv('OUTLINE_CACHE', 'false')
+    monkeypatch.setenv('EXTRACT_BOOKMARKS', 'false')
+    extractor = OutlineExtractor()
+    text_matcher = extractor.heading_detector.text_matcher
+    matched = []
+    for name in ('match', 'match_pattern', 'contains_keyword', 'numbering_depth'):
+        method = getattr(text_matcher, name)
+        monkeypatch.setattr(text_matcher, name, lambda text, method=method: matched.append(text) or method(text))
+
+    result = extractor.extract_outline(write_pdf(tmp_path / 'long-lines.pdf'))
+
+    assert [item['text'] for item in result['outline']] == ['1. Chapter 1', '2. Chapter 2']
+    assert extractor.last_filter_report['pruned_numeric'] == 16
+    assert matched and not any(text.startswith('long body line') for text in matched)
+
+def test_numeric_bound_keeps_every_heading(sample_pdfs):
+    detector = HeadingDetector()
+    candidate_filter = CandidateFilter(detector, remove_running=False)
+    parser = PDFParser()
+    for pdf_path in sample_pdfs:
+        blocks = parser.extract_text_with_metadata(str(pdf_path))
+        doc_stats = parser.get_document_stats(blocks)
+        lines, report = candidate_filter.filter(candidate_filter.collect_lines(blocks), doc_stats, 1)
+
+        kept = {(lines.page[index], lines.get_bbox(index)) for index in range(len(lines))}
+        assert report['kept'] == len(kept)
+        for block in blocks:
+            if len(block['text'].strip()) >= 2 \
+                    and detector.calculate_heading_score(block, doc_stats) >= detector.score_threshold:
+                assert (block['page'], block['bbox']) in kept, block['text']
@@ -0,0 +1,49 @@
+"""
+OutlineExtractor.extract_many: failures, including dead worker processes, never stop the stream
+"""
+
+import os
+
+import pytest
+
+from services.round1a import batch_runner, extract_many
+from services.round1a.outline_extractor import OutlineExtractor
+
+def crash_on_marker(pdf, name: str, hard_timeout_seconds: float):
+    """Worker task standing in for _extract_item_in_worker: dies like an OOM-killed process on crash*.pdf"""
+    if name.startswith('crash'):
+        os._exit(1)
+    return batch_runner._extract_item_in_worker(pdf, name, hard_timeout_seconds)
+
+@pytest.fixture
+def extractor(monkeypatch):
+    monkeypatch.setenv('OUTLINE_CACHE', 'false')
+    monkeypatch.setenv('EXTRACT_BOOKMARKS', 'false')
+    # Workers are forked after this, so they run the crashing task
+    monkeypatch.setattr(extract_many, '_extract_item_in_worker', crash_on_marker)
+    return OutlineExtractor()
+
+def items(sample_pdfs, crash_positions):
+    """(id, bytes) pairs of the samples, with crashing copies inserted at crash_positions"""
+    pairs = [(pdf_path.name, pdf_path.read_bytes()) for pdf_path in sample_pdfs]
+    for count, position in enumerate(crash_positions):
+        pairs.insert(position, (f'crash{count}.pdf', pairs[0][1]))
+    return pairs
+
+@pytest.mark.parametrize('ordered', [True, False])
+@pytest.mark.parametrize('crash_positions', [[0], [3], [1, 2]])
+def test_dead_worker_fails_only_its_item(extractor, sample_pdfs, ordered, crash_positions):
+    pairs = items(sample_pdfs, crash_positions)
+
+    results = list(extractor.extract_many(pairs, workers=2, executor='process', ordered=ordered, timeout=30))
+
+    item_ids = [item_id for item_id, _ in results]
+    if ordered:
+        assert item_ids == [item_id for item_id, _ in pairs]
+    else:
+        assert sorted(item_ids) == sorted(item_id for item_id, _ in pairs)
+    for item_id, outcome in results:
+        if item_id.startswith('crash'):
+            assert isinstance(outcome, RuntimeError) and str(outcome).startswith('Worker process failed')
+        else:
+            assert isinstance(outcome, dict), outcome
@@ -0,0 +1,24 @@
+"""
+Atomic JSON writes get the permissions a plain write would have
+"""
+
+import os
+import stat
+
+from utils.file_handler import NEW_FILE_MODE, FileHandler
+
+def file_mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+def test_atomic_save_uses_umask_default(tmp_path):
+    output = tmp_path / 'new.json'
+    assert FileHandler().save_json({'title': 'x'}, output, atomic=True)
+    assert file_mode(output) == NEW_FILE_MODE
+
+def test_atomic_save_keeps_existing_mode(tmp_path):
+    output = tmp_path / 'existing.json'
+    output.write_text('{}')
+    os.chmod(output, 0o640)
+    assert FileHandler().save_json({'title': 'x'}, output, atomic=True)
+    assert file_mode(output) == 0o640
+    assert FileHandler().load_json(output) == {'title': 'x'}
@@ -0,0 +1,93 @@
+"""
+Batch and lazy heading scoring must agree exactly with HeadingDetector.score_features
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from services.round1a.heading_detector import ALL_TEXT_FEATURES, HeadingDetector
+from services.round1a.pdf_parser import PDFParser
+
+# Every tier boundary, just below and above it, and the extremes
+FONT_RATIOS = [0.0, 0.5, 1.0, 1.0999, 1.1, 1.1001, 1.19, 1.2, 1.21, 1.39, 1.4, 1.41, 2.0, 10.0, float('inf')]
+
+DETECTORS = [
+    HeadingDetector(),
+    HeadingDetector(score_weights={'bold': 0.3, 'pattern': 0.45, 'keyword': 0.3}, font_ratio_tiers=(1.5, 1.3, 1.05),
+                    score_threshold=0.55),
+]
+
+LINES = [
+    ('1. Introduction', 20, 50.0),
+    ('2.3.1 Results and Discussion', 0, 72.0),
+    ('Revision History', 16, 120.0),
+    ('APPENDIX A', 0, 40.0),
+    ('Table of Contents:', 16, 300.0),
+    ('the quick brown fox jumps over the lazy dog and keeps running along', 0, 72.0),
+    ('Page 3 of 12', 0, 500.0),
+    ('ok', 16, 10.0),
+    ('Summary', 0, 72.0),
+    ('x' * 120, 16, 72.0),
+]
+
+def sample_lines(pdf_paths):
+    """(text, font ratio, font flags, x0) of every line in pdf_paths"""
+    parser = PDFParser()
+    lines = []
+    for pdf_path in pdf_paths:
+        blocks = parser.extract_text_store(str(pdf_path))
+        body_text_size = parser.get_document_stats(blocks)['body_text_size']
+        for text, font_size, font_flags, _, bbox, _ in blocks.rows():
+            text = text.strip()
+            if len(text) >= 2:
+                lines.append((text, font_size / body_text_size, font_flags, bbox[0]))
+    return lines
+
+@pytest.mark.parametrize('detector', DETECTORS)
+def test_score_features_batch_matches_score_features(detector):
+    pairs = list(itertools.product(FONT_RATIOS, range(ALL_TEXT_FEATURES + 1)))
+    font_ratios = np.array([ratio for ratio, _ in pairs])
+    features = np.array([bits for _, bits in pairs], dtype=np.uint8)
+
+    batch = detector.score_features_batch(font_ratios, features)
+
+    expected = [detector.score_features(ratio, bits) for ratio, bits in pairs]
+    assert batch.tolist() == expected
+
+def test_collect_candidates_matches_calculate_heading_score(sample_pdfs):
+    detector = HeadingDetector()
+    parser = PDFParser()
+    for pdf_path in sample_pdfs:
+        blocks = parser.extract_text_with_metadata(str(pdf_path))
+        doc_stats = parser.get_document_stats(blocks)
+
+        headings = detector.rank_candidates(detector.collect_candidates(blocks, doc_stats), doc_stats)
+
+        expected = [block for block in blocks if len(block['text'].strip()) >= 2
+                    and detector.calculate_heading_score(block, doc_stats) >= detector.score_threshold]
+        assert sorted((heading['page'], heading['bbox'], heading['confidence']) for heading in headings) == \
+            sorted((block['page'], block['bbox'], detector.calculate_heading_score(block, doc_stats))
+                   for block in expected)
+
+@pytest.mark.parametrize('detector', DETECTORS)
+@pytest.mark.parametrize('full_confidence', [False, True])
+def test_score_lazily_matches_full_scoring(detector, full_confidence, sample_pdfs):
+    lines = [(text, ratio, flags, x0) for (text, flags, x0), ratio in itertools.product(LINES, FONT_RATIOS)]
+    lines += sample_lines(sample_pdfs)
+
+    for text, font_ratio, font_flags, x0 in lines:
+        features, numbering_depth = detector._text_features_with_depth(text, font_flags, x0)
+        full_score = detector.score_features(font_ratio, features)
+
+        accepted, known, depth, evaluated = detector.score_lazily(text, font_ratio, font_flags, x0, full_confidence)
+
+        assert accepted == (full_score >= detector.score_threshold), text
+        assert known & ~features == 0, text
+        assert 1 <= evaluated <= 7
+        if accepted:
+            assert depth == numbering_depth, text
+            assert detector.score_features(font_ratio, known) >= detector.score_threshold
+            if full_confidence:
+                assert known == features, text
@@ -0,0 +1,101 @@
+"""
+Per-page cache: hits, misses and re-parsing only the pages a revision changed
+"""
+
+import fitz
+import pytest
+
+from services.round1a.outline_extractor import OutlineExtractor
+from services.round1a.pdf_parser import PDFParser
+from utils.page_cache import PageCache
+
+PAGE_COUNT = 6
+
+def write_pdf(path, revised_page=None):
+    """Small multi-page PDF; revised_page gets one extra heading line"""
+    doc = fitz.open()
+    for page_num in range(PAGE_COUNT):
+        page = doc.new_page()
+        page.insert_text((72, 72), f'{page_num + 1}. Chapter {page_num + 1}', fontsize=18)
+        for line_num in range(10):
+            page.insert_text((72, 120 + line_num * 16), f'Body text line {line_num} of page {page_num + 1}', fontsize=10)
+        if page_num == revised_page:
+            page.insert_text((72, 400), 'Added Section Heading', fontsize=18)
+    # A full rewrite, so object numbers and offsets are not those of the original
+    doc.save(str(path), garbage=4, deflate=True)
+    doc.close()
+    return str(path)
+
+@pytest.fixture
+def page_cache(tmp_path):
+    cache = PageCache(tmp_path / 'cache' / 'pages.sqlite', max_bytes=64 * 1024 * 1024)
+    yield cache
+    cache.close()
+
+def parse(parser, pdf_path):
+    """(page lines, page numbers parsed rather than read from the cache)"""
+    parsed = []
+    parse_page = parser._parse_page
+
+    def counting_parse_page(page):
+        parsed.append(page.number)
+        return parse_page(page)
+
+    parser._parse_page = counting_parse_page
+    try:
+        return [lines for _, lines in parser.iter_pages(pdf_path)], parsed
+    finally:
+        del parser._parse_page
+
+def test_miss_then_hit(tmp_path, page_cache):
+    pdf_path = write_pdf(tmp_path / 'doc.pdf')
+    parser = PDFParser(page_cache=page_cache)
+
+    first, parsed_first = parse(parser, pdf_path)
+    second, parsed_second = parse(parser, pdf_path)
+
+    assert parsed_first == list(range(PAGE_COUNT))
+    assert parsed_second == []
+    assert second == first
+    assert first == parse(PDFParser(), pdf_path)[0]
+    assert page_cache.get_stats() == {'hits': PAGE_COUNT, 'misses': PAGE_COUNT}
+
+def test_revision_reparses_only_changed_page(tmp_path, page_cache):
+    parser = PDFParser(page_cache=page_cache)
+    original, _ = parse(parser, write_pdf(tmp_path / 'doc.pdf'))
+
+    revised_path = write_pdf(tmp_path / 'doc-v2.pdf', revised_page=3)
+    revised, parsed = parse(parser, revised_path)
+
+    assert parsed == [3]
+    assert revised == parse(PDFParser(), revised_path)[0]
+    assert revised[:3] == original[:3] and revised[4:] == original[4:]
+    assert revised[3] != original[3]
+
+def test_parser_settings_do_not_share_entries(tmp_path, page_cache):
+    pdf_path = write_pdf(tmp_path / 'doc.pdf')
+    parse(PDFParser(page_cache=page_cache), pdf_path)
+
+    _, parsed = parse(PDFParser(lean=True, page_cache=page_cache), pdf_path)
+
+    assert parsed == list(range(PAGE_COUNT))
+
+def test_outline_with_page_cache_matches_uncached(tmp_path, page_cache, monkeypatch):
+    monkeypatch.setenv('EXTRACT_BOOKMARKS', 'false')
+    cached = OutlineExtractor(page_cache=page_cache)
+    uncached = OutlineExtractor()
+    cached.extract_outline(write_pdf(tmp_path / 'doc.pdf'))
+
+    revised_path = write_pdf(tmp_path / 'doc-v2.pdf', revised_page=3)
+    outline = cached.extract_outline(revised_path)
+
+    assert outline == uncached.extract_outline(revised_path)
+    assert {'level': 'H1', 'text': 'Added Section Heading', 'page': 4} in outline['outline']
+
+def test_replacing_a_page_keeps_the_byte_total(page_cache):
+    page_cache.store({'a': b'x' * 100, 'b': b'y' * 50})
+    page_cache.store({'a': b'z' * 40})
+
+    on_disk = page_cache._connection.execute('SELECT SUM(size) FROM pages').fetchone()[0]
+    assert page_cache._total_bytes == on_disk == 90
+    assert page_cache.get_many(['a']) == {'a': b'z' * 40}
@@ -0,0 +1,24 @@
+"""
+In-memory inputs: the name is a label, the %PDF header decides
+"""
+
+from services.round1a.outline_extractor import OutlineExtractor
+from utils.pdf_source import PDFSource
+
+def test_bytes_need_no_pdf_name(sample_pdfs, monkeypatch):
+    monkeypatch.setenv('OUTLINE_CACHE', 'false')
+    data = sample_pdfs[0].read_bytes()
+    result = OutlineExtractor().extract_outline(data, name='invoice-42')
+    assert 'title' in result and 'outline' in result
+
+def test_bytes_still_need_pdf_header():
+    assert PDFSource.from_bytes(b'%PDF-1.7\n', 'invoice-42').validate() == (True, None)
+    valid, error = PDFSource.from_bytes(b'PK\x03\x04', 'invoice-42.pdf').validate()
+    assert not valid and 'invoice-42.pdf' in error
+
+def test_files_still_need_pdf_extension(tmp_path, sample_pdfs):
+    renamed = tmp_path / 'invoice-42'
+    renamed.write_bytes(sample_pdfs[0].read_bytes())
+    with PDFSource.open(renamed) as source:
+        valid, error = source.validate()
+    assert not valid and 'not a PDF' in error
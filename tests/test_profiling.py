@@ -0,0 +1,18 @@
+"""
+Profile dumps of different documents never overwrite each other
+"""
+
+from services.round1a.outline_extractor import OutlineExtractor
+from utils.profiling import DocumentProfiler
+
+def test_same_name_keeps_separate_dumps(tmp_path, sample_pdfs, monkeypatch):
+    monkeypatch.setenv('OUTLINE_CACHE', 'false')
+    extractor = OutlineExtractor(profiler=DocumentProfiler(tmp_path / 'profiles'))
+
+    dumps = []
+    for pdf_path in sample_pdfs[:2]:
+        extractor.extract_outline(pdf_path.read_bytes(), name='upload.pdf')
+        dumps.append(extractor.last_profile_path)
+
+    assert dumps[0] != dumps[1]
+    assert all(dump.exists() and dump.name.startswith('upload-') for dump in dumps)
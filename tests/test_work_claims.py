@@ -0,0 +1,114 @@
+"""
+WorkClaims across processes: exclusive claims, expired lease takeover and completion records
+"""
+
+import multiprocessing
+import os
+import time
+
+from utils.work_claims import WorkClaims
+
+PDF_NAMES = [f'doc{index:03d}.pdf' for index in range(40)]
+
+def claim_all(state_dir: str, node_id: str, pdf_names, start, results):
+    """Process body: wait for the others, then try to claim every name"""
+    claims = WorkClaims(state_dir, node_id, lease_seconds=60)
+    start.wait()
+    now = claims.volume_time()
+    results.put((node_id, [pdf_name for pdf_name in pdf_names if claims.try_claim(pdf_name, now)]))
+
+def run_racing_nodes(state_dir, node_count: int, pdf_names):
+    """Claimed names per node after node_count processes race for the same names"""
+    context = multiprocessing.get_context('fork')
+    start = context.Event()
+    results = context.Queue()
+    processes = [context.Process(target=claim_all, args=(str(state_dir), f'node-{index}', pdf_names, start, results))
+                 for index in range(node_count)]
+    for process in processes:
+        process.start()
+    start.set()
+    claimed = dict(results.get(timeout=30) for _ in processes)
+    for process in processes:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+    return claimed
+
+def expire(claims: WorkClaims, pdf_name: str):
+    """Age a claim file past its lease"""
+    claim_path = claims.claims_dir / f'{claims.key(pdf_name)}.claim'
+    old = claim_path.stat().st_mtime - claims.lease_seconds - 10
+    os.utime(claim_path, (old, old))
+
+def test_each_file_is_claimed_by_exactly_one_process(tmp_path):
+    claimed = run_racing_nodes(tmp_path, 4, PDF_NAMES)
+
+    winners = [pdf_name for names in claimed.values() for pdf_name in names]
+    assert sorted(winners) == PDF_NAMES
+
+def test_live_claim_is_not_taken_over(tmp_path):
+    owner = WorkClaims(tmp_path, 'owner', lease_seconds=60)
+    other = WorkClaims(tmp_path, 'other', lease_seconds=60)
+
+    assert owner.try_claim('a.pdf', owner.volume_time())
+    assert not other.try_claim('a.pdf', other.volume_time())
+    assert owner.renew() == []
+
+def test_expired_claim_is_taken_over_by_exactly_one_process(tmp_path):
+    crashed = WorkClaims(tmp_path, 'crashed', lease_seconds=60)
+    now = crashed.volume_time()
+    for pdf_name in PDF_NAMES:
+        assert crashed.try_claim(pdf_name, now)
+        expire(crashed, pdf_name)
+
+    claimed = run_racing_nodes(tmp_path, 4, PDF_NAMES)
+
+    winners = [pdf_name for names in claimed.values() for pdf_name in names]
+    assert sorted(winners) == PDF_NAMES
+    # The old owner notices on its next renewal
+    assert sorted(crashed.renew()) == PDF_NAMES
+    assert not list(tmp_path.glob('claims/*.stale'))
+
+def test_release_only_removes_own_claim(tmp_path):
+    paused = WorkClaims(tmp_path, 'paused', lease_seconds=60)
+    other = WorkClaims(tmp_path, 'other', lease_seconds=60)
+    assert paused.try_claim('a.pdf', paused.volume_time())
+    expire(paused, 'a.pdf')
+    assert other.try_claim('a.pdf', other.volume_time())
+
+    paused.release('a.pdf')
+
+    claim_path = other.claims_dir / f'{other.key("a.pdf")}.claim'
+    assert claim_path.exists()
+    other.release('a.pdf')
+    assert not claim_path.exists()
+
+def test_completion_records(tmp_path):
+    node_a = WorkClaims(tmp_path, 'node-a')
+    node_b = WorkClaims(tmp_path, 'node-b')
+    assert node_a.completion('a.pdf') is None
+
+    node_a.mark_done('a.pdf', {'status': 'ok', 'size': 10})
+    node_b.mark_done('b.pdf', {'status': 'failed', 'size': 20})
+
+    assert node_b.completion('a.pdf') == {'status': 'ok', 'size': 10, 'pdf': 'a.pdf', 'node': 'node-a'}
+    records = sorted(node_a.iter_completions(), key=lambda record: record['pdf'])
+    assert [(record['pdf'], record['node'], record['status']) for record in records] == [
+        ('a.pdf', 'node-a', 'ok'), ('b.pdf', 'node-b', 'failed')
+    ]
+    # Written through a temp file and rename: nothing else is left in done/
+    assert sorted(path.name for path in node_a.done_dir.iterdir()) == sorted(
+        f'{WorkClaims.key(pdf_name)}.json' for pdf_name in ('a.pdf', 'b.pdf'))
+
+def test_heartbeat_keeps_claims_alive(tmp_path):
+    owner = WorkClaims(tmp_path, 'owner', lease_seconds=1.0)
+    other = WorkClaims(tmp_path, 'other', lease_seconds=1.0)
+    assert owner.try_claim('a.pdf', owner.volume_time())
+
+    owner.start_heartbeat(interval_seconds=0.1)
+    try:
+        # Well past the lease, which only the renewals keep alive
+        for _ in range(4):
+            time.sleep(0.5)
+            assert not other.try_claim('a.pdf', other.volume_time())
+    finally:
+        owner.stop_heartbeat()